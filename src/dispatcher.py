@@ -0,0 +1,1322 @@
+"""Server components and JSON-RPC method dispatch.
+
+Shared by the HTTP and WebSocket transports (src.main) and the stdio
+transport (src.stdio_server). Nothing here imports FastAPI or Starlette, so
+the stdio transport starts without loading them.
+"""
+from src.services.compression import ResponseCompressor
+from src.services.digests import ALGORITHMS as HASH_ALGORITHMS
+from src.services.file_browser import (
+    LISTING_FIELDS,
+    LISTING_SORT_KEYS,
+    MAX_READ_SIZE,
+    FileBrowser,
+    PermissionDeniedError,
+    file_etag,
+)
+from src.services.mcp_compliance import MCPCompliance
+from src.services.subscriptions import SubscriptionHub
+from src.services.watcher import DirectoryWatcher
+from src.services.worker_pool import WorkerPool
+from src.utils.path_filter import PathFilter
+from src.utils.logger import dropped_records, get_logger
+from src.utils.json_codec import dumps, loads
+from src.utils.metrics import REGISTRY
+from src.utils.signed_urls import UrlSigner
+from src.utils.timing import current_timings, start_timings
+from typing import Optional
+import asyncio
+import getpass
+import itertools
+import os
+import posixpath
+import secrets
+import threading
+import tempfile
+import time
+from urllib.parse import quote
+
+logger = get_logger(__name__)
+
+# TODO: Make root_dir configurable (e.g., via environment variable or command
+# line argument)
+ROOT_DIR = os.getenv("MCP_SERVER_ROOT_DIR", os.getcwd())
+# Total size of file contents kept in memory by FileBrowser; 0 disables the cache
+CONTENT_CACHE_MAX_BYTES = int(
+    os.getenv("MCP_CONTENT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+)
+# Optional trigram index built with `python -m src.services.search_index`
+SEARCH_INDEX_PATH = os.getenv("MCP_SEARCH_INDEX_PATH")
+# Worker processes used to scan files for fs.search; 0 scans in the search worker thread
+SEARCH_PROCESSES = int(os.getenv("MCP_SEARCH_PROCESSES", "0"))
+
+def default_digest_cache_path(root_dir: str) -> str:
+    """The digest cache file in the user's cache directory, outside root_dir."""
+    home = os.path.expanduser("~")
+    cache_home = os.getenv("XDG_CACHE_HOME") or (
+        os.path.join(home, ".cache") if home != "~" else None
+    )
+    if cache_home:
+        path = os.path.join(
+            os.path.abspath(cache_home), "mcp-gemini", "digests.sqlite3"
+        )
+        root = os.path.abspath(root_dir)
+        # The cache file must not show up in (and keep changing) the served tree
+        if os.path.commonpath([path, root]) != root:
+            return path
+    try:
+        user = getpass.getuser()
+    except (KeyError, ImportError, OSError):
+        # No passwd entry for the uid, e.g. in a container
+        user = str(os.getuid()) if hasattr(os, "getuid") else "default"
+    return os.path.join(tempfile.gettempdir(), f"mcp-gemini-{user}", "digests.sqlite3")
+
+# SQLite file that keeps fs.hash digests across restarts, in the user's cache
+# directory by default; ":memory:" keeps them for the life of the process and an
+# empty value disables the digest cache. If the file cannot be opened, digests
+# are kept in memory.
+DIGEST_CACHE_PATH = os.getenv(
+    "MCP_DIGEST_CACHE_PATH", default_digest_cache_path(ROOT_DIR)
+)
+
+# Change tracking for the root directory:
+# auto (inotify, else polling), inotify, poll or off
+WATCHER_MODE = os.getenv("MCP_WATCHER", "auto")
+WATCHER_POLL_INTERVAL = float(os.getenv("MCP_WATCHER_POLL_INTERVAL", "2.0"))
+WATCHER_MAX_WATCHES = int(os.getenv("MCP_WATCHER_MAX_WATCHES", "65536"))
+# Total size of directory listings kept in memory while the watcher
+# reports them unchanged
+LISTING_CACHE_MAX_BYTES = int(
+    os.getenv("MCP_LISTING_CACHE_MAX_BYTES", str(16 * 1024 * 1024))
+)
+watcher = None
+if WATCHER_MODE != "off":
+    watcher = DirectoryWatcher(
+        ROOT_DIR,
+        mode=WATCHER_MODE,
+        poll_interval=WATCHER_POLL_INTERVAL,
+        max_watches=WATCHER_MAX_WATCHES,
+    )
+file_browser = FileBrowser(
+    root_dir=ROOT_DIR,
+    cache_max_bytes=CONTENT_CACHE_MAX_BYTES,
+    search_index_path=SEARCH_INDEX_PATH,
+    search_processes=SEARCH_PROCESSES,
+    watcher=watcher,
+    listing_cache_max_bytes=LISTING_CACHE_MAX_BYTES,
+    digest_cache_path=DIGEST_CACHE_PATH,
+)
+mcp_compliance = MCPCompliance()
+# fs.subscribe needs the watcher, so change notifications are off with MCP_WATCHER=off
+subscriptions = SubscriptionHub(watcher) if watcher is not None else None
+# Changed paths held for one subscription while a notification is being sent;
+# beyond this the client is told to rescan instead
+NOTIFY_MAX_PATHS = int(os.getenv("MCP_NOTIFY_MAX_PATHS", "1000"))
+
+# Upper bounds for JSON-RPC batch requests (number of members and how many of
+# them are executed at the same time).
+BATCH_MAX_SIZE = int(os.getenv("MCP_BATCH_MAX_SIZE", "100"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("MCP_BATCH_MAX_CONCURRENCY", "8"))
+
+# Blocking FileBrowser calls run on worker threads instead of the event loop.
+# fs.search gets its own, smaller pool so that long directory walks cannot
+# queue up cheap reads and listings behind them.
+IO_WORKERS = int(os.getenv("MCP_IO_WORKERS", "8"))
+SEARCH_WORKERS = int(os.getenv("MCP_SEARCH_WORKERS", "2"))
+io_pool = WorkerPool("io", IO_WORKERS)
+search_pool = WorkerPool("search", SEARCH_WORKERS)
+
+STREAM_CHUNK_SIZE = int(os.getenv("MCP_STREAM_CHUNK_SIZE", str(64 * 1024)))
+# Page size used by fs.search when a cursor is given without max_results
+SEARCH_PAGE_SIZE = int(os.getenv("MCP_SEARCH_PAGE_SIZE", "1000"))
+# Page size used by fs.listDirectory when a cursor is given without limit
+LIST_PAGE_SIZE = int(os.getenv("MCP_LIST_PAGE_SIZE", "1000"))
+# Most paths accepted by fs.statMany and fs.readFiles, and the most file content
+# (in bytes, before any base64 encoding) a single fs.readFiles response may carry
+BULK_MAX_PATHS = int(os.getenv("MCP_BULK_MAX_PATHS", "1000"))
+READ_FILES_MAX_BYTES = int(os.getenv("MCP_READ_FILES_MAX_BYTES", str(MAX_READ_SIZE)))
+# Most entries returned by fs.tree unless max_entries is given;
+# streamed walks are unlimited
+TREE_MAX_ENTRIES = int(os.getenv("MCP_TREE_MAX_ENTRIES", "10000"))
+# Entries per frame of a streamed fs.tree response
+TREE_STREAM_BATCH = 1000
+# Most files below a directory hashed by a single fs.hash call
+HASH_MAX_FILES = int(os.getenv("MCP_HASH_MAX_FILES", "100000"))
+
+# JSON-RPC responses of at least MCP_COMPRESSION_MIN_BYTES are compressed with
+# gzip or zstd (when the zstandard package is installed) if the client accepts
+# it; 0 disables compression. Compressed fs.readFile contents are cached.
+COMPRESSION_MIN_BYTES = int(os.getenv("MCP_COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("MCP_GZIP_LEVEL", "6"))
+ZSTD_LEVEL = int(os.getenv("MCP_ZSTD_LEVEL", "3"))
+COMPRESSED_CACHE_MAX_BYTES = int(
+    os.getenv("MCP_COMPRESSED_CACHE_MAX_BYTES", str(32 * 1024 * 1024))
+)
+compressor = None
+if COMPRESSION_MIN_BYTES > 0:
+    compressor = ResponseCompressor(
+        COMPRESSION_MIN_BYTES, GZIP_LEVEL, ZSTD_LEVEL, COMPRESSED_CACHE_MAX_BYTES
+    )
+
+# fs.readFile with as_url returns a /raw URL signed with MCP_URL_SECRET (a random
+# per-process secret by default) that stays valid for MCP_RAW_URL_TTL seconds
+URL_SECRET = os.getenv("MCP_URL_SECRET")
+RAW_URL_TTL = float(os.getenv("MCP_RAW_URL_TTL", "300"))
+url_signer = UrlSigner(
+    URL_SECRET.encode("utf-8") if URL_SECRET else secrets.token_bytes(32), RAW_URL_TTL
+)
+
+RPC_METHODS = (
+    "fs.listDirectory",
+    "fs.readFile",
+    "fs.search",
+    "fs.statMany",
+    "fs.readFiles",
+    "fs.tree",
+    "fs.hash",
+    "fs.subscribe",
+    "fs.unsubscribe",
+)
+# Unknown method names are counted as "other" so clients cannot create
+# unbounded label sets
+RPC_REQUESTS = REGISTRY.counter(
+    "mcp_rpc_requests_total", "JSON-RPC calls handled", ("method",)
+)
+RPC_ERRORS = REGISTRY.counter(
+    "mcp_rpc_errors_total", "JSON-RPC calls answered with an error", ("method", "code")
+)
+MESSAGE_BYTES_SENT = REGISTRY.counter(
+    "mcp_message_bytes_sent_total",
+    "Bytes of JSON-RPC messages sent over WebSocket and stdio connections",
+    ("transport",),
+)
+RPC_DURATION = REGISTRY.histogram(
+    "mcp_rpc_duration_seconds",
+    "Time to handle a JSON-RPC call (to the start of the response for streams)",
+    ("method",),
+)
+
+def _pool_samples(field: str):
+    return [((pool.name,), pool.stats()[field]) for pool in (io_pool, search_pool)]
+
+def _cache_samples(field: str):
+    caches = {
+        "content": file_browser.content_cache,
+        "listing": file_browser.listing_cache,
+        "path_resolver": file_browser.path_resolver,
+        "compressed": compressor.cache if compressor is not None else None,
+        "digest": file_browser.digest_store,
+    }
+    samples = []
+    for name, cache in caches.items():
+        cache_stats = cache.stats() if cache is not None else {}
+        if field == "hit_ratio" and "hits" in cache_stats:
+            lookups = cache_stats["hits"] + cache_stats["misses"]
+            samples.append(((name,), cache_stats["hits"] / lookups if lookups else 0.0))
+        elif field in cache_stats:
+            samples.append(((name,), cache_stats[field]))
+    return samples
+
+REGISTRY.collector(
+    "mcp_worker_pool_queued",
+    "Calls waiting for a worker thread",
+    ("pool",),
+    lambda: _pool_samples("queued"),
+)
+REGISTRY.collector(
+    "mcp_worker_pool_active",
+    "Calls running on a worker thread",
+    ("pool",),
+    lambda: _pool_samples("active"),
+)
+REGISTRY.collector(
+    "mcp_worker_pool_completed_total",
+    "Calls finished by a worker pool",
+    ("pool",),
+    lambda: _pool_samples("completed"),
+    "counter",
+)
+REGISTRY.collector(
+    "mcp_cache_hits_total",
+    "Cache lookups that found an entry",
+    ("cache",),
+    lambda: _cache_samples("hits"),
+    "counter",
+)
+REGISTRY.collector(
+    "mcp_cache_misses_total",
+    "Cache lookups that found nothing",
+    ("cache",),
+    lambda: _cache_samples("misses"),
+    "counter",
+)
+REGISTRY.collector(
+    "mcp_cache_hit_ratio",
+    "Share of cache lookups that found an entry",
+    ("cache",),
+    lambda: _cache_samples("hit_ratio"),
+)
+REGISTRY.collector(
+    "mcp_cache_bytes",
+    "Memory held by a cache",
+    ("cache",),
+    lambda: _cache_samples("bytes"),
+)
+
+def elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 3)
+
+def create_jsonrpc_error(request_id, code: int, message: str, data: any = None):
+    error_response = {
+        "jsonrpc": "2.0",
+        "error": {
+            "code": code,
+            "message": message
+        },
+        "id": request_id
+    }
+    if data is not None:
+        error_response["error"]["data"] = data
+    return error_response
+
+def is_integer(value) -> bool:
+    # bool is a subclass of int, but JSON true/false are not numbers
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def is_positive_integer(value) -> bool:
+    return is_integer(value) and value > 0
+
+class StreamResult:
+    """A response sent as NDJSON frames instead of a single object.
+
+    frames is an async iterator of bytes.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def __init__(self, frames):
+        self.frames = frames
+
+def start():
+    if watcher is not None:
+        watcher.start()
+
+def shutdown():
+    io_pool.shutdown(wait=False)
+    search_pool.shutdown(wait=False)
+    if file_browser.search_engine is not None:
+        file_browser.search_engine.shutdown()
+    if file_browser.digest_store is not None:
+        file_browser.digest_store.close()
+    if watcher is not None:
+        watcher.stop()
+
+def server_stats() -> dict:
+    return {
+        "worker_pools": {
+            io_pool.name: io_pool.stats(),
+            search_pool.name: search_pool.stats(),
+        },
+        "content_cache": (
+            file_browser.content_cache.stats() if file_browser.content_cache else None
+        ),
+        "listing_cache": (
+            file_browser.listing_cache.stats() if file_browser.listing_cache else None
+        ),
+        "path_resolver": file_browser.path_resolver.stats(),
+        "digest_cache": (
+            file_browser.digest_store.stats() if file_browser.digest_store else None
+        ),
+        "compressed_cache": compressor.stats() if compressor is not None else None,
+        "watcher": watcher.stats() if watcher else None,
+        "subscriptions": subscriptions.stats() if subscriptions else None,
+        "logging": {"dropped_records": dropped_records()},
+    }
+
+class Session:
+    """A client connection that receives fs.changed notifications.
+
+    Transports that can push messages (WebSocket) create one per connection
+    and pass it to handle_message. send is a coroutine function taking a
+    notification object. Changes that arrive while a notification is being
+    sent are merged per subscription, so a slow client gets fewer, larger
+    notifications instead of a growing backlog.
+    """
+
+    def __init__(self, send):
+        self.send = send
+        self.loop = asyncio.get_running_loop()
+        self._subscription_ids = set()
+        # subscribe() runs on a worker thread and may finish after close()
+        self._lock = threading.Lock()
+        self._closed = False
+        # subscription id -> set of changed paths,
+        # or None when everything may have changed
+        self._pending = {}
+        # Subscriptions the server ended, to be told so in their last notification
+        self._ended = set()
+        self._flush_task = None
+
+    def subscribe(self, directory: str, recursive: bool) -> int:
+        subscription_id = subscriptions.subscribe(
+            directory, recursive, self.loop, self._changed
+        )
+        with self._lock:
+            if not self._closed:
+                self._subscription_ids.add(subscription_id)
+                return subscription_id
+        # The connection closed while subscribing; nothing would ever unsubscribe
+        subscriptions.unsubscribe(subscription_id)
+        return subscription_id
+
+    def unsubscribe(self, subscription_id: int) -> bool:
+        if subscription_id not in self._subscription_ids:
+            return False
+        self._subscription_ids.discard(subscription_id)
+        self._pending.pop(subscription_id, None)
+        return subscriptions.unsubscribe(subscription_id)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            subscription_ids = list(self._subscription_ids)
+        for subscription_id in subscription_ids:
+            self.unsubscribe(subscription_id)
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+
+    def _changed(self, subscription_id: int, paths, ended: bool = False):
+        if subscription_id not in self._subscription_ids:
+            return
+        if ended:
+            self._subscription_ids.discard(subscription_id)
+            self._ended.add(subscription_id)
+        pending = self._pending.get(subscription_id, set())
+        if paths is None or pending is None:
+            self._pending[subscription_id] = None
+        else:
+            pending.update(paths)
+            self._pending[subscription_id] = (
+                pending if len(pending) <= NOTIFY_MAX_PATHS else None
+            )
+        if self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush())
+
+    async def _flush(self):
+        try:
+            while self._pending:
+                subscription_id = next(iter(self._pending))
+                paths = self._pending.pop(subscription_id)
+                if paths is not None:
+                    paths = sorted(
+                        os.path.relpath(path, file_browser.root_dir) for path in paths
+                    )
+                params = {"subscription": subscription_id, "paths": paths}
+                if subscription_id in self._ended:
+                    self._ended.discard(subscription_id)
+                    params["ended"] = True
+                await self.send(
+                    {"jsonrpc": "2.0", "method": "fs.changed", "params": params}
+                )
+        except Exception as e:
+            # The connection is closing; close() drops the subscriptions
+            logger.warning(
+                "Failed to send change notification", extra={"error": str(e)}
+            )
+        finally:
+            self._flush_task = None
+
+def raw_file_url(path: str, st: os.stat_result) -> dict:
+    # Clients normalize dot segments in URLs, so the signed path must not contain any
+    path = posixpath.normpath(path)
+    expires, signature = url_signer.sign(path)
+    return {
+        "url": f"/raw/{quote(path)}?expires={expires}&signature={signature}",
+        "expires": expires,
+        "size": st.st_size,
+        "etag": file_etag(st),
+    }
+
+async def handle_message(data, session: Optional[Session] = None):
+    """Handle one JSON-RPC message (a request or a batch) from a message transport."""
+    start_timings()
+    try:
+        request = loads(data)
+    except ValueError as e:
+        return create_jsonrpc_error(None, -32700, "Parse error", str(e))
+    if isinstance(request, list):
+        return await handle_batch_request(request, session)
+    if not isinstance(request, dict):
+        return create_jsonrpc_error(
+            None, -32600, "Invalid Request", "Request must be a JSON object or array"
+        )
+    try:
+        return await handle_rpc_request(request, allow_stream=False, session=session)
+    except Exception as e:
+        logger.exception(
+            "Unhandled error in request", extra={"method": request.get("method")}
+        )
+        return create_jsonrpc_error(request.get("id"), -32603, "Internal error", str(e))
+
+async def handle_batch_request(requests: list, session: Optional[Session] = None):
+    logger.info("Incoming RPC batch request", extra={"batch_size": len(requests)})
+
+    if not requests:
+        return create_jsonrpc_error(
+            None, -32600, "Invalid Request", "Batch request must not be empty"
+        )
+    if len(requests) > BATCH_MAX_SIZE:
+        return create_jsonrpc_error(
+            None,
+            -32600,
+            "Invalid Request",
+            f"Batch request exceeds the maximum size of {BATCH_MAX_SIZE}",
+        )
+
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+
+    async def run_member(member):
+        if not isinstance(member, dict):
+            return create_jsonrpc_error(
+                None, -32600, "Invalid Request", "Batch member must be a JSON object"
+            )
+        async with semaphore:
+            # Each member runs in its own task, so it gets its own timings
+            start_timings()
+            try:
+                return await handle_rpc_request(
+                    member, allow_stream=False, session=session
+                )
+            except Exception as e:
+                # An unexpected failure in one call must not take down the whole batch
+                logger.exception(
+                    "Unhandled error in batch member",
+                    extra={"method": member.get("method")},
+                )
+                return create_jsonrpc_error(
+                    member.get("id"), -32603, "Internal error", str(e)
+                )
+
+    # gather() preserves the order of the members in the returned list
+    return await asyncio.gather(*(run_member(member) for member in requests))
+
+def build_path_filter(params: dict):
+    """Build a PathFilter from include/exclude/gitignore params.
+
+    Returns None if they are malformed.
+    """
+    include = params.get("include")
+    exclude = params.get("exclude")
+    for globs in (include, exclude):
+        if globs is not None and not (
+            isinstance(globs, list) and all(isinstance(glob, str) for glob in globs)
+        ):
+            return None
+    return PathFilter(
+        include=include,
+        exclude=exclude,
+        gitignore=bool(params.get("gitignore", False)),
+        default_excludes=bool(params.get("default_excludes", True)),
+    )
+
+def get_paths_param(params: dict):
+    """The 'paths' param of a bulk method.
+
+    None if it is not a list of at most BULK_MAX_PATHS strings.
+    """
+    paths = params.get("paths")
+    if (
+        not isinstance(paths, list)
+        or len(paths) > BULK_MAX_PATHS
+        or not all(isinstance(path, str) for path in paths)
+    ):
+        return None
+    return paths
+
+def entry_error(e: Exception) -> dict:
+    """The error object reported for one path of a bulk method.
+
+    It matches the errors of the single-path methods.
+    """
+    if isinstance(e, FileNotFoundError):
+        return {"code": -32000, "message": "File not found", "data": str(e)}
+    if isinstance(e, (PermissionDeniedError, ValueError)):
+        return {"code": -32000, "message": "Server error", "data": str(e)}
+    return {"code": -32603, "message": "Internal error", "data": str(e)}
+
+def stat_paths(paths: list) -> list:
+    entries = []
+    for path in paths:
+        try:
+            entries.append({"path": path, **file_browser.stat(path)})
+        except (FileNotFoundError, PermissionDeniedError, ValueError) as e:
+            entries.append({"path": path, "error": entry_error(e)})
+    return entries
+
+def hash_entry(path: str, algorithm: str) -> dict:
+    try:
+        return {"path": path, **file_browser.hash(path, algorithm, HASH_MAX_FILES)}
+    except (FileNotFoundError, PermissionDeniedError, ValueError) as e:
+        return {"path": path, "error": entry_error(e)}
+
+async def read_files(
+    paths: list, max_bytes_per_file: int, max_total_bytes: int
+) -> list:
+    """Read several files concurrently on the io pool within a total byte budget.
+
+    Every path is stat'ed first, so the budget is handed out in request
+    order before any file is read; files that do not fit are truncated, and
+    once the budget is used up the rest are marked budget_exhausted.
+    """
+    entries = await io_pool.run(stat_paths, paths)
+    remaining = max_total_bytes
+    reads = []
+    for index, entry in enumerate(entries):
+        if "error" in entry:
+            continue
+        if entry["type"] != "file":
+            entries[index] = {
+                "path": entry["path"],
+                "error": entry_error(
+                    FileNotFoundError(f"File not found: {entry['path']}")
+                ),
+            }
+            continue
+        length = min(entry["size"], max_bytes_per_file, remaining)
+        remaining -= length
+        if length == 0 and entry["size"] > 0:
+            # Not read at all, so there is no content (or encoding) to report
+            entries[index] = {
+                "path": entry["path"],
+                "size": entry["size"],
+                "truncated": True,
+                "budget_exhausted": True,
+            }
+            continue
+        reads.append((index, entry["path"], length))
+
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+
+    async def read(index: int, path: str, length: int):
+        async with semaphore:
+            try:
+                window = await io_pool.run(
+                    file_browser.read_file_range, path, 0, length
+                )
+            except Exception as e:
+                # One unreadable file must not fail the whole call
+                entries[index] = {"path": path, "error": entry_error(e)}
+                return
+        entries[index] = {
+            "path": path,
+            "content": window["content"],
+            "encoding": window["encoding"],
+            "size": window["total_size"],
+            "truncated": not window["eof"],
+        }
+
+    await asyncio.gather(*(read(*item) for item in reads))
+    return entries
+
+def _ndjson_frame(frame: dict) -> bytes:
+    return dumps(frame) + b"\n"
+
+def _close_stream(iterator):
+    try:
+        iterator.close()
+    except ValueError:
+        # Still running on a worker after a client disconnect;
+        # it is closed when collected
+        pass
+
+async def stream_file_frames(request_id, path: str, total_size: int, chunks):
+    """Yield an fs.readFile stream as NDJSON frames.
+
+    Chunks are read one at a time on the io pool.
+    """
+    yield _ndjson_frame(
+        {"jsonrpc": "2.0", "id": request_id, "type": "start", "total_size": total_size}
+    )
+    chunk_count = 0
+    try:
+        while True:
+            chunk = await io_pool.run(next, chunks, None)
+            if chunk is None:
+                break
+            chunk_count += 1
+            yield _ndjson_frame(
+                {"jsonrpc": "2.0", "id": request_id, "type": "chunk", **chunk}
+            )
+    except OSError as e:
+        logger.error("fs.readFile stream failed", extra={"path": path, "error": str(e)})
+        yield _ndjson_frame(
+            {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "type": "error",
+                "error": {"code": -32000, "message": "Server error", "data": str(e)},
+            }
+        )
+        return
+    finally:
+        _close_stream(chunks)
+    logger.info(
+        "fs.readFile stream finished",
+        extra={"path": path, "total_size": total_size, "chunk_count": chunk_count},
+    )
+    yield _ndjson_frame({"jsonrpc": "2.0", "id": request_id, "type": "end"})
+
+def _take(iterator, count: int) -> list:
+    return list(itertools.islice(iterator, count))
+
+async def stream_tree_frames(
+    request_id, path: str, entries, max_entries: Optional[int]
+):
+    """Yield an fs.tree walk as NDJSON frames of up to TREE_STREAM_BATCH entries."""
+    yield _ndjson_frame({"jsonrpc": "2.0", "id": request_id, "type": "start"})
+    count = 0
+    truncated = False
+    try:
+        while True:
+            batch_size = (
+                TREE_STREAM_BATCH
+                if max_entries is None
+                else min(TREE_STREAM_BATCH, max_entries - count)
+            )
+            if batch_size == 0:
+                # Only look one entry ahead to tell whether the walk was cut short
+                truncated = bool(await search_pool.run(_take, entries, 1))
+                break
+            batch = await search_pool.run(_take, entries, batch_size)
+            if not batch:
+                break
+            count += len(batch)
+            yield _ndjson_frame(
+                {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "type": "entries",
+                    "entries": batch,
+                }
+            )
+    except OSError as e:
+        logger.error("fs.tree stream failed", extra={"path": path, "error": str(e)})
+        yield _ndjson_frame(
+            {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "type": "error",
+                "error": {"code": -32000, "message": "Server error", "data": str(e)},
+            }
+        )
+        return
+    finally:
+        _close_stream(entries)
+    logger.info(
+        "fs.tree stream finished",
+        extra={"path": path, "entry_count": count, "truncated": truncated},
+    )
+    yield _ndjson_frame(
+        {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "type": "end",
+            "count": count,
+            "truncated": truncated,
+        }
+    )
+
+async def handle_rpc_request(
+    request: dict, allow_stream: bool = True, session: Optional[Session] = None
+):
+    """Dispatch one JSON-RPC call, recording its count, latency and error code."""
+    started = time.perf_counter()
+    method = request.get("method")
+    label = method if method in RPC_METHODS else "other"
+    try:
+        response = await dispatch_rpc_request(request, allow_stream, session)
+    except Exception:
+        RPC_ERRORS.inc(label, "-32603")
+        raise
+    finally:
+        RPC_REQUESTS.inc(label)
+        RPC_DURATION.observe(time.perf_counter() - started, label)
+    if isinstance(response, dict) and "error" in response:
+        RPC_ERRORS.inc(label, str(response["error"]["code"]))
+    params = request.get("params")
+    meta = params.get("_meta") if isinstance(params, dict) else None
+    timings = current_timings()
+    if (
+        isinstance(meta, dict)
+        and meta.get("timings")
+        and isinstance(response, dict)
+        and timings is not None
+    ):
+        response["_meta"] = {"timings": timings.as_dict()}
+    return response
+
+async def dispatch_rpc_request(
+    request: dict, allow_stream: bool = True, session: Optional[Session] = None
+):
+    started = time.perf_counter()
+    logger.debug(
+        "Incoming RPC request",
+        extra={"request_id": request.get("id"), "method": request.get("method")},
+    )
+
+    request_id = request.get("id")  # Get ID early for error responses
+
+    if not mcp_compliance.check_compliance(request):
+        logger.warning(
+            "MCP compliance check failed",
+            extra={"request_keys": sorted(map(str, request))},
+        )
+        return create_jsonrpc_error(
+            request_id,
+            -32600,
+            "Invalid Request",
+            "Request does not comply with MCP specification",
+        )
+
+    jsonrpc_version = request.get("jsonrpc")
+    method = request.get("method")
+    logger.debug("Requested service method", extra={"method": method})
+    params = request.get("params", {})
+
+    if jsonrpc_version != "2.0":
+        logger.warning(
+            "Invalid JSON-RPC version", extra={"jsonrpc_version": jsonrpc_version}
+        )
+        return create_jsonrpc_error(
+            request_id, -32600, "Invalid Request", "Invalid JSON-RPC version"
+        )
+
+    if method is None:
+        logger.warning(
+            "Method not found in request",
+            extra={"request_keys": sorted(map(str, request))},
+        )
+        return create_jsonrpc_error(
+            request_id, -32601, "Method not found", "'method' field is missing"
+        )
+
+    try:
+        if method == "fs.listDirectory":
+            path = params.get("path", ".")
+            limit = params.get("limit")
+            cursor = params.get("cursor")
+            fields = params.get("fields")
+            sort = params.get("sort")
+            order = params.get("order", "asc")
+            if limit is not None and not is_positive_integer(limit):
+                return create_jsonrpc_error(
+                    request_id,
+                    -32602,
+                    "Invalid params",
+                    "'limit' must be a positive integer",
+                )
+            if cursor is not None and not isinstance(cursor, str):
+                return create_jsonrpc_error(
+                    request_id, -32602, "Invalid params", "'cursor' must be a string"
+                )
+            if fields is not None and not (
+                isinstance(fields, list)
+                and all(field in LISTING_FIELDS for field in fields)
+            ):
+                return create_jsonrpc_error(
+                    request_id,
+                    -32602,
+                    "Invalid params",
+                    f"'fields' must be a list of: {', '.join(LISTING_FIELDS)}",
+                )
+            if sort is not None and sort not in LISTING_SORT_KEYS:
+                return create_jsonrpc_error(
+                    request_id,
+                    -32602,
+                    "Invalid params",
+                    f"'sort' must be one of: {', '.join(LISTING_SORT_KEYS)}",
+                )
+            if order not in ("asc", "desc"):
+                return create_jsonrpc_error(
+                    request_id,
+                    -32602,
+                    "Invalid params",
+                    "'order' must be 'asc' or 'desc'",
+                )
+            descending = order == "desc"
+            if limit is not None or cursor is not None:
+                result = await io_pool.run(
+                    file_browser.list_page,
+                    path,
+                    limit or LIST_PAGE_SIZE,
+                    cursor,
+                    fields,
+                    sort or "name",
+                    descending,
+                )
+                response = {"jsonrpc": "2.0", "result": result, "id": request_id}
+                logger.info(
+                    "fs.listDirectory page successful",
+                    extra={
+                        "path": path,
+                        "result_count": len(result["files"])
+                        + len(result["directories"]),
+                        "has_more": result["next_cursor"] is not None,
+                        "duration_ms": elapsed_ms(started),
+                    },
+                )
+                return response
+            result = await io_pool.run(
+                file_browser.list_directory, path, fields, sort, descending
+            )
+            response = {"jsonrpc": "2.0", "result": result, "id": request_id}
+            logger.info(
+                "fs.listDirectory successful",
+                extra={
+                    "path": path,
+                    "result_count": len(result["files"]) + len(result["directories"]),
+                    "duration_ms": elapsed_ms(started),
+                },
+            )
+            return response
+        elif method == "fs.readFile":
+            path = params.get("path")
+            if path is None:
+                return create_jsonrpc_error(
+                    request_id,
+                    -32602,
+                    "Invalid params",
+                    "Missing 'path' parameter for fs.readFile",
+                )
+            if params.get("as_url"):
+                st = await io_pool.run(file_browser.file_stat, path)
+                result = raw_file_url(path, st)
+                logger.info(
+                    "fs.readFile URL issued",
+                    extra={
+                        "path": path,
+                        "size": st.st_size,
+                        "duration_ms": elapsed_ms(started),
+                    },
+                )
+                return {"jsonrpc": "2.0", "result": result, "id": request_id}
+            if params.get("stream"):
+                if not allow_stream:
+                    return create_jsonrpc_error(
+                        request_id,
+                        -32602,
+                        "Invalid params",
+                        "Streaming is only supported in single HTTP requests",
+                    )
+                total_size, chunks = await io_pool.run(
+                    file_browser.stream_file, path, STREAM_CHUNK_SIZE
+                )
+                logger.info(
+                    "fs.readFile stream started",
+                    extra={"path": path, "total_size": total_size},
+                )
+                return StreamResult(
+                    stream_file_frames(request_id, path, total_size, chunks)
+                )
+            if "offset" in params or "length" in params:
+                offset = params.get("offset", 0)
+                length = params.get("length")
+                if not is_integer(offset) or not (length is None or is_integer(length)):
+                    return create_jsonrpc_error(
+                        request_id,
+                        -32602,
+                        "Invalid params",
+                        "'offset' and 'length' must be integers",
+                    )
+                result = await io_pool.run(
+                    file_browser.read_file_range, path, offset, length
+                )
+                response = {"jsonrpc": "2.0", "result": result, "id": request_id}
+                logger.info(
+                    "fs.readFile range successful",
+                    extra={
+                        "path": path,
+                        "offset": result["offset"],
+                        "response_length": result["length"],
+                        "duration_ms": elapsed_ms(started),
+                    },
+                )
+                return response
+            if "if_none_match" in params or params.get("etag") or params.get("hash"):
+                if_none_match = params.get("if_none_match")
+                if not (if_none_match is None or isinstance(if_none_match, str)):
+                    return create_jsonrpc_error(
+                        request_id,
+                        -32602,
+                        "Invalid params",
+                        "'if_none_match' must be a string",
+                    )
+                result = await io_pool.run(
+                    file_browser.read_file_if_modified,
+                    path,
+                    if_none_match,
+                    bool(params.get("hash")),
+                )
+                response = {"jsonrpc": "2.0", "result": result, "id": request_id}
+                if result.get("not_modified"):
+                    logger.info(
+                        "fs.readFile not modified",
+                        extra={"path": path, "duration_ms": elapsed_ms(started)},
+                    )
+                else:
+                    logger.info(
+                        "fs.readFile successful",
+                        extra={
+                            "path": path,
+                            "response_length": len(result["content"]),
+                            "duration_ms": elapsed_ms(started),
+                        },
+                    )
+                return response
+            content = await io_pool.run(file_browser.read_file, path)
+            response = {"jsonrpc": "2.0", "result": content, "id": request_id}
+            logger.info(
+                "fs.readFile successful",
+                extra={
+                    "path": path,
+                    "response_length": len(content),
+                    "duration_ms": elapsed_ms(started),
+                },
+            )
+            return response
+        elif method == "fs.search":
+            path = params.get("path", ".")
+            pattern = params.get("pattern")
+            if pattern is None:
+                return create_jsonrpc_error(
+                    request_id,
+                    -32602,
+                    "Invalid params",
+                    "Missing 'pattern' parameter for fs.search",
+                )
+            max_results = params.get("max_results")
+            cursor = params.get("cursor")
+            max_line_length = params.get("max_line_length")
+            if not all(
+                value is None or is_positive_integer(value)
+                for value in (max_results, max_line_length)
+            ):
+                return create_jsonrpc_error(
+                    request_id,
+                    -32602,
+                    "Invalid params",
+                    "'max_results' and 'max_line_length' must be positive integers",
+                )
+            if cursor is not None and not isinstance(cursor, str):
+                return create_jsonrpc_error(
+                    request_id, -32602, "Invalid params", "'cursor' must be a string"
+                )
+            path_filter = build_path_filter(params)
+            if path_filter is None:
+                return create_jsonrpc_error(
+                    request_id,
+                    -32602,
+                    "Invalid params",
+                    "'include' and 'exclude' must be lists of glob strings",
+                )
+            skip_binary = bool(params.get("skip_binary", True))
+            regex = bool(params.get("regex", False))
+            if max_results is not None or cursor is not None:
+                page = await search_pool.run(
+                    file_browser.search_page,
+                    path,
+                    pattern,
+                    max_results or SEARCH_PAGE_SIZE,
+                    cursor,
+                    max_line_length,
+                    path_filter,
+                    skip_binary,
+                    regex,
+                )
+                response = {"jsonrpc": "2.0", "result": page, "id": request_id}
+                logger.info(
+                    "fs.search page successful",
+                    extra={
+                        "path": path,
+                        "pattern": pattern,
+                        "result_count": len(page["matches"]),
+                        "has_more": page["next_cursor"] is not None,
+                        "duration_ms": elapsed_ms(started),
+                    },
+                )
+                return response
+            results = await search_pool.run(
+                file_browser.search_in_directory,
+                path,
+                pattern,
+                max_line_length,
+                path_filter,
+                skip_binary,
+                regex,
+            )
+            response = {"jsonrpc": "2.0", "result": results, "id": request_id}
+            logger.info(
+                "fs.search successful",
+                extra={
+                    "path": path,
+                    "pattern": pattern,
+                    "result_count": len(results),
+                    "duration_ms": elapsed_ms(started),
+                },
+            )
+            return response
+        elif method == "fs.statMany":
+            paths = get_paths_param(params)
+            if paths is None:
+                return create_jsonrpc_error(
+                    request_id,
+                    -32602,
+                    "Invalid params",
+                    f"'paths' must be a list of at most {BULK_MAX_PATHS} strings",
+                )
+            entries = await io_pool.run(stat_paths, paths)
+            response = {"jsonrpc": "2.0", "result": entries, "id": request_id}
+            logger.info(
+                "fs.statMany successful",
+                extra={
+                    "path_count": len(paths),
+                    "error_count": sum("error" in entry for entry in entries),
+                    "duration_ms": elapsed_ms(started),
+                },
+            )
+            return response
+        elif method == "fs.readFiles":
+            paths = get_paths_param(params)
+            if paths is None:
+                return create_jsonrpc_error(
+                    request_id,
+                    -32602,
+                    "Invalid params",
+                    f"'paths' must be a list of at most {BULK_MAX_PATHS} strings",
+                )
+            max_bytes_per_file = params.get("max_bytes_per_file", MAX_READ_SIZE)
+            max_total_bytes = params.get("max_total_bytes", READ_FILES_MAX_BYTES)
+            if not all(
+                is_positive_integer(value)
+                for value in (max_bytes_per_file, max_total_bytes)
+            ):
+                return create_jsonrpc_error(
+                    request_id,
+                    -32602,
+                    "Invalid params",
+                    "'max_bytes_per_file' and 'max_total_bytes' must be positive "
+                    "integers",
+                )
+            entries = await read_files(
+                paths,
+                min(max_bytes_per_file, MAX_READ_SIZE),
+                min(max_total_bytes, READ_FILES_MAX_BYTES),
+            )
+            response = {"jsonrpc": "2.0", "result": entries, "id": request_id}
+            logger.info(
+                "fs.readFiles successful",
+                extra={
+                    "path_count": len(paths),
+                    "error_count": sum("error" in entry for entry in entries),
+                    "duration_ms": elapsed_ms(started),
+                },
+            )
+            return response
+        elif method == "fs.tree":
+            path = params.get("path", ".")
+            max_depth = params.get("max_depth")
+            max_entries = params.get("max_entries")
+            if not all(
+                value is None or is_positive_integer(value)
+                for value in (max_depth, max_entries)
+            ):
+                return create_jsonrpc_error(
+                    request_id,
+                    -32602,
+                    "Invalid params",
+                    "'max_depth' and 'max_entries' must be positive integers",
+                )
+            tree_format = params.get("format", "nested")
+            if tree_format not in ("nested", "flat"):
+                return create_jsonrpc_error(
+                    request_id,
+                    -32602,
+                    "Invalid params",
+                    "'format' must be 'nested' or 'flat'",
+                )
+            path_filter = build_path_filter(params)
+            if path_filter is None:
+                return create_jsonrpc_error(
+                    request_id,
+                    -32602,
+                    "Invalid params",
+                    "'include' and 'exclude' must be lists of glob strings",
+                )
+            sizes = bool(params.get("sizes", False))
+            if params.get("stream"):
+                if not allow_stream:
+                    return create_jsonrpc_error(
+                        request_id,
+                        -32602,
+                        "Invalid params",
+                        "Streaming is only supported in single HTTP requests",
+                    )
+                entries = await search_pool.run(
+                    file_browser.walk_tree, path, max_depth, path_filter, sizes
+                )
+                logger.info(
+                    "fs.tree stream started",
+                    extra={"path": path, "max_depth": max_depth},
+                )
+                return StreamResult(
+                    stream_tree_frames(request_id, path, entries, max_entries)
+                )
+            result = await search_pool.run(
+                file_browser.tree,
+                path,
+                max_depth,
+                max_entries or TREE_MAX_ENTRIES,
+                path_filter,
+                sizes,
+                tree_format == "nested",
+            )
+            response = {"jsonrpc": "2.0", "result": result, "id": request_id}
+            logger.info(
+                "fs.tree successful",
+                extra={
+                    "path": path,
+                    "max_depth": max_depth,
+                    "truncated": result["truncated"],
+                    "duration_ms": elapsed_ms(started),
+                },
+            )
+            return response
+        elif method == "fs.hash":
+            algorithm = params.get("algorithm", "sha256")
+            if algorithm not in HASH_ALGORITHMS:
+                return create_jsonrpc_error(
+                    request_id,
+                    -32602,
+                    "Invalid params",
+                    f"'algorithm' must be one of {', '.join(HASH_ALGORITHMS)}",
+                )
+            if "paths" in params:
+                paths = get_paths_param(params)
+                if paths is None:
+                    return create_jsonrpc_error(
+                        request_id,
+                        -32602,
+                        "Invalid params",
+                        f"'paths' must be a list of at most {BULK_MAX_PATHS} strings",
+                    )
+                # hashlib and zlib release the GIL, so the paths are hashed in parallel
+                entries = await asyncio.gather(
+                    *(search_pool.run(hash_entry, path, algorithm) for path in paths)
+                )
+                response = {"jsonrpc": "2.0", "result": entries, "id": request_id}
+                logger.info(
+                    "fs.hash successful",
+                    extra={
+                        "path_count": len(paths),
+                        "algorithm": algorithm,
+                        "error_count": sum("error" in entry for entry in entries),
+                        "duration_ms": elapsed_ms(started),
+                    },
+                )
+                return response
+            path = params.get("path")
+            if not isinstance(path, str):
+                return create_jsonrpc_error(
+                    request_id,
+                    -32602,
+                    "Invalid params",
+                    "fs.hash requires a 'path' string or a 'paths' list",
+                )
+            result = await search_pool.run(
+                file_browser.hash, path, algorithm, HASH_MAX_FILES
+            )
+            response = {"jsonrpc": "2.0", "result": result, "id": request_id}
+            logger.info(
+                "fs.hash successful",
+                extra={
+                    "path": path,
+                    "algorithm": algorithm,
+                    "type": result["type"],
+                    "duration_ms": elapsed_ms(started),
+                },
+            )
+            return response
+        elif method in ("fs.subscribe", "fs.unsubscribe"):
+            if session is None:
+                return create_jsonrpc_error(
+                    request_id,
+                    -32601,
+                    "Method not found",
+                    f"{method} is only available over WebSocket connections",
+                )
+            if method == "fs.unsubscribe":
+                subscription_id = params.get("subscription")
+                if not is_integer(subscription_id):
+                    return create_jsonrpc_error(
+                        request_id,
+                        -32602,
+                        "Invalid params",
+                        "'subscription' must be an integer",
+                    )
+                response = {
+                    "jsonrpc": "2.0",
+                    "result": {"unsubscribed": session.unsubscribe(subscription_id)},
+                    "id": request_id,
+                }
+                logger.info(
+                    "fs.unsubscribe successful", extra={"subscription": subscription_id}
+                )
+                return response
+            if subscriptions is None:
+                return create_jsonrpc_error(
+                    request_id,
+                    -32000,
+                    "Server error",
+                    "Change notifications are disabled (MCP_WATCHER=off)",
+                )
+            path = params.get("path", ".")
+            directory = await io_pool.run(file_browser.resolve_directory, path)
+            # In poll mode the first look at a directory reads all of its entries
+            subscription_id = await io_pool.run(
+                session.subscribe, directory, bool(params.get("recursive", False))
+            )
+            response = {
+                "jsonrpc": "2.0",
+                "result": {"subscription": subscription_id},
+                "id": request_id,
+            }
+            logger.info(
+                "fs.subscribe successful",
+                extra={"path": path, "subscription": subscription_id},
+            )
+            return response
+        else:
+            logger.warning("Method not found", extra={"method": method})
+            return create_jsonrpc_error(
+                request_id, -32601, "Method not found", f"Method not found: {method}"
+            )
+    except FileNotFoundError as e:
+        logger.error(
+            "File not found error",
+            extra={"error": str(e), "method": method, "path": params.get("path")},
+        )
+        return create_jsonrpc_error(request_id, -32000, "File not found", str(e))
+    except PermissionDeniedError as e:
+        logger.error(
+            "Permission denied error",
+            extra={"error": str(e), "method": method, "path": params.get("path")},
+        )
+        # Using a generic server error code for now
+        return create_jsonrpc_error(request_id, -32000, "Server error", str(e))
+    except ValueError as e:
+        logger.error(
+            "Value error",
+            extra={"error": str(e), "method": method, "path": params.get("path")},
+        )
+        # Using a generic server error code for now
+        return create_jsonrpc_error(request_id, -32000, "Server error", str(e))
@@ -1,94 +1,270 @@
-from fastapi import FastAPI, HTTPException, Request, status
-from fastapi.responses import JSONResponse
-from src.services.file_browser import FileBrowser, PermissionDeniedError
-from src.services.mcp_compliance import MCPCompliance
+from fastapi import (
+    FastAPI,
+    HTTPException,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from src.dispatcher import (
+    MESSAGE_BYTES_SENT,
+    ROOT_DIR,
+    Session,
+    StreamResult,
+    compressor,
+    file_browser,
+    handle_batch_request,
+    handle_message,
+    handle_rpc_request,
+    io_pool,
+    server_stats,
+    url_signer,
+)
+from src import dispatcher
+from src.services.compression import negotiate
+from src.services.file_browser import PermissionDeniedError, file_etag
+from src.utils.access_log import AccessLogMiddleware
 from src.utils.logger import get_logger
+from src.utils.file_response import FileRangeResponse, etag_matches, parse_range
+from src.utils.json_codec import dumps, loads
+from src.utils.metrics import REGISTRY
+from src.utils.profiling import start_profile
+from src.utils.timing import phase, start_timings
+import asyncio
+import hmac
+import mimetypes
 import os
+import time
+from email.utils import formatdate
 
 app = FastAPI()
+app.add_middleware(AccessLogMiddleware)
 logger = get_logger(__name__)
 
-# TODO: Make root_dir configurable (e.g., via environment variable or command line argument)
-ROOT_DIR = os.getenv("MCP_SERVER_ROOT_DIR", os.getcwd())
-file_browser = FileBrowser(root_dir=ROOT_DIR)
-mcp_compliance = MCPCompliance()
-
-def create_jsonrpc_error(request_id, code: int, message: str, data: any = None):
-    error_response = {
-        "jsonrpc": "2.0",
-        "error": {
-            "code": code,
-            "message": message
-        },
-        "id": request_id
-    }
-    if data is not None:
-        error_response["error"]["data"] = data
-    return JSONResponse(status_code=status.HTTP_200_OK, content=error_response)
+# Requests sent with an "X-MCP-Profile: <MCP_ADMIN_TOKEN>" header have their
+# worker jobs run under cProfile; without a token, profiling is disabled.
+# Profiles are also written to MCP_PROFILE_DIR when it is set.
+ADMIN_TOKEN = os.getenv("MCP_ADMIN_TOKEN")
+PROFILE_DIR = os.getenv("MCP_PROFILE_DIR")
+PROFILE_REPORT_LINES = 40
+# Requests handled at the same time on one WebSocket; the socket is not read while
+# this many are in flight
+WS_MAX_IN_FLIGHT = int(os.getenv("MCP_WS_MAX_IN_FLIGHT", "64"))
+# Browsers do not apply CORS to WebSockets, so any page could otherwise open /ws.
+# Connections that send an Origin header (browsers always do) are refused unless
+# it is listed in the comma-separated MCP_WS_ALLOWED_ORIGINS.
+WS_ALLOWED_ORIGINS = frozenset(
+    origin.strip().rstrip("/").lower()
+    for origin in os.getenv("MCP_WS_ALLOWED_ORIGINS", "").split(",")
+    if origin.strip()
+)
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+@app.on_event("startup")
+def start_server():
+    dispatcher.start()
 
+@app.on_event("shutdown")
+def shutdown_server():
+    dispatcher.shutdown()
 
 @app.get("/")
 async def root():
     logger.info("Root endpoint accessed", extra={"endpoint": "/"})
     return {"message": "MCP Server is running. Root directory: " + ROOT_DIR}
 
+@app.get("/stats")
+async def stats():
+    return server_stats()
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.api_route("/raw/{path:path}", methods=["GET", "HEAD"])
+async def raw_file(request: Request, path: str, expires: int = 0, signature: str = ""):
+    """Raw file content for URLs handed out by fs.readFile with as_url."""
+    if not url_signer.verify(path, expires, signature):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or expired signature"
+        )
+    try:
+        fd, st = await io_pool.run(file_browser.open_file, path)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except (PermissionDeniedError, ValueError) as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+
+    etag = file_etag(st)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": f"private, max-age={max(expires - int(time.time()), 0)}",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        os.close(fd)
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range != etag:
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, st.st_size)
+    except ValueError:
+        os.close(fd)
+        headers["Content-Range"] = f"bytes */{st.st_size}"
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE, headers=headers
+        )
+
+    status_code = status.HTTP_200_OK
+    start, end = 0, st.st_size
+    if byte_range is not None:
+        start, end = byte_range
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{st.st_size}"
+    logger.info(
+        "Raw file served",
+        extra={
+            "path": path,
+            "offset": start,
+            "length": end - start,
+            "status_code": status_code,
+        },
+    )
+    return FileRangeResponse(
+        fd, start, end - start, io_pool.run, status_code, headers,
+        media_type=mimetypes.guess_type(path)[0] or "application/octet-stream",
+        send_body=request.method != "HEAD",
+    )
+
 @app.post("/")
-async def rpc_endpoint(request: dict):
-    logger.info("Incoming RPC request", extra={"request_body": request})
+async def rpc_endpoint(http_request: Request):
+    timings = start_timings()
+    # The body is parsed here rather than by a FastAPI body parameter, which would
+    # validate it and copy every string in it once more
+    body = await http_request.body()
+    with phase("parse"):
+        try:
+            request = loads(body)
+        except ValueError:
+            request = None
+    if not isinstance(request, (dict, list)):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Request body must be a JSON object or array",
+        )
+    profile = None
+    profile_token = http_request.headers.get("x-mcp-profile")
+    if profile_token is not None:
+        if not ADMIN_TOKEN or not hmac.compare_digest(
+            profile_token.encode(), ADMIN_TOKEN.encode()
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Profiling requires a valid admin token",
+            )
+        # The worker pool profiles this request's jobs
+        profile = start_profile()
+
+    if isinstance(request, list):
+        response = await handle_batch_request(request)
+    else:
+        response = await handle_rpc_request(request)
+
+    headers = {}
+    if profile is not None:
+        profile_path = (
+            await io_pool.run(profile.dump, PROFILE_DIR) if PROFILE_DIR else None
+        )
+        if profile_path:
+            headers["X-MCP-Profile-Path"] = profile_path
+        if isinstance(response, dict):
+            report = profile.report(PROFILE_REPORT_LINES)
+            response.setdefault("_meta", {})["profile"] = report
+        logger.info("Profiled request", extra={"profile_path": profile_path})
 
-    request_id = request.get("id") # Get ID early for error responses
+    if isinstance(response, StreamResult):
+        response = StreamingResponse(response.frames, media_type=response.media_type)
+    if not isinstance(response, Response):
+        content = response
+        with phase("serialize"):
+            response = FastJSONResponse(content)
+        encoding = (
+            negotiate(http_request.headers.get("accept-encoding"))
+            if compressor is not None
+            else None
+        )
+        if encoding is not None and len(response.body) >= compressor.min_bytes:
+            with phase("compress"):
+                body = await io_pool.run(
+                    compressor.compress, content, response.body, encoding
+                )
+            response = Response(body, media_type="application/json")
+            headers["Content-Encoding"] = encoding
+        if compressor is not None:
+            headers["Vary"] = "Accept-Encoding"
+    response.headers.update(headers)
+    response.headers["Server-Timing"] = timings.server_timing()
+    return response
 
-    if not mcp_compliance.check_compliance(request):
-        logger.warning("MCP compliance check failed", extra={"request_body": request})
-        return create_jsonrpc_error(request_id, -32600, "Invalid Request", "Request does not comply with MCP specification")
+@app.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket):
+    """JSON-RPC over a WebSocket: one message per request or batch.
 
-    jsonrpc_version = request.get("jsonrpc")
-    method = request.get("method")
-    logger.info("Requested service method", extra={"method": method})
-    params = request.get("params", {})
-    
+    Requests are handled concurrently and answered as they complete, so
+    responses may arrive out of order; clients match them by id. The
+    server also pushes fs.changed notifications for fs.subscribe.
+    """
+    origin = websocket.headers.get("origin")
+    if origin is not None and origin.rstrip("/").lower() not in WS_ALLOWED_ORIGINS:
+        logger.warning("WebSocket origin rejected", extra={"origin": origin})
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    send_lock = asyncio.Lock()
 
-    if jsonrpc_version != "2.0":
-        logger.warning("Invalid JSON-RPC version", extra={"jsonrpc_version": jsonrpc_version})
-        return create_jsonrpc_error(request_id, -32600, "Invalid Request", "Invalid JSON-RPC version")
+    async def send(message):
+        data = dumps(message)
+        async with send_lock:
+            await websocket.send_text(data.decode("utf-8"))
+        MESSAGE_BYTES_SENT.inc("websocket", amount=len(data))
 
-    if method is None:
-        logger.warning("Method not found in request", extra={"request_body": request})
-        return create_jsonrpc_error(request_id, -32601, "Method not found", "'method' field is missing")
+    session = Session(send)
+    in_flight = asyncio.Semaphore(WS_MAX_IN_FLIGHT)
+    tasks = set()
+
+    async def respond(data):
+        try:
+            await send(await handle_message(data, session))
+        except (WebSocketDisconnect, RuntimeError, OSError) as e:
+            logger.info(
+                "WebSocket closed before a response was sent", extra={"error": str(e)}
+            )
+        finally:
+            in_flight.release()
 
     try:
-        if method == "fs.listDirectory":
-            path = params.get("path", ".")
-            result = file_browser.list_directory(path)
-            response = {"jsonrpc": "2.0", "result": result, "id": request_id}
-            logger.info("fs.listDirectory successful", extra={"path": path, "response": response})
-            return response
-        elif method == "fs.readFile":
-            path = params.get("path")
-            if path is None:
-                return create_jsonrpc_error(request_id, -32602, "Invalid params", "Missing 'path' parameter for fs.readFile")
-            content = file_browser.read_file(path)
-            response = {"jsonrpc": "2.0", "result": content, "id": request_id}
-            logger.info("fs.readFile successful", extra={"path": path, "response_length": len(content)}) # Log length for potentially large content
-            return response
-        elif method == "fs.search":
-            path = params.get("path", ".")
-            pattern = params.get("pattern")
-            if pattern is None:
-                return create_jsonrpc_error(request_id, -32602, "Invalid params", "Missing 'pattern' parameter for fs.search")
-            results = file_browser.search_in_directory(path, pattern)
-            response = {"jsonrpc": "2.0", "result": results, "id": request_id}
-            logger.info("fs.search successful", extra={"path": path, "pattern": pattern, "result_count": len(results)})
-            return response
-        else:
-            logger.warning("Method not found", extra={"method": method})
-            return create_jsonrpc_error(request_id, -32601, "Method not found", f"Method not found: {method}")
-    except FileNotFoundError as e:
-        logger.critical(f"THIS IS THE REAL ERROR: {e}")
-        return create_jsonrpc_error(request_id, -32000, "File not found", str(e))
-    except PermissionDeniedError as e:
-        logger.error("Permission denied error", extra={"error": str(e), "method": method, "path": params.get("path")})
-        return create_jsonrpc_error(request_id, -32000, "Server error", str(e)) # Using a generic server error code for now
-    except ValueError as e:
-        logger.error("Value error", extra={"error": str(e), "method": method, "path": params.get("path")})
-        return create_jsonrpc_error(request_id, -32000, "Server error", str(e)) # Using a generic server error code for now
+        while True:
+            await in_flight.acquire()
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            data = message.get("text")
+            if data is None:
+                data = message.get("bytes") or b""
+            task = asyncio.ensure_future(respond(data))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    finally:
+        session.close()
+        for task in tasks:
+            task.cancel()
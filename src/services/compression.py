@@ -0,0 +1,126 @@
+import gzip
+import hashlib
+import struct
+import zlib
+from typing import NamedTuple, Optional
+
+from src.services.content_cache import ContentCache
+from src.utils.json_codec import dumps
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is optional
+    zstandard = None
+
+# Header of a gzip member without file name or timestamp (RFC 1952)
+GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+
+def supported_encodings() -> tuple:
+    """Content codings the server can produce, in order of preference."""
+    return ("zstd", "gzip") if zstandard is not None else ("gzip",)
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the preferred supported coding from an Accept-Encoding header, or None."""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip().lower()] = weight
+    best = None
+    for coding in supported_encodings():
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > 0 and (best is None or weight > best[1]):
+            best = (coding, weight)
+    return best[0] if best else None
+
+class DeflatedSegment(NamedTuple):
+    """Raw deflate data ending on a byte boundary.
+
+    Carries the CRC-32 and size of its input.
+    """
+
+    data: bytes
+    crc: int
+    size: int
+
+def deflate(data: bytes, level: int, final: bool) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    # A sync flush ends the segment on a byte boundary without marking the last
+    # block, so further deflate data can be appended to it
+    mode = zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH
+    return compressor.compress(data) + compressor.flush(mode)
+
+class ResponseCompressor:
+    """Compresses JSON-RPC response bodies.
+
+    Meant to run on a worker thread. Responses whose result is one large
+    string (fs.readFile) are gzipped in two parts: the head up to the end of
+    the result, which is cached by content digest, and the short tail with
+    the id. Repeated reads of the same content then only deflate the tail.
+    """
+
+    def __init__(
+        self,
+        min_bytes: int,
+        gzip_level: int = 6,
+        zstd_level: int = 3,
+        cache_max_bytes: int = 0,
+    ):
+        self.min_bytes = min_bytes
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+        self.cache = ContentCache(cache_max_bytes) if cache_max_bytes > 0 else None
+
+    def compress(self, content, body: bytes, encoding: str) -> bytes:
+        """Compress body, the encoded form of content, with the given coding."""
+        if encoding == "zstd":
+            return zstandard.ZstdCompressor(level=self.zstd_level).compress(body)
+        if self.cache is not None and self._has_large_result(content):
+            return self._gzip_with_cached_head(content)
+        return gzip.compress(body, self.gzip_level, mtime=0)
+
+    def _has_large_result(self, content) -> bool:
+        return (
+            isinstance(content, dict)
+            and list(content)[:2] == ["jsonrpc", "result"]
+            and isinstance(content["result"], str)
+            and len(content["result"]) >= self.min_bytes
+        )
+
+    def _gzip_with_cached_head(self, content: dict) -> bytes:
+        head = b'{"jsonrpc":' + dumps(content["jsonrpc"])
+        head += b',"result":' + dumps(content["result"])
+        rest = {
+            key: value
+            for key, value in content.items()
+            if key not in ("jsonrpc", "result")
+        }
+        tail = b"," + dumps(rest)[1:] if rest else b"}"
+
+        key = ("gzip", self.gzip_level, hashlib.blake2b(head, digest_size=16).digest())
+        segment = self.cache.get(key)
+        if segment is None:
+            segment = DeflatedSegment(
+                deflate(head, self.gzip_level, final=False), zlib.crc32(head), len(head)
+            )
+            self.cache.put(key, segment, len(segment.data))
+
+        crc = zlib.crc32(tail, segment.crc)
+        size = (segment.size + len(tail)) & 0xFFFFFFFF
+        return (
+            GZIP_HEADER
+            + segment.data
+            + deflate(tail, self.gzip_level, final=True)
+            + struct.pack("<II", crc, size)
+        )
+
+    def stats(self) -> Optional[dict]:
+        return self.cache.stats() if self.cache is not None else None
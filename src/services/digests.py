@@ -0,0 +1,188 @@
+"""File digests for fs.hash, with a persistent cache.
+
+Files are hashed in fixed-size chunks; hashlib and zlib release the GIL
+while they process a chunk, so several worker threads can hash at once.
+Digests are stored in SQLite keyed on (device, inode, algorithm) and are
+only reused while the file's mtime, ctime and size are unchanged, so a
+repeated query costs a single stat.
+"""
+import hashlib
+import os
+import sqlite3
+import stat
+import threading
+import zlib
+from typing import Optional
+
+from src.utils.logger import get_logger
+
+# crc32 is not a cryptographic hash, but it is several times faster than sha256
+ALGORITHMS = ("sha256", "blake2b", "crc32")
+HASH_CHUNK_SIZE = 1024 * 1024
+# Digests written between two commits of the digest cache
+PUT_BATCH_SIZE = 1000
+
+logger = get_logger(__name__)
+
+class _Crc32:
+    def __init__(self):
+        self.value = 0
+
+    def update(self, data):
+        self.value = zlib.crc32(data, self.value)
+
+    def hexdigest(self) -> str:
+        return f"{self.value:08x}"
+
+def new_hash(algorithm: str):
+    if algorithm == "crc32":
+        return _Crc32()
+    if algorithm == "blake2b":
+        return hashlib.blake2b(digest_size=32)
+    if algorithm == "sha256":
+        return hashlib.sha256()
+    raise ValueError(f"Unsupported hash algorithm: {algorithm}")
+
+def hash_file(full_path: str, algorithm: str, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    hasher = new_hash(algorithm)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(full_path, "rb", buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            hasher.update(view[:read])
+    return hasher.hexdigest()
+
+class DigestStore:
+    """Digests of files keyed on their identity; in memory unless a path is given.
+
+    The database is opened on first use. If the file cannot be created, is
+    not a usable SQLite database or its directory is not a private one of
+    the current user, digests are kept in memory instead, so a bad cache
+    location never stops the server. Writes are committed
+    in batches by flush() (or every PUT_BATCH_SIZE digests).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or ":memory:"
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pending = 0
+        self._hits = 0
+        self._misses = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            try:
+                self._conn = self._open(self.path)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(
+                    "Digest cache unavailable, keeping digests in memory",
+                    extra={"path": self.path, "error": str(e)},
+                )
+                self.path = ":memory:"
+                self._conn = self._open(self.path)
+        return self._conn
+
+    @staticmethod
+    def _open(path: str) -> sqlite3.Connection:
+        if path != ":memory:":
+            DigestStore._check_directory(os.path.dirname(os.path.abspath(path)))
+        conn = sqlite3.connect(path, check_same_thread=False)
+        try:
+            if path != ":memory:":
+                # Losing the last few digests in a crash only costs re-hashing them
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS digests (
+                    dev INTEGER, ino INTEGER, algorithm TEXT,
+                    mtime_ns INTEGER, ctime_ns INTEGER, size INTEGER, digest TEXT,
+                    PRIMARY KEY (dev, ino, algorithm)
+                )
+                """
+            )
+            conn.commit()
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+    def get(self, st, algorithm: str) -> Optional[str]:
+        with self._lock:
+            try:
+                row = self._connection().execute(
+                    "SELECT mtime_ns, ctime_ns, size, digest FROM digests"
+                    " WHERE dev = ? AND ino = ? AND algorithm = ?",
+                    (st.st_dev, st.st_ino, algorithm),
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning("Digest cache lookup failed", extra={"error": str(e)})
+                row = None
+            identity = (st.st_mtime_ns, st.st_ctime_ns, st.st_size)
+            if row is not None and row[:3] == identity:
+                self._hits += 1
+                return row[3]
+            self._misses += 1
+            return None
+
+    def put(self, st, algorithm: str, digest: str):
+        with self._lock:
+            try:
+                self._connection().execute(
+                    "INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        st.st_dev, st.st_ino, algorithm,
+                        st.st_mtime_ns, st.st_ctime_ns, st.st_size, digest,
+                    ),
+                )
+                self._pending += 1
+                if self._pending >= PUT_BATCH_SIZE:
+                    self._commit_locked()
+            except sqlite3.Error as e:
+                logger.warning("Digest cache update failed", extra={"error": str(e)})
+
+    @staticmethod
+    def _check_directory(directory: str):
+        """Create directory (private to the user) and make sure it is theirs.
+
+        The default location may be under a shared temporary directory, where
+        another user could create it first and plant digests.
+        """
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        st = os.lstat(directory)
+        if stat.S_ISLNK(st.st_mode):
+            raise OSError(f"Digest cache directory is a symlink: {directory}")
+        if hasattr(os, "getuid") and st.st_uid != os.getuid():
+            raise OSError(
+                f"Digest cache directory belongs to another user: {directory}"
+            )
+
+    def flush(self):
+        """Commit the digests stored since the last commit."""
+        with self._lock:
+            try:
+                self._commit_locked()
+            except sqlite3.Error as e:
+                logger.warning("Digest cache update failed", extra={"error": str(e)})
+
+    def _commit_locked(self):
+        if self._pending and self._conn is not None:
+            self._conn.commit()
+        self._pending = 0
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._commit_locked()
+                finally:
+                    self._conn.close()
+                    self._conn = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"path": self.path, "hits": self._hits, "misses": self._misses}
@@ -1,95 +1,1053 @@
 import os
 import datetime
-from src.utils.security import is_path_safe
 import base64
+import hashlib
+import heapq
+import itertools
+import json
+import re
+from operator import itemgetter
+from stat import S_ISDIR, S_ISREG
+from typing import Optional
+from src.services.content_cache import ContentCache
+from src.services.digests import DigestStore, hash_file, new_hash
+from src.services.search_engine import ParallelSearchEngine, scan_file
+from src.services.search_index import TrigramIndex
+from src.services.watcher import DirectoryWatcher
+from src.utils.path_filter import PathFilter
+from src.utils.path_resolver import PathResolver
+from src.utils.metrics import REGISTRY
+from src.utils.timing import phase
+
+# Largest amount of file content returned by a single read
+MAX_READ_SIZE = 10 * 1024 * 1024
+# Default number of bytes read per chunk when streaming a file
+STREAM_CHUNK_SIZE = 64 * 1024
+# Keys of a file entry returned by list_directory; directories only have name and path
+LISTING_FIELDS = ("name", "path", "size", "modified_date", "created_date")
+LISTING_STAT_FIELDS = ("size", "modified_date", "created_date")
+LISTING_SORT_KEYS = ("name", "size", "modified_date")
+
+# fs.search scans are not counted: they run in worker processes and stop at the
+# first page of matches; mcp_search_files_scanned_total counts the files instead
+FILE_BYTES_READ = REGISTRY.counter(
+    "mcp_file_bytes_read_total",
+    "Bytes of file content read from disk (fs.search scans excluded)",
+    ("operation",),
+)
+SEARCH_FILES_SCANNED = REGISTRY.counter(
+    "mcp_search_files_scanned_total", "Files handed to fs.search for scanning"
+)
+
+def file_etag(st: os.stat_result) -> str:
+    """An HTTP entity tag that changes whenever the file is replaced or rewritten."""
+    return f'"{st.st_ino:x}-{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+def _utf8_sequence_length(lead_byte: int) -> int:
+    if lead_byte < 0xC0:
+        return 1
+    if lead_byte < 0xE0:
+        return 2
+    if lead_byte < 0xF0:
+        return 3
+    return 4
+
+def _utf8_leading_continuations(data: bytes) -> int:
+    """Number of UTF-8 continuation bytes (at most 3) at the start of data."""
+    count = 0
+    while count < min(3, len(data)) and 0x80 <= data[count] <= 0xBF:
+        count += 1
+    return count
+
+def _utf8_complete_length(data: bytes) -> int:
+    """Length of the longest prefix of data not ending inside a multibyte character."""
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte < 0x80:
+            return len(data)
+        if byte >= 0xC0:
+            if back >= _utf8_sequence_length(byte):
+                return len(data)
+            return len(data) - back
+    return len(data)
+
+def _format_timestamp(timestamp: float) -> str:
+    return datetime.datetime.fromtimestamp(timestamp).isoformat() + "Z"
 
 class PermissionDeniedError(Exception):
     """Custom exception for permission denied errors."""
     pass
 
 class FileBrowser:
-    def __init__(self, root_dir: str):
+    def __init__(
+        self,
+        root_dir: str,
+        cache_max_bytes: int = 0,
+        search_index_path: Optional[str] = None,
+        search_processes: int = 0,
+        watcher: Optional[DirectoryWatcher] = None,
+        listing_cache_max_bytes: int = 0,
+        digest_cache_path: Optional[str] = None,
+    ):
         self.root_dir = os.path.abspath(root_dir)
+        # Decoded (or base64 encoded) results of read_file, keyed on the file's
+        # stat identity
+        self.content_cache = (
+            ContentCache(cache_max_bytes) if cache_max_bytes > 0 else None
+        )
+        self.search_index = (
+            TrigramIndex(search_index_path, self.root_dir)
+            if search_index_path
+            else None
+        )
+        # Digests computed by hash(), in SQLite (":memory:" keeps them for the life
+        # of the process)
+        self.digest_store = (
+            DigestStore(digest_cache_path) if digest_cache_path else None
+        )
+        self.search_engine = (
+            ParallelSearchEngine(search_processes) if search_processes > 0 else None
+        )
+        self.path_resolver = PathResolver(self.root_dir, watcher)
+        # list_directory results, valid for as long as the watcher reports the same
+        # generation
+        self.watcher = watcher
+        self.listing_cache = None
+        if watcher is not None and listing_cache_max_bytes > 0:
+            self.listing_cache = ContentCache(listing_cache_max_bytes)
+            watcher.subscribe(self._invalidate_listings)
+
+    def _invalidate_listings(self, paths):
+        if paths is None:
+            self.listing_cache.clear()
+            return
+        for changed in paths:
+            self.listing_cache.discard(changed)
 
     def _resolve_path(self, path: str) -> str:
-        full_path = os.path.abspath(os.path.join(self.root_dir, path))
-        if not is_path_safe(self.root_dir, full_path):
-            raise ValueError("Attempted to access path outside root directory")
+        with phase("resolve"):
+            return self.path_resolver.resolve(path)
+
+    def resolve_directory(self, path: str) -> str:
+        """The absolute path of a directory below the root."""
+        full_path = self._resolve_path(path)
+        if not os.path.isdir(full_path):
+            raise FileNotFoundError(f"Directory not found: {path}")
         return full_path
 
-    def list_directory(self, path: str):
+    def list_directory(
+        self,
+        path: str,
+        fields: Optional[list] = None,
+        sort: Optional[str] = None,
+        descending: bool = False,
+    ):
+        """List a directory, in scandir order unless sort is given.
+
+        ``fields`` restricts the keys of each entry; when none of size and
+        the dates are requested (and sorting does not need them) entries
+        are never stat'ed.
+        """
         full_path = self._resolve_path(path)
         if not os.path.isdir(full_path):
             raise FileNotFoundError(f"Directory not found: {path}")
+        self._check_listing_options(fields, sort)
 
-        files = []
-        directories = []
+        generation = None
+        # Only inotify reports changes as they happen; a polled generation can be
+        # up to MCP_WATCHER_POLL_INTERVAL behind the directory
+        cacheable = fields is None and sort is None and self.watcher is not None
+        if (
+            self.listing_cache is not None
+            and cacheable
+            and self.watcher.backend == "inotify"
+        ):
+            # Read the generation before listing, so a change made while listing
+            # is never cached as current
+            generation = self.watcher.generation(full_path)
+            cached = self.listing_cache.get(full_path)
+            if (
+                cached is not None
+                and generation is not None
+                and cached[0] == generation
+                and cached[1] == path
+            ):
+                return cached[2]
+
+        with phase("list"):
+            entries = self._iter_listing(full_path, path, fields, sort)
+            if sort is not None:
+                entries = sorted(entries, key=itemgetter(0), reverse=descending)
+            result = self._format_listing(path, entries, fields)
+        if generation is not None:
+            size = sum(
+                128 + 2 * len(entry["path"])
+                for entries in result.values()
+                for entry in entries
+            )
+            self.listing_cache.put(full_path, (generation, path, result), size)
+        return result
+
+    def list_page(
+        self,
+        path: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[list] = None,
+        sort: str = "name",
+        descending: bool = False,
+    ):
+        """Return at most limit entries in sort order and a cursor for the next page.
 
+        The directory is streamed from scandir into a heap of limit + 1
+        entries, so memory is bounded by the page size however large the
+        directory is. Pages continue after the sort key of the last entry,
+        which keeps them consistent while entries are added or removed.
+        """
+        if limit < 1:
+            raise ValueError("limit must be a positive integer")
+        full_path = self._resolve_path(path)
+        if not os.path.isdir(full_path):
+            raise FileNotFoundError(f"Directory not found: {path}")
+        self._check_listing_options(fields, sort)
+
+        entries = self._iter_listing(full_path, path, fields, sort)
+        if cursor:
+            after = self._decode_listing_cursor(cursor, path, sort, descending)
+            if descending:
+                entries = (entry for entry in entries if entry[0] < after)
+            else:
+                entries = (entry for entry in entries if entry[0] > after)
+        select = heapq.nlargest if descending else heapq.nsmallest
+        with phase("list"):
+            page = select(limit + 1, entries, key=itemgetter(0))
+
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = self._encode_listing_cursor(
+                path, sort, descending, page[-1][0]
+            )
+        result = self._format_listing(path, page, fields)
+        result["next_cursor"] = next_cursor
+        return result
+
+    def _check_listing_options(self, fields: Optional[list], sort: Optional[str]):
+        if fields is not None:
+            unknown = [field for field in fields if field not in LISTING_FIELDS]
+            if unknown:
+                raise ValueError(f"Unknown listing fields: {', '.join(unknown)}")
+        if sort is not None and sort not in LISTING_SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort}")
+
+    def _iter_listing(
+        self, full_path: str, path: str, fields: Optional[list], sort: Optional[str]
+    ):
+        """Yield (sort_key, name, is_file, stat) for each file and directory.
+
+        Entries are only stat'ed if needed.
+        """
+        stat_files = (
+            fields is None
+            or any(field in LISTING_STAT_FIELDS for field in fields)
+            or sort in ("size", "modified_date")
+        )
+        stat_directories = sort == "modified_date"
         try:
             with os.scandir(full_path) as entries:
                 for entry in entries:
-                    entry_path = os.path.join(path, entry.name)
-                    if entry.is_file():
-                        stat = entry.stat()
-                        files.append({
-                            "name": entry.name,
-                            "path": entry_path,
-                            "size": stat.st_size,
-                            "modified_date": datetime.datetime.fromtimestamp(stat.st_mtime).isoformat() + "Z",
-                            "created_date": datetime.datetime.fromtimestamp(stat.st_ctime).isoformat() + "Z"
-                        })
-                    elif entry.is_dir():
-                        directories.append({
-                            "name": entry.name,
-                            "path": entry_path
-                        })
-            return {"files": files, "directories": directories}
+                    is_file = entry.is_file()
+                    if not is_file and not entry.is_dir():
+                        continue
+                    st = None
+                    if stat_files if is_file else stat_directories:
+                        try:
+                            st = entry.stat()
+                        except FileNotFoundError:
+                            # Removed since scandir returned it
+                            continue
+                    if sort == "size":
+                        key = (st.st_size if is_file else 0, entry.name)
+                    elif sort == "modified_date":
+                        key = (st.st_mtime_ns, entry.name)
+                    else:
+                        key = (entry.name,)
+                    yield key, entry.name, is_file, st
         except PermissionError:
             raise PermissionDeniedError(f"Permission denied to list directory: {path}")
 
-    def read_file(self, path: str):
+    def _format_listing(self, path: str, entries, fields: Optional[list]) -> dict:
+        wanted = set(LISTING_FIELDS if fields is None else fields)
+        files = []
+        directories = []
+        for _, name, is_file, st in entries:
+            record = {}
+            if "name" in wanted:
+                record["name"] = name
+            if "path" in wanted:
+                record["path"] = os.path.join(path, name)
+            if not is_file:
+                directories.append(record)
+                continue
+            if "size" in wanted:
+                record["size"] = st.st_size
+            if "modified_date" in wanted:
+                record["modified_date"] = _format_timestamp(st.st_mtime)
+            if "created_date" in wanted:
+                record["created_date"] = _format_timestamp(st.st_ctime)
+            files.append(record)
+        return {"files": files, "directories": directories}
+
+    def _encode_listing_cursor(
+        self, path: str, sort: str, descending: bool, key: tuple
+    ) -> str:
+        token = {
+            "q": self._listing_cursor_scope(path, sort, descending),
+            "key": list(key),
+        }
+        data = json.dumps(token).encode("utf-8")
+        return base64.urlsafe_b64encode(data).decode("ascii")
+
+    def _decode_listing_cursor(
+        self, cursor: str, path: str, sort: str, descending: bool
+    ) -> tuple:
+        try:
+            token = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            if token["q"] != self._listing_cursor_scope(path, sort, descending):
+                raise ValueError
+            key = tuple(token["key"])
+            expected = (str,) if sort == "name" else (int, str)
+            well_typed = all(isinstance(v, kind) for v, kind in zip(key, expected))
+            if len(key) != len(expected) or not well_typed:
+                raise ValueError
+            return key
+        except (ValueError, KeyError, TypeError, UnicodeEncodeError):
+            raise ValueError("Invalid listing cursor")
+
+    def _listing_cursor_scope(self, path: str, sort: str, descending: bool) -> str:
+        # Ties a cursor to the listing (directory and order) it came from
+        data = f"{path}\0{sort}\0{int(descending)}".encode("utf-8")
+        return hashlib.sha256(data).hexdigest()[:16]
+
+    def stat(self, path: str) -> dict:
+        """Metadata of a file or directory, from a single stat call."""
         full_path = self._resolve_path(path)
-        if not os.path.isfile(full_path):
+        try:
+            with phase("stat"):
+                st = os.stat(full_path)
+        except PermissionError:
+            raise PermissionDeniedError(f"Permission denied to access path: {path}")
+        except OSError:
+            raise FileNotFoundError(f"Path not found: {path}")
+        if S_ISREG(st.st_mode):
+            kind = "file"
+        elif S_ISDIR(st.st_mode):
+            kind = "directory"
+        else:
+            kind = "other"
+        return {
+            "type": kind,
+            "size": st.st_size,
+            "modified_date": _format_timestamp(st.st_mtime),
+            "created_date": _format_timestamp(st.st_ctime),
+        }
+
+    def file_stat(self, path: str) -> os.stat_result:
+        """The stat result of a regular file."""
+        return self._stat_file(path)[1]
+
+    def _stat_file(self, path: str) -> tuple:
+        full_path = self._resolve_path(path)
+        try:
+            with phase("stat"):
+                st = os.stat(full_path)
+        except OSError:
+            st = None
+        if st is None or not S_ISREG(st.st_mode):
+            raise FileNotFoundError(f"File not found: {path}")
+        return full_path, st
+
+    def open_file(self, path: str):
+        """Open a regular file for raw reads and return its descriptor and fstat result.
+
+        The caller owns the descriptor. Validators computed from the fstat
+        result describe exactly the file that was opened.
+        """
+        full_path = self._resolve_path(path)
+        try:
+            # O_NONBLOCK keeps a FIFO from blocking the open; it is rejected below
+            fd = os.open(full_path, os.O_RDONLY | getattr(os, "O_NONBLOCK", 0))
+        except PermissionError:
+            raise PermissionDeniedError(f"Permission denied to read file: {path}")
+        except OSError:
             raise FileNotFoundError(f"File not found: {path}")
-        
-        file_size = os.path.getsize(full_path)
-        if file_size > 10 * 1024 * 1024:  # 10 MB limit
+        st = os.fstat(fd)
+        if not S_ISREG(st.st_mode):
+            os.close(fd)
+            raise FileNotFoundError(f"File not found: {path}")
+        return fd, st
+
+    def read_file(self, path: str):
+        full_path, st = self._stat_file(path)
+        return self._read_content(path, full_path, st)[0]
+
+    def read_file_if_modified(
+        self, path: str, if_none_match: Optional[str] = None, with_hash: bool = False
+    ) -> dict:
+        """Read a file unless it still matches if_none_match.
+
+        if_none_match is either an etag from an earlier read, checked with a
+        single stat and without opening the file, or a "sha256:<hex>" content
+        digest, which matches a file that was touched but not changed.
+        """
+        full_path, st = self._stat_file(path)
+        etag = file_etag(st)
+        digest = None
+        if if_none_match is not None and if_none_match.startswith("sha256:"):
+            digest = "sha256:" + self.file_digest(path)
+            if digest == if_none_match:
+                return {
+                    "not_modified": True,
+                    "etag": etag,
+                    "sha256": digest[7:],
+                    "size": st.st_size,
+                }
+        elif if_none_match == etag:
+            return {"not_modified": True, "etag": etag, "size": st.st_size}
+
+        content, encoding = self._read_content(path, full_path, st)
+        result = {
+            "content": content,
+            "encoding": encoding,
+            "etag": etag,
+            "size": st.st_size,
+        }
+        if with_hash:
+            result["sha256"] = digest[7:] if digest else self.file_digest(path)
+        return result
+
+    def file_digest(self, path: str) -> str:
+        """SHA-256 of a file's bytes."""
+        full_path, st = self._stat_file(path)
+        return self._file_digest(path, full_path, st, "sha256")
+
+    def hash(
+        self, path: str, algorithm: str = "sha256", max_files: Optional[int] = None
+    ) -> dict:
+        """Digest of a file, or a Merkle digest of everything below a directory.
+
+        A directory digest hashes one line per entry, in name order: the
+        entry's type, its digest and its name. Subdirectories contribute
+        their own directory digest and symlinks the text of their target
+        (they are not followed), so the digest changes whenever anything
+        below the directory is added, removed, renamed or modified.
+        """
+        new_hash(algorithm)
+        full_path = self._resolve_path(path)
+        try:
+            with phase("stat"):
+                st = os.stat(full_path)
+        except PermissionError:
+            raise PermissionDeniedError(f"Permission denied to access path: {path}")
+        except OSError:
+            raise FileNotFoundError(f"Path not found: {path}")
+        try:
+            if S_ISREG(st.st_mode):
+                digest = self._file_digest(path, full_path, st, algorithm)
+                return {
+                    "type": "file",
+                    "algorithm": algorithm,
+                    "digest": digest,
+                    "size": st.st_size,
+                }
+            if not S_ISDIR(st.st_mode):
+                raise FileNotFoundError(f"Path not found: {path}")
+            file_count = [0]
+            digest = self._directory_digest(
+                path, full_path, algorithm, file_count, max_files
+            )
+            return {
+                "type": "directory",
+                "algorithm": algorithm,
+                "digest": digest,
+                "files": file_count[0],
+            }
+        finally:
+            # One commit for all the digests a call computed
+            if self.digest_store is not None:
+                self.digest_store.flush()
+
+    def _file_digest(
+        self, path: str, full_path: str, st: os.stat_result, algorithm: str
+    ) -> str:
+        if self.digest_store is not None:
+            digest = self.digest_store.get(st, algorithm)
+            if digest is not None:
+                return digest
+        try:
+            with phase("hash"):
+                digest = hash_file(full_path, algorithm)
+                after = os.stat(full_path)
+        except PermissionError:
+            raise PermissionDeniedError(f"Permission denied to read file: {path}")
+        FILE_BYTES_READ.inc("hash", amount=after.st_size)
+        # Only remember digests of files that did not change while they were hashed
+        before = (st.st_mtime_ns, st.st_ctime_ns, st.st_size)
+        unchanged = (after.st_mtime_ns, after.st_ctime_ns, after.st_size) == before
+        if self.digest_store is not None and unchanged:
+            self.digest_store.put(st, algorithm, digest)
+        return digest
+
+    def _directory_digest(
+        self,
+        path: str,
+        full_path: str,
+        algorithm: str,
+        file_count: list,
+        max_files: Optional[int],
+    ) -> str:
+        hasher = new_hash(algorithm)
+        try:
+            with os.scandir(full_path) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except PermissionError:
+            raise PermissionDeniedError(
+                f"Permission denied to access directory: {path}"
+            )
+        for entry in entries:
+            entry_path = os.path.join(path, entry.name)
+            try:
+                if entry.is_symlink():
+                    kind, digest = "l", os.readlink(entry.path)
+                elif entry.is_dir(follow_symlinks=False):
+                    kind = "d"
+                    digest = self._directory_digest(
+                        entry_path, entry.path, algorithm, file_count, max_files
+                    )
+                elif entry.is_file(follow_symlinks=False):
+                    file_count[0] += 1
+                    if max_files is not None and file_count[0] > max_files:
+                        raise ValueError(
+                            f"Directory contains more than {max_files} files: {path}"
+                        )
+                    st = entry.stat(follow_symlinks=False)
+                    kind = "f"
+                    digest = self._file_digest(entry_path, entry.path, st, algorithm)
+                else:
+                    continue
+            except FileNotFoundError:
+                # Removed while the directory was being hashed
+                continue
+            hasher.update(
+                f"{kind} {digest} {entry.name}\0".encode("utf-8", "surrogateescape")
+            )
+        return hasher.hexdigest()
+
+    def _read_content(self, path: str, full_path: str, st: os.stat_result) -> tuple:
+        """The content of the file st describes and its encoding (utf-8 or base64)."""
+        if st.st_size > MAX_READ_SIZE:
             raise ValueError(f"File size exceeds the 10MB limit: {path}")
 
+        # A file is identified by device and inode; mtime and size change whenever
+        # it is rewritten
+        cache_key = (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+        if self.content_cache is not None:
+            cached = self.content_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         try:
-            with open(full_path, "rb") as f:
+            with phase("read"), open(full_path, "rb") as f:
                 content_bytes = f.read()
+                FILE_BYTES_READ.inc("read", amount=len(content_bytes))
+                after = os.fstat(f.fileno())
         except PermissionError:
             raise PermissionDeniedError(f"Permission denied to read file: {path}")
 
         try:
             # Attempt to decode as UTF-8. If it fails, treat as binary.
-            content = content_bytes.decode("utf-8")
-            return content
+            with phase("decode"):
+                content = (content_bytes.decode("utf-8"), "utf-8")
         except UnicodeDecodeError:
             # If decoding fails, base64 encode the bytes
-            return base64.b64encode(content_bytes).decode("utf-8")
+            with phase("base64"):
+                content = (base64.b64encode(content_bytes).decode("utf-8"), "base64")
+
+        # Only cache what was read if the file did not change underneath us.
+        # Entries are charged their UTF-8 size; base64 text is ASCII.
+        unchanged = (after.st_mtime_ns, after.st_size) == (st.st_mtime_ns, st.st_size)
+        if self.content_cache is not None and unchanged:
+            size = len(content_bytes) if content[1] == "utf-8" else len(content[0])
+            self.content_cache.put(cache_key, content, size)
+        return content
+
+    def read_file_range(self, path: str, offset: int = 0, length: Optional[int] = None):
+        """Read a window of a file without loading the rest of it.
+
+        A negative offset counts from the end of the file. Text windows are
+        adjusted so they never start or end inside a multibyte UTF-8
+        character; the returned offset and length describe the bytes that
+        were actually returned, so the next page starts at offset + length.
+        """
+        if length is not None and length < 0:
+            raise ValueError("Length must not be negative")
+        if length is not None and length > MAX_READ_SIZE:
+            raise ValueError(f"Requested length exceeds the 10MB limit: {path}")
+
+        full_path = self._resolve_path(path)
+        if not os.path.isfile(full_path):
+            raise FileNotFoundError(f"File not found: {path}")
+
+        try:
+            with phase("read"), open(full_path, "rb") as f:
+                total_size = os.fstat(f.fileno()).st_size
+                start = (
+                    max(0, total_size + offset)
+                    if offset < 0
+                    else min(offset, total_size)
+                )
+                if length is None:
+                    length = MAX_READ_SIZE
+                end = min(start + length, total_size)
+                f.seek(start)
+                # Read a few bytes past the window in case the last character has
+                # to be completed
+                window = f.read(min(end + 3, total_size) - start)
+                FILE_BYTES_READ.inc("range", amount=len(window))
+        except PermissionError:
+            raise PermissionDeniedError(f"Permission denied to read file: {path}")
+
+        data = window[:end - start]
+        lead = _utf8_leading_continuations(data) if start > 0 else 0
+        cut = _utf8_complete_length(data) if end < total_size else len(data)
+        if cut <= lead < len(data):
+            # The window lies inside a single character; return that whole character
+            cut = min(lead + _utf8_sequence_length(window[lead]), len(window))
+
+        try:
+            with phase("decode"):
+                content = window[lead:cut].decode("utf-8")
+            encoding = "utf-8"
+            start, data = start + lead, window[lead:cut]
+        except UnicodeDecodeError:
+            with phase("base64"):
+                content = base64.b64encode(data).decode("utf-8")
+            encoding = "base64"
+
+        return {
+            "content": content,
+            "encoding": encoding,
+            "offset": start,
+            "length": len(data),
+            "total_size": total_size,
+            "eof": start + len(data) >= total_size,
+        }
+
+    def stream_file(self, path: str, chunk_size: int = STREAM_CHUNK_SIZE):
+        """Open a file for streaming, without any size limit.
+
+        Returns ``(total_size, chunks)`` where ``chunks`` is a generator of
+        ``{"offset", "encoding", "data"}`` dicts. Only one chunk is held in
+        memory at a time. Errors that can be detected up front (missing file,
+        permissions, sandboxing) are raised here rather than from the generator.
+        """
+        full_path = self._resolve_path(path)
+        if not os.path.isfile(full_path):
+            raise FileNotFoundError(f"File not found: {path}")
+        try:
+            f = open(full_path, "rb")
+        except PermissionError:
+            raise PermissionDeniedError(f"Permission denied to read file: {path}")
+        total_size = os.fstat(f.fileno()).st_size
+        return total_size, self._iter_file_chunks(f, chunk_size)
+
+    def _iter_file_chunks(self, f, chunk_size: int):
+        with f:
+            offset = 0
+            pending = b""
+            while True:
+                block = f.read(chunk_size)
+                FILE_BYTES_READ.inc("stream", amount=len(block))
+                data = pending + block
+                if not data:
+                    break
+                # Hold back a trailing partial character until the next block arrives
+                cut = _utf8_complete_length(data) if block else len(data)
+                if cut == 0:
+                    pending = data
+                    continue
+                try:
+                    text = data[:cut].decode("utf-8")
+                except UnicodeDecodeError:
+                    yield {
+                        "offset": offset,
+                        "encoding": "base64",
+                        "data": base64.b64encode(data).decode("utf-8"),
+                    }
+                    offset += len(data)
+                    pending = b""
+                else:
+                    yield {"offset": offset, "encoding": "utf-8", "data": text}
+                    offset += cut
+                    pending = data[cut:]
+                if not block:
+                    break
 
-    def search_in_directory(self, path: str, pattern: str):
+    def search_in_directory(
+        self,
+        path: str,
+        pattern: str,
+        max_line_length: Optional[int] = None,
+        path_filter: Optional[PathFilter] = None,
+        skip_binary: bool = True,
+        regex: bool = False,
+    ):
+        with phase("search"):
+            return list(
+                self.iter_search(
+                    path,
+                    pattern,
+                    max_line_length,
+                    path_filter=path_filter,
+                    skip_binary=skip_binary,
+                    regex=regex,
+                )
+            )
+
+    def search_page(
+        self,
+        path: str,
+        pattern: str,
+        max_results: int,
+        cursor: Optional[str] = None,
+        max_line_length: Optional[int] = None,
+        path_filter: Optional[PathFilter] = None,
+        skip_binary: bool = True,
+        regex: bool = False,
+    ):
+        """Return at most max_results matches and a cursor for the next page.
+
+        The walk stops as soon as one match beyond the page has been found,
+        so latency and memory are bounded by the page size rather than by
+        the size of the tree.
+        """
+        if max_results < 1:
+            raise ValueError("max_results must be a positive integer")
+        scope = self._search_cursor_scope(
+            path, pattern, path_filter or PathFilter(), skip_binary, regex
+        )
+        after = self._decode_search_cursor(cursor, scope) if cursor else None
+
+        with phase("search"):
+            matches = list(itertools.islice(
+                self.iter_search(
+                    path, pattern, max_line_length, after=after, limit=max_results + 1,
+                    path_filter=path_filter, skip_binary=skip_binary, regex=regex,
+                ),
+                max_results + 1,
+            ))
+        next_cursor = None
+        if len(matches) > max_results:
+            matches = matches[:max_results]
+            last = matches[-1]
+            next_cursor = self._encode_search_cursor(
+                scope, last["file_path"], last["line_number"]
+            )
+        return {"matches": matches, "next_cursor": next_cursor}
+
+    def iter_search(
+        self,
+        path: str,
+        pattern: str,
+        max_line_length: Optional[int] = None,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None,
+        path_filter: Optional[PathFilter] = None,
+        skip_binary: bool = True,
+        regex: bool = False,
+    ):
+        """Yield matches in path order, resuming after a (file_path, line) position."""
+        full_path = self._resolve_path(path)
+        if not os.path.isdir(full_path):
+            raise FileNotFoundError(f"Directory not found: {path}")
+        if regex:
+            try:
+                re.compile(pattern.encode("utf-8"))
+            except re.error as e:
+                raise ValueError(f"Invalid regular expression: {e}")
+
+        after_path, after_line = after if after else (None, 0)
+        files = self._iter_search_files(
+            full_path, pattern, path_filter or PathFilter(), after_path, regex
+        )
+
+        if self.search_engine is None:
+            found = 0
+            for file_path, relative_path in files:
+                skip = after_line if relative_path == after_path else 0
+                remaining = None if limit is None else limit - found
+                for match in scan_file(
+                    file_path,
+                    relative_path,
+                    pattern,
+                    max_line_length,
+                    skip,
+                    remaining,
+                    skip_binary,
+                    regex,
+                ):
+                    found += 1
+                    yield match
+                if limit is not None and found >= limit:
+                    return
+            return
+
+        if after_path is not None:
+            # The file the cursor points into is finished here, the rest goes to the
+            # engine
+            files = iter(files)
+            first = next(files, None)
+            if first is not None:
+                if first[1] == after_path:
+                    yield from scan_file(
+                        first[0],
+                        first[1],
+                        pattern,
+                        max_line_length,
+                        after_line,
+                        limit,
+                        skip_binary,
+                        regex,
+                    )
+                else:
+                    files = itertools.chain([first], files)
+        yield from self.search_engine.iter_search(
+            files, pattern, max_line_length, limit, skip_binary, regex
+        )
+
+    def walk_tree(
+        self,
+        path: str,
+        max_depth: Optional[int] = None,
+        path_filter: Optional[PathFilter] = None,
+        sizes: bool = False,
+    ):
+        """Return an iterator over the entries below path, parents first.
+
+        Entries are dicts with the path relative to the root, the type
+        (``file`` or ``directory``) and, with ``sizes``, the size of files.
+        The walk is lazy, so callers can stop or stream it at any point.
+        """
+        if max_depth is not None and max_depth < 1:
+            raise ValueError("max_depth must be a positive integer")
         full_path = self._resolve_path(path)
         if not os.path.isdir(full_path):
             raise FileNotFoundError(f"Directory not found: {path}")
+        return self._iter_tree(full_path, max_depth, path_filter or PathFilter(), sizes)
+
+    def _iter_tree(
+        self,
+        full_path: str,
+        max_depth: Optional[int],
+        path_filter: PathFilter,
+        sizes: bool,
+    ):
+        for entry, parts in self._walk_files(
+            full_path, path_filter, max_depth=max_depth, directories=True
+        ):
+            if entry.is_dir():
+                record = {"path": os.path.join(*parts), "type": "directory"}
+                if entry.is_symlink():
+                    # Listed, but not followed
+                    record["symlink"] = True
+                yield record
+                continue
+            record = {"path": os.path.join(*parts), "type": "file"}
+            if sizes:
+                try:
+                    record["size"] = entry.stat().st_size
+                except OSError:
+                    continue
+            yield record
+
+    def tree(
+        self,
+        path: str,
+        max_depth: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        path_filter: Optional[PathFilter] = None,
+        sizes: bool = False,
+        nested: bool = True,
+    ):
+        """Walk path in one call and return its entries, nested or as a flat list.
 
-        results = []
-        for root, _, files in os.walk(full_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                relative_path = os.path.relpath(file_path, self.root_dir)
+        At most max_entries entries are returned; ``truncated`` tells
+        whether the walk was cut short.
+        """
+        if max_entries is not None and max_entries < 1:
+            raise ValueError("max_entries must be a positive integer")
+        entries = self.walk_tree(path, max_depth, path_filter, sizes)
+        if max_entries is not None:
+            entries = itertools.islice(entries, max_entries + 1)
+        with phase("walk"):
+            entries = list(entries)
+        truncated = max_entries is not None and len(entries) > max_entries
+        if truncated:
+            entries = entries[:max_entries]
+        if not nested:
+            return {"entries": entries, "truncated": truncated}
+
+        # Directories without "children" were not entered (depth limit or symlink)
+        full_path = self._resolve_path(path)
+        base = os.path.relpath(full_path, self.root_dir)
+        base_depth = 0 if base == "." else len(base.split(os.sep))
+        root = {
+            "name": os.path.basename(full_path),
+            "type": "directory",
+            "children": [],
+        }
+        nodes = {"" if base == "." else base: root}
+        for entry in entries:
+            node = {"name": os.path.basename(entry["path"]), **entry}
+            del node["path"]
+            nodes[os.path.dirname(entry["path"])]["children"].append(node)
+            depth = len(entry["path"].split(os.sep)) - base_depth
+            if (
+                entry["type"] == "directory"
+                and not entry.get("symlink")
+                and (max_depth is None or depth < max_depth)
+            ):
+                node["children"] = []
+                nodes[entry["path"]] = node
+        return {"tree": root, "truncated": truncated}
+
+    def _encode_search_cursor(
+        self, scope: str, file_path: str, line_number: int
+    ) -> str:
+        token = {"q": scope, "file": file_path, "line": line_number}
+        data = json.dumps(token).encode("utf-8")
+        return base64.urlsafe_b64encode(data).decode("ascii")
+
+    def _decode_search_cursor(self, cursor: str, scope: str) -> tuple:
+        try:
+            token = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            if token["q"] != scope:
+                raise ValueError
+            return token["file"], int(token["line"])
+        except (ValueError, KeyError, TypeError, UnicodeEncodeError):
+            raise ValueError("Invalid search cursor")
+
+    def _search_cursor_scope(
+        self,
+        path: str,
+        pattern: str,
+        path_filter: PathFilter,
+        skip_binary: bool,
+        regex: bool,
+    ) -> str:
+        # Ties a cursor to the search it came from: every option that changes
+        # which matches are found, or their order, must be part of it
+        options = {
+            "path": path,
+            "pattern": pattern,
+            "skip_binary": skip_binary,
+            "regex": regex,
+            **path_filter.options(),
+        }
+        data = json.dumps(options, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(data).hexdigest()[:16]
+
+    def _iter_search_files(
+        self,
+        full_path: str,
+        pattern: str,
+        path_filter: PathFilter,
+        after_path: Optional[str] = None,
+        regex: bool = False,
+    ):
+        # The index only narrows down candidates; files it cannot vouch for are still
+        # scanned
+        index_query = (
+            self.search_index.query(pattern)
+            if self.search_index and not regex
+            else None
+        )
+        after_parts = tuple(after_path.split(os.sep)) if after_path else None
+
+        for entry, parts in self._walk_files(full_path, path_filter, after_parts):
+            relative_path = os.path.join(*parts)
+            if index_query is not None and relative_path != after_path:
                 try:
-                    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                        for line_number, line in enumerate(f, 1):
-                            if pattern in line:
-                                results.append({
-                                    "file_path": relative_path,
-                                    "line_number": line_number,
-                                    "line": line.strip(),
-                                })
-                except (PermissionError, IOError):
-                    # Ignore files that can't be read
+                    if not index_query.needs_scan(relative_path, os.stat(entry.path)):
+                        continue
+                except OSError:
                     continue
-        return results
+            SEARCH_FILES_SCANNED.inc()
+            yield entry.path, relative_path
+
+    def _walk_files(
+        self,
+        full_path: str,
+        path_filter: PathFilter,
+        after_parts: Optional[tuple] = None,
+        max_depth: Optional[int] = None,
+        directories: bool = False,
+    ):
+        """Yield (entry, parts) for the files below full_path in sorted path order.
+
+        ``parts`` is the file's path relative to the root, split into
+        components. Directories are visited depth-first with their entries
+        sorted by name, so the order is stable across calls. Excluded and
+        ignored directories are pruned without being read, and with
+        after_parts everything that sorts before it is skipped the same way.
+        With ``directories`` each directory is yielded before its contents;
+        directories max_depth levels down are not entered.
+        """
+        base = os.path.relpath(full_path, self.root_dir)
+        base_parts = () if base == "." else tuple(base.split(os.sep))
+        rules = path_filter.initial_rules(self.root_dir, base_parts)
+        stack = [(base_parts, rules, iter(self._sorted_entries(full_path)))]
+        while stack:
+            parent_parts, rules, entries = stack[-1]
+            entry = next(entries, None)
+            if entry is None:
+                stack.pop()
+                continue
+            parts = parent_parts + (entry.name,)
+            relative = "/".join(parts[len(base_parts):])
+            if entry.is_dir():
+                # Like os.walk, symlinked directories are listed but not followed
+                symlink = entry.is_symlink()
+                if symlink and not directories:
+                    continue
+                if after_parts is not None and parts < after_parts[:len(parts)]:
+                    continue
+                if path_filter.is_excluded(parts, relative, True, rules):
+                    continue
+                if directories:
+                    yield entry, parts
+                depth = len(parts) - len(base_parts)
+                if symlink or (max_depth is not None and depth >= max_depth):
+                    continue
+                child_rules = path_filter.enter_directory(rules, entry.path, parts)
+                stack.append(
+                    (parts, child_rules, iter(self._sorted_entries(entry.path)))
+                )
+                continue
+            if after_parts is not None and parts < after_parts:
+                continue
+            if path_filter.is_excluded(parts, relative, False, rules):
+                continue
+            if not path_filter.is_included(entry.name, relative):
+                continue
+            if entry.is_symlink() and not self.path_resolver.is_inside(entry.path):
+                # Never read through a symlink that leads out of the root
+                continue
+            yield entry, parts
+
+    def _sorted_entries(self, directory: str) -> list:
+        try:
+            with os.scandir(directory) as entries:
+                return sorted(entries, key=lambda entry: entry.name)
+        except OSError:
+            return []
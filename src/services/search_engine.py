@@ -0,0 +1,265 @@
+import mmap
+import multiprocessing
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+# Number of files handed to a worker process at a time
+SEARCH_BATCH_SIZE = 256
+# Files with a NUL byte in their first BINARY_SNIFF_SIZE bytes are treated as binary
+BINARY_SNIFF_SIZE = 8192
+# Smaller files are read into memory in one call rather than memory-mapped
+MMAP_THRESHOLD = 64 * 1024
+# Largest slice of a mapping copied at once while counting line numbers
+COUNT_CHUNK_SIZE = 1024 * 1024
+
+def _count_newlines(buf, start: int, end: int) -> int:
+    # mmap has no count(); counting bounded slices keeps memory flat on huge files
+    count = 0
+    for chunk_start in range(start, end, COUNT_CHUNK_SIZE):
+        count += buf[chunk_start:min(chunk_start + COUNT_CHUNK_SIZE, end)].count(b"\n")
+    return count
+
+def _iter_hit_lines(buf, needle: bytes, compiled):
+    """Yield (line_number, line_bytes) for each line of buf containing a match.
+
+    Only hits are materialised: the buffer is searched as a whole and line
+    boundaries and numbers are worked out around each hit.
+    """
+    size = len(buf)
+    pos = 0
+    line_number = 1
+    counted_to = 0
+    while pos < size:
+        if compiled is not None:
+            match = compiled.search(buf, pos)
+            if match is None:
+                return
+            hit, hit_end = match.start(), match.end()
+        else:
+            hit = buf.find(needle, pos)
+            if hit == -1:
+                return
+            hit_end = hit + len(needle)
+        if hit >= size:
+            return
+        line_start = buf.rfind(b"\n", 0, hit) + 1
+        line_end = buf.find(b"\n", hit)
+        if line_end == -1:
+            line_end = size
+        if hit_end > line_end + 1:
+            # Matches spanning several lines do not count, as with a line-by-line scan.
+            # A regex may still have a shorter match within the line, so search again
+            # bounded to the line before moving on.
+            if compiled is None:
+                pos = hit + 1
+                continue
+            if compiled.search(buf, hit, line_end + 1) is None:
+                pos = line_end + 1
+                continue
+        line_number += _count_newlines(buf, counted_to, line_start)
+        counted_to = line_start
+        yield line_number, buf[line_start:line_end]
+        pos = line_end + 1
+
+def scan_file(
+    file_path: str,
+    relative_path: str,
+    pattern: str,
+    max_line_length: Optional[int] = None,
+    after_line: int = 0,
+    limit: Optional[int] = None,
+    skip_binary: bool = True,
+    regex: bool = False,
+) -> list:
+    """Return the lines of a file containing pattern (or matching it, with regex).
+
+    Lines up to and including ``after_line`` are skipped and scanning stops
+    once ``limit`` matches have been found. Binary files are skipped unless
+    ``skip_binary`` is False. Large files are memory-mapped and searched
+    with a single find over the whole mapping, so a file without a match
+    costs no per-line work at all.
+    """
+    results = []
+    needle = pattern.encode("utf-8")
+    compiled = re.compile(needle, re.MULTILINE) if regex else None
+    try:
+        with open(file_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return results
+            buf = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if size >= MMAP_THRESHOLD
+                else f.read()
+            )
+    except (OSError, ValueError):
+        # Ignore files that can't be read (or shrank before they could be mapped)
+        return results
+
+    try:
+        if skip_binary and buf.find(b"\0", 0, BINARY_SNIFF_SIZE) != -1:
+            return results
+        for line_number, line in _iter_hit_lines(buf, needle, compiled):
+            if line_number <= after_line:
+                continue
+            results.append({
+                "file_path": relative_path,
+                "line_number": line_number,
+                "line": line.decode("utf-8", errors="ignore").strip()[:max_line_length],
+            })
+            if limit is not None and len(results) >= limit:
+                break
+    finally:
+        if isinstance(buf, mmap.mmap):
+            buf.close()
+    return results
+
+def scan_batch(
+    batch: list,
+    pattern: str,
+    max_line_length: Optional[int] = None,
+    limit: Optional[int] = None,
+    skip_binary: bool = True,
+    regex: bool = False,
+) -> list:
+    results = []
+    for file_path, relative_path in batch:
+        remaining = None if limit is None else limit - len(results)
+        results.extend(
+            scan_file(
+                file_path,
+                relative_path,
+                pattern,
+                max_line_length,
+                0,
+                remaining,
+                skip_binary,
+                regex,
+            )
+        )
+        if limit is not None and len(results) >= limit:
+            break
+    return results
+
+class ParallelSearchEngine:
+    """Scans files for a pattern across a pool of worker processes.
+
+    Files are handed out in batches of ``batch_size``; at most two batches
+    per worker are in flight, so memory stays bounded on very large trees.
+    Results are yielded in the order the files were supplied, which keeps
+    them identical to a serial scan. Walks that produce no more than one
+    batch are scanned in the calling thread, where process dispatch would
+    cost more than it saves. If a worker dies, the broken pool is dropped,
+    the rest of that search is scanned in the calling thread and the next
+    search starts a new pool.
+    """
+
+    def __init__(self, max_workers: int, batch_size: int = SEARCH_BATCH_SIZE):
+        if max_workers < 1:
+            raise ValueError("Parallel search needs at least one worker process")
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Forking a multi-threaded server is unsafe, so workers are spawned
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _batches(self, files):
+        batch = []
+        for item in files:
+            batch.append(item)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def iter_search(
+        self,
+        files,
+        pattern: str,
+        max_line_length: Optional[int] = None,
+        limit: Optional[int] = None,
+        skip_binary: bool = True,
+        regex: bool = False,
+    ):
+        """Scan (file_path, relative_path) pairs and yield matches in file order.
+
+        Closing the generator early (e.g. once a page of results is full)
+        cancels the batches that have not started yet.
+        """
+        batches = self._batches(files)
+        first = next(batches, None)
+        if first is None:
+            return
+        second = next(batches, None)
+        if second is None:
+            yield from scan_batch(
+                first, pattern, max_line_length, limit, skip_binary, regex
+            )
+            return
+
+        args = (pattern, max_line_length, limit, skip_binary, regex)
+        executor = self._get_executor()
+
+        def submit(batch):
+            nonlocal executor
+            if executor is not None:
+                try:
+                    return executor.submit(scan_batch, batch, *args)
+                except BrokenProcessPool:
+                    self._discard(executor)
+                    executor = None
+            return None
+
+        def collect(batch, future) -> list:
+            nonlocal executor
+            if future is not None:
+                try:
+                    return future.result()
+                except BrokenProcessPool:
+                    # A worker died (e.g. OOM killed); the pool is recreated by the
+                    # next search and the rest of this one is scanned here
+                    if executor is not None:
+                        self._discard(executor)
+                        executor = None
+            return scan_batch(batch, *args)
+
+        pending = deque((batch, submit(batch)) for batch in (first, second))
+        try:
+            for batch in batches:
+                if len(pending) >= self.max_workers * 2:
+                    yield from collect(*pending.popleft())
+                pending.append((batch, submit(batch)))
+            while pending:
+                yield from collect(*pending.popleft())
+        finally:
+            for _, future in pending:
+                if future is not None:
+                    future.cancel()
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        """Drop a broken pool so that the next search starts a new one."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
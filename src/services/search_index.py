@@ -0,0 +1,216 @@
+"""On-disk trigram index used to narrow down the files fs.search has to open.
+
+The index records, for every byte trigram, the ids of the files containing
+it, together with the mtime and size each file had when it was indexed. A
+search only opens files that contain every trigram of the pattern; files
+that are new, changed since indexing or were never indexed are always
+scanned directly, so results stay correct while the index ages.
+
+Build or refresh an index with::
+
+    python -m src.services.search_index --root /var/mcp_data --output /var/mcp_data.idx
+"""
+import argparse
+import array
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from contextlib import closing
+from typing import Optional
+
+# Larger files are not indexed and are always scanned directly
+DEFAULT_MAX_INDEXED_FILE_SIZE = 1024 * 1024
+
+def _trigrams(data: bytes) -> set:
+    return {(a << 16) | (b << 8) | c for a, b, c in set(zip(data, data[1:], data[2:]))}
+
+def _encode_ids(ids) -> bytes:
+    return zlib.compress(array.array("I", ids).tobytes())
+
+def _decode_ids(blob: bytes) -> set:
+    ids = array.array("I")
+    ids.frombytes(zlib.decompress(blob))
+    return set(ids)
+
+def build_index(
+    root_dir: str, index_path: str, max_file_size: int = DEFAULT_MAX_INDEXED_FILE_SIZE
+) -> dict:
+    """(Re)build the index for root_dir and atomically replace index_path."""
+    root_dir = os.path.abspath(root_dir)
+    index_path = os.path.abspath(index_path)
+    started = time.perf_counter()
+
+    postings = {}
+    files = []
+    for root, _, names in os.walk(root_dir):
+        for name in names:
+            file_path = os.path.join(root, name)
+            if file_path.startswith(index_path):
+                continue
+            try:
+                st = os.stat(file_path)
+                indexed = st.st_size <= max_file_size
+                if indexed:
+                    with open(file_path, "rb") as f:
+                        data = f.read()
+                    # fs.search looks for the UTF-8 encoded pattern in a file's raw
+                    # bytes, so a file can only match if its raw bytes contain
+                    # every trigram of the encoded pattern. Files that are not
+                    # UTF-8 (mostly binary) are left unindexed to keep the index
+                    # small; they are always scanned.
+                    data.decode("utf-8")
+            except UnicodeDecodeError:
+                indexed = False
+            except OSError:
+                continue
+            file_id = len(files)
+            files.append(
+                (
+                    file_id,
+                    os.path.relpath(file_path, root_dir),
+                    st.st_mtime_ns,
+                    st.st_size,
+                    int(indexed),
+                )
+            )
+            if indexed:
+                for trigram in _trigrams(data):
+                    postings.setdefault(trigram, array.array("I")).append(file_id)
+
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    with closing(sqlite3.connect(tmp_path)) as conn:
+        conn.executescript(
+            """
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE files (
+                id INTEGER PRIMARY KEY, path TEXT, mtime_ns INTEGER, size INTEGER,
+                indexed INTEGER
+            );
+            CREATE TABLE trigrams (trigram INTEGER PRIMARY KEY, file_ids BLOB);
+            """
+        )
+        conn.executemany(
+            "INSERT INTO meta VALUES (?, ?)",
+            [("root", root_dir), ("build_id", uuid.uuid4().hex)],
+        )
+        conn.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?)", files)
+        conn.executemany(
+            "INSERT INTO trigrams VALUES (?, ?)",
+            ((trigram, _encode_ids(ids)) for trigram, ids in postings.items()),
+        )
+        conn.commit()
+    os.replace(tmp_path, index_path)
+
+    return {
+        "files": len(files),
+        "indexed_files": sum(entry[4] for entry in files),
+        "trigrams": len(postings),
+        "seconds": time.perf_counter() - started,
+    }
+
+class IndexQuery:
+    """The outcome of an index lookup for one pattern."""
+
+    def __init__(self, files: dict, candidate_ids: set):
+        self._files = files
+        self._candidate_ids = candidate_ids
+
+    def needs_scan(self, relative_path: str, st: os.stat_result) -> bool:
+        entry = self._files.get(relative_path)
+        if entry is None:
+            return True
+        file_id, mtime_ns, size, indexed = entry
+        if not indexed or mtime_ns != st.st_mtime_ns or size != st.st_size:
+            return True
+        return file_id in self._candidate_ids
+
+class TrigramIndex:
+    def __init__(self, index_path: str, root_dir: str):
+        self.index_path = os.path.abspath(index_path)
+        self.root_dir = os.path.abspath(root_dir)
+        self._lock = threading.Lock()
+        self._build_id = None
+        self._files = {}
+
+    def _refresh_files(self, conn) -> bool:
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        if meta.get("root") != self.root_dir:
+            return False
+        with self._lock:
+            if meta["build_id"] != self._build_id:
+                self._files = {
+                    path: (file_id, mtime_ns, size, indexed)
+                    for file_id, path, mtime_ns, size, indexed in conn.execute(
+                        "SELECT id, path, mtime_ns, size, indexed FROM files"
+                    )
+                }
+                self._build_id = meta["build_id"]
+        return True
+
+    def query(self, pattern: str) -> Optional[IndexQuery]:
+        """Look up the files that may contain pattern.
+
+        Returns None when the index cannot narrow the search: it does not
+        exist, belongs to another root, or the pattern is too short.
+        """
+        pattern_bytes = pattern.encode("utf-8")
+        if len(pattern_bytes) < 3 or b"\n" in pattern_bytes or b"\r" in pattern_bytes:
+            return None
+        if not os.path.exists(self.index_path):
+            return None
+
+        with closing(
+            sqlite3.connect(f"file:{self.index_path}?mode=ro", uri=True)
+        ) as conn:
+            if not self._refresh_files(conn):
+                return None
+            files = self._files
+            candidate_ids = None
+            for trigram in _trigrams(pattern_bytes):
+                row = conn.execute(
+                    "SELECT file_ids FROM trigrams WHERE trigram = ?", (trigram,)
+                ).fetchone()
+                ids = _decode_ids(row[0]) if row else set()
+                candidate_ids = ids if candidate_ids is None else candidate_ids & ids
+                if not candidate_ids:
+                    break
+        return IndexQuery(files, candidate_ids)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build or refresh the fs.search trigram index."
+    )
+    parser.add_argument(
+        "--root",
+        default=os.getenv("MCP_SERVER_ROOT_DIR", os.getcwd()),
+        help="Root directory to index",
+    )
+    parser.add_argument(
+        "--output",
+        default=os.getenv("MCP_SEARCH_INDEX_PATH"),
+        help="Path of the index file",
+    )
+    parser.add_argument(
+        "--max-file-size",
+        type=int,
+        default=DEFAULT_MAX_INDEXED_FILE_SIZE,
+        help="Skip files larger than this many bytes",
+    )
+    args = parser.parse_args(argv)
+    if not args.output:
+        parser.error("--output (or MCP_SEARCH_INDEX_PATH) is required")
+
+    summary = build_index(args.root, args.output, args.max_file_size)
+    print(
+        f"Indexed {summary['indexed_files']} of {summary['files']} files "
+        f"({summary['trigrams']} trigrams) in {summary['seconds']:.1f}s "
+        f"-> {args.output}"
+    )
+
+if __name__ == "__main__":
+    main()
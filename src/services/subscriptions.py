@@ -0,0 +1,95 @@
+import itertools
+import os
+import threading
+
+from src.services.watcher import DirectoryWatcher
+
+class SubscriptionHub:
+    """Fans DirectoryWatcher notifications out to client subscriptions.
+
+    The watcher calls back on its own thread. Each subscription names a
+    directory (and whether changes further down count too) and an event
+    loop; matching paths are handed to the subscription's callback on that
+    loop with call_soon_threadsafe. A None paths list means the watcher lost
+    events and everything may have changed.
+
+    When the watcher falls back to polling, the directories of
+    non-recursive subscriptions are handed to the poller again. Polling does
+    not cover subdirectories, so recursive subscriptions are ended: their
+    callback gets a last call with ``ended=True``.
+    """
+
+    def __init__(self, watcher: DirectoryWatcher):
+        self.watcher = watcher
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._subscriptions = {}
+        self._watcher_subscription = None
+
+    def subscribe(self, directory: str, recursive: bool, loop, callback) -> int:
+        """Call callback(subscription_id, paths) on loop for changes in directory.
+
+        callback(subscription_id, None, ended=True) is the last call when the
+        subscription cannot be served any more.
+
+        Blocks while a polling watcher takes its first look at directory, so
+        call it from a worker thread. Raises ValueError for a recursive
+        subscription when the watcher polls, as polling does not cover
+        subdirectories.
+        """
+        if recursive and self.watcher.backend == "poll":
+            raise ValueError("Recursive subscriptions need the inotify watcher backend")
+        with self._lock:
+            if self._watcher_subscription is None:
+                self._watcher_subscription = self.watcher.subscribe(self._dispatch)
+            subscription_id = next(self._ids)
+            entry = (directory, recursive, loop, callback)
+            self._subscriptions[subscription_id] = entry
+        # The polling backend only checks directories it was asked about
+        self.watcher.watch(directory)
+        return subscription_id
+
+    def unsubscribe(self, subscription_id: int) -> bool:
+        with self._lock:
+            return self._subscriptions.pop(subscription_id, None) is not None
+
+    def _dispatch(self, paths):
+        polling = paths is None and self.watcher.backend == "poll"
+        with self._lock:
+            subscriptions = list(self._subscriptions.items())
+        for subscription_id, (directory, recursive, loop, callback) in subscriptions:
+            if polling:
+                if recursive:
+                    if self.unsubscribe(subscription_id):
+                        self._call(loop, callback, subscription_id, None, ended=True)
+                    continue
+                # The poller only checks directories it was asked about, and starts
+                # out knowing none after a fallback from inotify
+                self.watcher.watch(directory)
+            matched = None
+            if paths is not None:
+                matched = [
+                    path for path in paths if self._matches(directory, recursive, path)
+                ]
+                if not matched:
+                    continue
+            self._call(loop, callback, subscription_id, matched)
+
+    @staticmethod
+    def _call(loop, callback, subscription_id: int, paths, ended: bool = False):
+        args = (subscription_id, paths, True) if ended else (subscription_id, paths)
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # The connection's event loop is closed; it unsubscribes when it ends
+            pass
+
+    @staticmethod
+    def _matches(directory: str, recursive: bool, path: str) -> bool:
+        if path == directory or os.path.dirname(path) == directory:
+            return True
+        return recursive and path.startswith(directory.rstrip(os.sep) + os.sep)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"subscriptions": len(self._subscriptions)}
@@ -0,0 +1,454 @@
+"""Change tracking for the server's root directory.
+
+The watcher keeps a generation number for every directory below the root.
+A directory's generation changes whenever an entry in it is created,
+deleted, renamed or modified, so a cache can store the generation next to
+a result and trust the result for as long as the generation is unchanged.
+Subscribers are told which paths changed, so they can invalidate exactly
+those entries.
+
+On Linux the watcher uses inotify. Elsewhere, when the watch limit is
+reached or when configured to, it falls back to polling the directories
+that callers have asked about. Lost events (queue overflow, falling back
+to polling) bump every generation and notify subscribers with ``None``,
+so caches rebuild from a full rescan.
+"""
+import ctypes
+import ctypes.util
+import errno
+import itertools
+import os
+import select
+import struct
+import sys
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONTFOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+    | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONTFOLLOW
+    | IN_EXCL_UNLINK
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Most directories polled at once in polling mode; the least recently used are dropped
+MAX_POLLED_DIRECTORIES = 4096
+
+class WatchLimitReached(Exception):
+    pass
+
+def _load_inotify():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+class DirectoryWatcher:
+    def __init__(
+        self,
+        root_dir: str,
+        mode: str = "auto",
+        poll_interval: float = 2.0,
+        max_watches: int = 65536,
+    ):
+        if mode not in ("auto", "inotify", "poll"):
+            raise ValueError(f"Unknown watcher mode: {mode}")
+        self.root_dir = os.path.abspath(root_dir)
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.max_watches = max_watches
+        self.backend = None
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._counter = itertools.count(1)
+        self._generations = {}
+        self._subscribers = {}
+        self._subscriber_ids = itertools.count(1)
+        self._rescans = 0
+        # inotify state
+        self._libc = None
+        self._fd = None
+        self._wd_paths = {}
+        self._path_wds = {}
+        # Directories to watch, and whether to redo every watch after lost events;
+        # both are only acted on by the watcher thread
+        self._pending_trees = []
+        self._rewatch_pending = False
+        # polling state
+        self._poll_signatures = OrderedDict()
+
+    def start(self):
+        if self.mode in ("auto", "inotify"):
+            self._libc = _load_inotify()
+            if self._libc is not None:
+                fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+                if fd >= 0:
+                    self._fd = fd
+                    self.backend = "inotify"
+            if self.backend is None:
+                if self.mode == "inotify":
+                    raise OSError("inotify is not available on this system")
+                logger.warning(
+                    "inotify unavailable, watching by polling",
+                    extra={"root_dir": self.root_dir},
+                )
+        if self.backend is None:
+            self.backend = "poll"
+        self._thread = threading.Thread(
+            target=self._run, name="mcp-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        with self._lock:
+            self._close_inotify()
+
+    def subscribe(self, callback) -> int:
+        """Register callback(paths).
+
+        paths is a list of changed paths, or None after a full rescan.
+        """
+        with self._lock:
+            subscription_id = next(self._subscriber_ids)
+            self._subscribers[subscription_id] = callback
+            return subscription_id
+
+    def unsubscribe(self, subscription_id: int):
+        with self._lock:
+            self._subscribers.pop(subscription_id, None)
+
+    def generation(self, directory: str) -> Optional[int]:
+        """The current generation of directory, or None if it is not tracked."""
+        directory = os.path.abspath(directory)
+        if not self._is_inside_root(directory):
+            return None
+        if self.backend == "inotify":
+            # Pick up events the kernel has already queued, so a change made
+            # before this call is always visible to it. New directories are left
+            # to the watcher thread, so this never walks a tree.
+            self._drain_inotify()
+            with self._lock:
+                if self.backend == "inotify":
+                    if directory not in self._path_wds:
+                        return None
+                    return self._generation_locked(directory)
+        if self.backend == "poll":
+            return self._poll_generation(directory)
+        return None
+
+    def tracks(self, directory: str) -> bool:
+        """True if every change to directory and its ancestors is being reported.
+
+        That is the case while the inotify backend is running, its queued events
+        have been handled and directory is watched; watches are added from the
+        root down and dropped with everything below them.
+        """
+        if self.backend != "inotify" or self._stop.is_set():
+            return False
+        if self._thread is None or not self._thread.is_alive():
+            return False
+        self._drain_inotify()
+        with self._lock:
+            return (
+                self.backend == "inotify"
+                and self._fd is not None
+                and not self._rewatch_pending
+                and directory in self._path_wds
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "watched_directories": (
+                    len(self._path_wds)
+                    if self.backend == "inotify"
+                    else len(self._poll_signatures)
+                ),
+                "rescans": self._rescans,
+            }
+
+    def _is_inside_root(self, path: str) -> bool:
+        return path == self.root_dir or path.startswith(self.root_dir + os.sep)
+
+    def _generation_locked(self, directory: str) -> int:
+        generation = self._generations.get(directory)
+        if generation is None:
+            generation = self._generations[directory] = next(self._counter)
+        return generation
+
+    def _bump(self, directory: str):
+        self._generations[directory] = next(self._counter)
+
+    def _notify(self, paths):
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        for callback in subscribers:
+            try:
+                callback(paths)
+            except Exception:
+                logger.exception("Watcher subscriber failed")
+
+    def _full_rescan_locked(self, reason: str):
+        """Forget every generation so that all cached state is rebuilt."""
+        self._generations.clear()
+        self._rescans += 1
+        logger.warning(
+            "Watcher falling back to a full rescan",
+            extra={"reason": reason, "root_dir": self.root_dir},
+        )
+
+    def _run(self):
+        if self.backend == "inotify":
+            try:
+                self._add_watch_tree(self.root_dir)
+            except WatchLimitReached:
+                self._degrade_to_polling("watch limit reached")
+        while not self._stop.is_set():
+            fd = self._fd
+            if self.backend == "inotify" and fd is not None:
+                try:
+                    ready, _, _ = select.select([fd], [], [], 0.5)
+                except (OSError, ValueError):
+                    # The descriptor was closed while degrading to polling
+                    continue
+                if ready:
+                    self._drain_inotify()
+                self._add_pending_watches()
+            else:
+                self._stop.wait(self.poll_interval)
+                if not self._stop.is_set():
+                    self._poll_once()
+
+    # inotify backend
+
+    def _close_inotify(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self._wd_paths.clear()
+        self._path_wds.clear()
+
+    def _remove_all_watches_locked(self):
+        # Watches of directories deleted while events were lost are still in the
+        # tables and would count against max_watches
+        for wd in self._wd_paths:
+            self._libc.inotify_rm_watch(self._fd, wd)
+        self._wd_paths.clear()
+        self._path_wds.clear()
+
+    def _add_pending_watches(self):
+        """Watch directories created since the last call.
+
+        After lost events the whole tree is watched again.
+        """
+        with self._lock:
+            if self._fd is None:
+                return
+            if self._rewatch_pending:
+                self._rewatch_pending = False
+                self._remove_all_watches_locked()
+                self._pending_trees = [self.root_dir]
+            tops, self._pending_trees = self._pending_trees, []
+        try:
+            for top in tops:
+                self._add_watch_tree(top)
+        except WatchLimitReached:
+            self._degrade_to_polling("watch limit reached")
+
+    def _degrade_to_polling(self, reason: str):
+        with self._lock:
+            self._close_inotify()
+            self.backend = "poll"
+            self._full_rescan_locked(reason)
+        self._notify(None)
+
+    def _add_watch(self, directory: str):
+        with self._lock:
+            if self._fd is None:
+                return
+            if len(self._path_wds) >= self.max_watches:
+                raise WatchLimitReached()
+            wd = self._libc.inotify_add_watch(
+                self._fd, os.fsencode(directory), WATCH_MASK
+            )
+            if wd < 0:
+                if ctypes.get_errno() == errno.ENOSPC:
+                    raise WatchLimitReached()
+                # The directory vanished or cannot be read; there is nothing to watch
+                return
+            self._wd_paths[wd] = directory
+            self._path_wds[directory] = wd
+            self._bump(directory)
+
+    def _add_watch_tree(self, top: str):
+        # Only runs on the watcher thread. The lock is taken per directory so
+        # requests are not blocked while a large tree is added.
+        stack = [top]
+        while stack:
+            directory = stack.pop()
+            self._add_watch(directory)
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+            except OSError:
+                continue
+
+    def _forget_tree(self, top: str):
+        """Drop the watches of top and everything below it (after a move or delete)."""
+        prefix = top + os.sep
+        removed = [d for d in self._path_wds if d == top or d.startswith(prefix)]
+        for directory in removed:
+            wd = self._path_wds.pop(directory)
+            self._wd_paths.pop(wd, None)
+            self._libc.inotify_rm_watch(self._fd, wd)
+            self._bump(directory)
+
+    def _drain_inotify(self):
+        """Handle the queued events without blocking; safe to call from any thread."""
+        changed = []
+        rescan = False
+        with self._lock:
+            if self._fd is None:
+                return
+            while True:
+                try:
+                    data = os.read(self._fd, 64 * 1024)
+                except OSError:
+                    # BlockingIOError once the queue is empty
+                    break
+                rescan |= self._handle_events(data, changed)
+            if rescan:
+                self._full_rescan_locked("event queue overflow")
+                self._rewatch_pending = True
+        if rescan:
+            self._notify(None)
+        elif changed:
+            self._notify(changed)
+
+    def _handle_events(self, data: bytes, changed: list) -> bool:
+        offset = 0
+        overflow = False
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_length = _EVENT_HEADER.unpack_from(data, offset)
+            start = offset + _EVENT_HEADER.size
+            name = data[start:start + name_length].rstrip(b"\0")
+            offset += _EVENT_HEADER.size + name_length
+
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            directory = self._wd_paths.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                self._wd_paths.pop(wd, None)
+                if self._path_wds.get(directory) == wd:
+                    del self._path_wds[directory]
+                self._bump(directory)
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                self._bump(directory)
+                changed.append(directory)
+                continue
+
+            self._bump(directory)
+            changed.append(directory)
+            if name:
+                path = os.path.join(directory, os.fsdecode(name))
+                changed.append(path)
+                if mask & IN_ISDIR:
+                    if mask & (IN_MOVED_FROM | IN_DELETE):
+                        self._forget_tree(path)
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        self._pending_trees.append(path)
+        return overflow
+
+    # polling backend
+
+    def _signature(self, directory: str):
+        try:
+            with os.scandir(directory) as entries:
+                state = []
+                for entry in entries:
+                    st = entry.stat(follow_symlinks=False)
+                    state.append(
+                        (entry.name, st.st_ino, st.st_mtime_ns, st.st_size, st.st_mode)
+                    )
+        except OSError:
+            return None
+        state.sort()
+        return hash(tuple(state))
+
+    def _poll_generation(self, directory: str) -> int:
+        with self._lock:
+            if directory in self._poll_signatures:
+                self._poll_signatures.move_to_end(directory)
+                return self._generation_locked(directory)
+        signature = self._signature(directory)
+        with self._lock:
+            if directory not in self._poll_signatures:
+                self._poll_signatures[directory] = signature
+                self._bump(directory)
+                while len(self._poll_signatures) > MAX_POLLED_DIRECTORIES:
+                    evicted, _ = self._poll_signatures.popitem(last=False)
+                    self._generations.pop(evicted, None)
+            return self._generation_locked(directory)
+
+    def _poll_once(self):
+        with self._lock:
+            directories = list(self._poll_signatures)
+        changed = []
+        for directory in directories:
+            signature = self._signature(directory)
+            with self._lock:
+                if (
+                    directory in self._poll_signatures
+                    and self._poll_signatures[directory] != signature
+                ):
+                    self._poll_signatures[directory] = signature
+                    self._bump(directory)
+                    changed.append(directory)
+        if changed:
+            self._notify(changed)
+
+    def watch(self, directory: str):
+        """Make sure directory is tracked.
+
+        Polling mode only tracks directories it was asked about.
+        """
+        self.generation(directory)
@@ -0,0 +1,83 @@
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.utils.profiling import current_profile
+from src.utils.timing import current_timings
+
+class WorkerPool:
+    """A bounded thread pool for blocking file system work.
+
+    Calls are awaited from the event loop with ``await pool.run(fn, *args)``.
+    The pool keeps track of how many calls are waiting for a free worker and
+    how long they waited, so it can be sized from real traffic.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        if max_workers < 1:
+            raise ValueError(f"Worker pool '{name}' needs at least one worker")
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"mcp-{name}"
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    async def run(self, fn, *args, **kwargs):
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+
+        def job():
+            wait = time.perf_counter() - submitted_at
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+            timings = current_timings()
+            if timings is not None:
+                timings.add("queue", wait)
+            profile = current_profile()
+            try:
+                if profile is not None:
+                    return profile.run(fn, *args, **kwargs)
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+
+        # Run in a copy of the caller's context so request timings and profiles
+        # follow the call
+        future = self._executor.submit(contextvars.copy_context().run, job)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # A job that never started will not decrement the queue itself
+            if future.cancel():
+                with self._lock:
+                    self._queued -= 1
+            raise
+
+    def stats(self) -> dict:
+        with self._lock:
+            started = self._completed + self._active
+            return {
+                "max_workers": self.max_workers,
+                "queued": self._queued,
+                "active": self._active,
+                "completed": self._completed,
+                "avg_wait_ms": (self._total_wait / started * 1000) if started else 0.0,
+                "max_wait_ms": self._max_wait * 1000,
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,89 @@
+"""MCP over stdio: newline-delimited JSON-RPC on stdin and stdout.
+
+Run it with::
+
+    MCP_SERVER_ROOT_DIR=/var/mcp_data python -m src.stdio_server
+
+Every line on stdin is one request (or batch). Requests are dispatched as
+soon as they are read, so a client can pipeline many of them; each response
+is written as one line as soon as it is ready, which may be out of order.
+Clients match responses to requests by id. Logs go to stderr. FastAPI and
+Starlette are never imported.
+"""
+import asyncio
+import os
+import sys
+
+from src import dispatcher
+from src.dispatcher import MESSAGE_BYTES_SENT, handle_message
+from src.services.worker_pool import WorkerPool
+from src.utils.json_codec import dumps
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Requests handled at the same time; stdin is not read while this many are in flight
+STDIO_MAX_IN_FLIGHT = int(os.getenv("MCP_STDIO_MAX_IN_FLIGHT", "64"))
+
+async def serve(stdin, stdout):
+    """Serve requests from the binary stream stdin until EOF.
+
+    Responses are written to stdout.
+    """
+    # Blocking reads and writes run on their own threads: stdin and stdout may be
+    # pipes, terminals or regular files, which asyncio pipe transports do not all
+    # support.
+    # A single writer thread keeps every response line whole.
+    reader = WorkerPool("stdin", 1)
+    writer = WorkerPool("stdout", 1)
+    in_flight = asyncio.Semaphore(STDIO_MAX_IN_FLIGHT)
+    tasks = set()
+
+    def write(data: bytes):
+        stdout.write(data)
+        stdout.flush()
+
+    async def respond(line: bytes):
+        try:
+            response = await handle_message(line)
+            data = dumps(response) + b"\n"
+            await writer.run(write, data)
+            MESSAGE_BYTES_SENT.inc("stdio", amount=len(data))
+        except OSError as e:
+            # The client went away; the remaining requests are drained the same way
+            logger.error("Failed to write stdio response", extra={"error": str(e)})
+        finally:
+            in_flight.release()
+
+    try:
+        while True:
+            await in_flight.acquire()
+            line = await reader.run(stdin.readline)
+            if not line:
+                in_flight.release()
+                break
+            if not line.strip():
+                in_flight.release()
+                continue
+            task = asyncio.ensure_future(respond(line))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+    finally:
+        reader.shutdown(wait=False)
+        writer.shutdown()
+
+async def main_async():
+    dispatcher.start()
+    logger.info("stdio server started", extra={"root_dir": dispatcher.ROOT_DIR})
+    try:
+        await serve(sys.stdin.buffer, sys.stdout.buffer)
+    finally:
+        dispatcher.shutdown()
+
+def main():
+    asyncio.run(main_async())
+
+if __name__ == "__main__":
+    main()
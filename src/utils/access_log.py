@@ -0,0 +1,53 @@
+import time
+
+from src.utils.logger import get_logger
+from src.utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+# WebSocket and stdio messages bypass this middleware; they are counted by
+# mcp_message_bytes_sent_total
+HTTP_RESPONSE_BYTES = REGISTRY.counter(
+    "mcp_http_response_bytes_total",
+    "Bytes of HTTP response bodies sent (WebSocket and stdio excluded)",
+)
+
+class AccessLogMiddleware:
+    """ASGI middleware logging one line per HTTP request.
+
+    Each line has the request's status, response size and duration.
+    Response bodies are counted as they are sent, never buffered, so
+    streamed responses are measured too.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = None
+        response_bytes = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_RESPONSE_BYTES.inc(amount=response_bytes)
+            logger.info("HTTP request completed", extra={
+                "http_method": scope["method"],
+                "http_path": scope["path"],
+                "status_code": status_code,
+                "response_bytes": response_bytes,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            })
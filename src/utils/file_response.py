@@ -0,0 +1,130 @@
+"""Raw file responses with byte ranges.
+
+Starlette's FileResponse neither supports Range requests nor sends from an
+already open descriptor, so the validators (ETag) could describe a
+different file than the one sent if it is replaced in between.
+"""
+import os
+from typing import Optional
+
+from starlette.responses import Response
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches etag (weak comparison)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag.removeprefix("W/"):
+            return True
+    return False
+
+def parse_range(header: Optional[str], size: int) -> Optional[tuple]:
+    """Parse a single "bytes=" Range header into (start, end), end exclusive.
+
+    Returns None when the whole file should be sent: no header, a malformed
+    one or several ranges (which the server may ignore). Raises ValueError
+    for a range that lies outside the file.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    digits = all(part.isascii() and part.isdigit() for part in (first, last) if part)
+    if not sep or not (first or last) or not digits:
+        return None
+    if first:
+        start = int(first)
+        end = int(last) + 1 if last else size
+        if last and end <= start:
+            return None
+    else:
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError("Empty suffix range")
+        start, end = max(size - suffix, 0), size
+    if start >= size:
+        raise ValueError(f"Range starts beyond the end of the file ({size} bytes)")
+    return start, min(end, size)
+
+class FileRangeResponse(Response):
+    """Sends count bytes of an open file starting at offset, then closes it.
+
+    Uses the ASGI zero-copy send extension (sendfile) when the server offers
+    it; otherwise the file is read in chunks with os.pread through `run`, a
+    worker pool's run method, so reads never block the event loop.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(
+        self,
+        fd: int,
+        offset: int,
+        count: int,
+        run,
+        status_code: int = 200,
+        headers: Optional[dict] = None,
+        media_type: Optional[str] = None,
+        send_body: bool = True,
+    ):
+        self.file = os.fdopen(fd, "rb", buffering=0)
+        self.offset = offset
+        self.count = count
+        self.run = run
+        self.status_code = status_code
+        self.media_type = media_type
+        self.send_body = send_body
+        self.background = None
+        self.init_headers({**(headers or {}), "content-length": str(count)})
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": self.status_code,
+                    "headers": self.raw_headers,
+                }
+            )
+            if not self.send_body or self.count == 0:
+                await send(
+                    {"type": "http.response.body", "body": b"", "more_body": False}
+                )
+            elif "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": self.file,
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False,
+                })
+            else:
+                await self._send_chunks(send)
+        finally:
+            self.file.close()
+
+    async def _send_chunks(self, send):
+        fd = self.file.fileno()
+        offset = self.offset
+        remaining = self.count
+        while remaining > 0:
+            chunk = await self.run(
+                os.pread, fd, min(self.chunk_size, remaining), offset
+            )
+            if not chunk:
+                # The file was truncated after it was opened
+                break
+            offset += len(chunk)
+            remaining -= len(chunk)
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0,
+                }
+            )
+        if remaining > 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
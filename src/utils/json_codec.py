@@ -0,0 +1,37 @@
+"""JSON encoding for JSON-RPC bodies, using orjson when it is installed.
+
+orjson encodes straight to UTF-8 bytes, so a multi-MB string result is
+copied once into the response body. The standard library fallback builds
+a str first and then encodes it, matching Starlette's JSONResponse output.
+This module does not import Starlette, so the stdio transport can use it.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+def dumps(content, default=None) -> bytes:
+    """Encode content; default is called for objects neither encoder supports."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                content, default=default, option=orjson.OPT_NON_STR_KEYS
+            )
+        except TypeError:
+            # e.g. integers wider than 64 bits; the standard encoder handles them
+            pass
+    return json.dumps(
+        content,
+        default=default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+def loads(body: bytes):
+    """Parse a request body; raises ValueError if it is not valid JSON."""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
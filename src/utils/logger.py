@@ -1,29 +1,122 @@
-import logging
-import json
+import atexit
+import copy
 import datetime
+import logging
+import os
+import queue
+import random
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+from src.utils.json_codec import dumps
+
+# Attributes every LogRecord has; everything else on a record came from `extra`
+_RECORD_ATTRIBUTES = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", (), None))
+) | {"message", "asctime"}
+
+# Verbosity of the server's loggers
+LOG_LEVEL = os.getenv("MCP_LOG_LEVEL", "INFO").upper()
+# Records waiting to be written; further records are dropped while the queue is full
+LOG_QUEUE_SIZE = int(os.getenv("MCP_LOG_QUEUE_SIZE", "10000"))
+# Fraction of records kept per level, e.g. "DEBUG=0.01,INFO=0.1";
+# unlisted levels keep everything
+LOG_SAMPLE_RATES = os.getenv("MCP_LOG_SAMPLE_RATES", "")
+
+def parse_sample_rates(spec: str) -> dict:
+    """Parse "LEVEL=rate,..." into {levelno: rate}."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        level, _, rate = item.partition("=")
+        levelno = logging.getLevelName(level.strip().upper())
+        if not isinstance(levelno, int):
+            raise ValueError(f"Unknown log level in MCP_LOG_SAMPLE_RATES: {level}")
+        rates[levelno] = float(rate)
+    return rates
 
 class JsonFormatter(logging.Formatter):
     def format(self, record):
+        created = datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc)
         log_entry = {
-            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "timestamp": created.isoformat(),
             "level": record.levelname,
+            "logger": record.name,
             "message": record.getMessage(),
         }
-        if hasattr(record, 'extra') and record.extra:
-            log_entry.update(record.extra)
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                log_entry[key] = value
         if record.exc_info:
             log_entry["exc_info"] = self.formatException(record.exc_info)
-        
-        return json.dumps(log_entry)
+        elif record.exc_text:
+            log_entry["exc_info"] = record.exc_text
+
+        return dumps(log_entry, default=str).decode("utf-8")
+
+class SamplingFilter(logging.Filter):
+    """Keeps a random fraction of the records of each level."""
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        rate = self.rates.get(record.levelno, 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+class DroppingQueueHandler(QueueHandler):
+    """Hands records to the listener thread without blocking the caller.
+
+    Only the message is merged here; JSON encoding and writing happen on
+    the listener thread. Records are dropped (and counted) while the queue
+    is full rather than stalling the event loop.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_handler = None
+_listener = None
+_setup_lock = threading.Lock()
+
+def _queue_handler() -> DroppingQueueHandler:
+    global _handler, _listener
+    with _setup_lock:
+        if _handler is None:
+            log_queue = queue.Queue(LOG_QUEUE_SIZE)
+            stream_handler = logging.StreamHandler()
+            stream_handler.setFormatter(JsonFormatter())
+            _handler = DroppingQueueHandler(log_queue)
+            _handler.addFilter(SamplingFilter(parse_sample_rates(LOG_SAMPLE_RATES)))
+            _listener = QueueListener(log_queue, stream_handler)
+            _listener.start()
+            atexit.register(_listener.stop)
+        return _handler
+
+def dropped_records() -> int:
+    return _handler.dropped if _handler is not None else 0
 
 def get_logger(name: str) -> logging.Logger:
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
-    
+    logger.setLevel(LOG_LEVEL)
+
     if not logger.handlers:
-        handler = logging.StreamHandler()
-        formatter = JsonFormatter()
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-    
-    return logger
\ No newline at end of file
+        logger.addHandler(_queue_handler())
+
+    return logger
@@ -0,0 +1,187 @@
+"""Minimal Prometheus-compatible metrics.
+
+Counters and histograms are updated in place under a lock and only turned
+into text when ``/metrics`` is scraped. Values that other components
+already track (pool queue depth, cache hits) are read at scrape time
+through collector callbacks instead of being updated on every call.
+"""
+import bisect
+import math
+import threading
+
+# Request latency buckets, in seconds
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _sample(name: str, labelnames: tuple, labels: tuple, value: float) -> str:
+    return f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}"
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues) -> float:
+        with self._lock:
+            return self._values.get(labelvalues, 0)
+
+    def render(self) -> list:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        for labels, value in values:
+            lines.append(_sample(self.name, self.labelnames, labels, value))
+        return lines
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                entry = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self) -> list:
+        with self._lock:
+            values = sorted(
+                (labels, (list(counts), total))
+                for labels, (counts, total) in self._values.items()
+            )
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        names = self.labelnames + ("le",)
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                bucket = labels + (_format_value(bound),)
+                lines.append(_sample(f"{self.name}_bucket", names, bucket, cumulative))
+            lines += [
+                _sample(f"{self.name}_sum", self.labelnames, labels, total),
+                _sample(f"{self.name}_count", self.labelnames, labels, cumulative),
+            ]
+        return lines
+
+class GaugeCollector:
+    """A gauge (or counter) whose samples a callback produces at scrape time.
+
+    The callback returns (labelvalues, value) pairs.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple,
+        collect,
+        metric_type: str = "gauge",
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+        self.metric_type = metric_type
+
+    def render(self) -> list:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        lines += [
+            _sample(self.name, self.labelnames, tuple(labels), value)
+            for labels, value in self.collect()
+        ]
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def collector(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple,
+        collect,
+        metric_type: str = "gauge",
+    ) -> GaugeCollector:
+        return self.register(
+            GaugeCollector(name, documentation, labelnames, collect, metric_type)
+        )
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Metrics of the running server
+REGISTRY = Registry()
@@ -0,0 +1,174 @@
+import fnmatch
+import os
+import re
+from typing import Optional
+
+# Version control metadata, dependency and cache directories skipped unless disabled
+DEFAULT_EXCLUDES = (
+    ".git",
+    ".hg",
+    ".svn",
+    "node_modules",
+    "__pycache__",
+    ".venv",
+    "venv",
+)
+
+def _translate_gitignore_glob(glob: str) -> str:
+    regex = ""
+    i = 0
+    while i < len(glob):
+        if glob.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif glob.startswith("/**", i) and i + 3 == len(glob):
+            regex += "/.*"
+            i += 3
+        elif glob[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif glob[i] == "?":
+            regex += "[^/]"
+            i += 1
+        elif glob[i] == "[":
+            end = glob.find("]", i + 2)
+            if end == -1:
+                regex += re.escape(glob[i])
+                i += 1
+            else:
+                body = glob[i + 1:end].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex += f"[{body}]"
+                i = end + 1
+        elif glob[i] == "\\" and i + 1 < len(glob):
+            regex += re.escape(glob[i + 1])
+            i += 2
+        else:
+            regex += re.escape(glob[i])
+            i += 1
+    return regex
+
+class GitIgnoreRule:
+    def __init__(self, base_parts: tuple, pattern: str):
+        self.base_parts = base_parts
+        self.negated = pattern.startswith("!")
+        if self.negated:
+            pattern = pattern[1:]
+        self.directory_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        # Patterns without an inner slash match at any depth below the .gitignore
+        anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+        prefix = "" if anchored else "(?:.*/)?"
+        self.regex = re.compile(prefix + _translate_gitignore_glob(pattern) + r"\Z")
+
+    def matches(self, parts: tuple, is_dir: bool) -> bool:
+        if self.directory_only and not is_dir:
+            return False
+        if parts[:len(self.base_parts)] != self.base_parts:
+            return False
+        return self.regex.match("/".join(parts[len(self.base_parts):])) is not None
+
+def load_gitignore(directory: str, base_parts: tuple) -> list:
+    """Parse the .gitignore in directory, if any.
+
+    base_parts is its location relative to the root.
+    """
+    try:
+        with open(
+            os.path.join(directory, ".gitignore"),
+            "r",
+            encoding="utf-8",
+            errors="ignore",
+        ) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+    rules = []
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("\\#") or line.startswith("\\!"):
+            line = line[1:]
+        rules.append(GitIgnoreRule(base_parts, line))
+    return rules
+
+class PathFilter:
+    """Decides which entries of a directory walk are visited.
+
+    ``include`` and ``exclude`` are shell-style globs matched against both
+    the entry name and its path relative to the directory being walked;
+    ``exclude`` extends DEFAULT_EXCLUDES unless ``default_excludes`` is
+    False. Excluded directories are pruned, so nothing below them is read. With
+    ``gitignore`` enabled, .gitignore files from the root down to each
+    directory are honoured, later and deeper rules taking precedence.
+    """
+
+    def __init__(
+        self,
+        include: Optional[list] = None,
+        exclude: Optional[list] = None,
+        gitignore: bool = False,
+        default_excludes: bool = True,
+    ):
+        self.include = list(include) if include else None
+        defaults = list(DEFAULT_EXCLUDES) if default_excludes else []
+        self.exclude = defaults + list(exclude or [])
+        self.gitignore = gitignore
+
+    def options(self) -> dict:
+        """The settings that decide which entries are visited.
+
+        Used e.g. to tie a cursor to them.
+        """
+        return {
+            "include": self.include,
+            "exclude": self.exclude,
+            "gitignore": self.gitignore,
+        }
+
+    def initial_rules(self, root_dir: str, base_parts: tuple) -> list:
+        """The .gitignore rules in effect for the directory a walk starts in."""
+        if not self.gitignore:
+            return []
+        rules = []
+        for depth in range(len(base_parts) + 1):
+            rules.extend(
+                load_gitignore(
+                    os.path.join(root_dir, *base_parts[:depth]), base_parts[:depth]
+                )
+            )
+        return rules
+
+    def enter_directory(self, rules: list, directory: str, parts: tuple) -> list:
+        if not self.gitignore:
+            return rules
+        own = load_gitignore(directory, parts)
+        return rules + own if own else rules
+
+    def _matches_any(self, globs: list, name: str, relative: str) -> bool:
+        return any(
+            fnmatch.fnmatchcase(name, glob) or fnmatch.fnmatchcase(relative, glob)
+            for glob in globs
+        )
+
+    def is_excluded(
+        self, parts: tuple, relative: str, is_dir: bool, rules: list
+    ) -> bool:
+        """Whether the entry is excluded by a glob or a .gitignore rule.
+
+        parts is relative to the root (for .gitignore); relative is relative to
+        the walked directory (for globs).
+        """
+        if self._matches_any(self.exclude, parts[-1], relative):
+            return True
+        ignored = False
+        for rule in rules:
+            if rule.negated == ignored and rule.matches(parts, is_dir):
+                ignored = not rule.negated
+        return ignored
+
+    def is_included(self, name: str, relative: str) -> bool:
+        return self.include is None or self._matches_any(self.include, name, relative)
@@ -0,0 +1,183 @@
+import os
+import threading
+from collections import OrderedDict
+from stat import S_ISLNK
+from typing import Optional
+
+from src.utils.security import is_within
+
+# Most parent directories whose real path is remembered
+MAX_CACHED_DIRECTORIES = 4096
+
+class PathResolver:
+    """Maps request paths to absolute paths and keeps them inside the root.
+
+    ``os.path.realpath`` lstat's every component of a path and does the
+    string work for each. The real path of each parent directory is cached
+    instead, but only while a watcher reports every change below it: the
+    inotify backend is running, its queued events have been handled and
+    the directory is watched. A cached entry is also only used while the
+    directory keeps its inode and neither it nor an ancestor below the
+    root is a symlink. Without a watcher, every path goes through
+    ``os.path.realpath``.
+    """
+
+    def __init__(
+        self, root_dir: str, watcher=None, max_entries: int = MAX_CACHED_DIRECTORIES
+    ):
+        self.root_dir = os.path.abspath(root_dir)
+        self.real_root = os.path.realpath(self.root_dir)
+        self.max_entries = max_entries
+        self._watcher = watcher
+        self._parents = OrderedDict()
+        # How many cached directories each directory is (or is an ancestor of),
+        # for invalidation
+        self._covered = {}
+        self._lock = threading.Lock()
+        # Bumped by every invalidation, so a real path resolved before one is
+        # not cached after it
+        self._epoch = 0
+        self._hits = 0
+        self._misses = 0
+        if watcher is not None:
+            watcher.subscribe(self._invalidate)
+
+    def resolve(self, path: str) -> str:
+        """The absolute path for path, which is relative to the root.
+
+        Raises ValueError if it leads outside the root.
+        """
+        full_path = os.path.abspath(os.path.join(self.root_dir, path))
+        if not self.is_inside(full_path):
+            raise ValueError("Attempted to access path outside root directory")
+        return full_path
+
+    def is_inside(self, full_path: str) -> bool:
+        """True if full_path, an absolute path, is inside the root once resolved."""
+        if full_path == self.root_dir:
+            return True
+        if not is_within(self.root_dir, full_path):
+            # Lexically outside; it can only get back in through a symlinked root
+            return is_within(self.real_root, os.path.realpath(full_path))
+
+        real_parent = self._real_parent(os.path.dirname(full_path))
+        if real_parent is None:
+            return is_within(self.real_root, os.path.realpath(full_path))
+        try:
+            is_link = S_ISLNK(os.lstat(full_path).st_mode)
+        except OSError:
+            # Paths that do not exist resolve like realpath() does: component by
+            # component
+            is_link = False
+        real_path = (
+            os.path.realpath(full_path)
+            if is_link
+            else os.path.join(real_parent, os.path.basename(full_path))
+        )
+        return is_within(self.real_root, real_path)
+
+    def _real_parent(self, directory: str) -> Optional[str]:
+        """The cached real path of directory, or None to use realpath()."""
+        if directory == self.root_dir:
+            return self.real_root
+        if self._watcher is None or not self._watcher.tracks(directory):
+            with self._lock:
+                self._misses += 1
+            return None
+        try:
+            st = os.lstat(directory)
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._parents.get(directory)
+            epoch = self._epoch
+        if (
+            cached is not None
+            and cached[1:] == (st.st_dev, st.st_ino)
+            and not self._has_symlink(directory, st)
+        ):
+            with self._lock:
+                if directory in self._parents:
+                    self._parents.move_to_end(directory)
+                self._hits += 1
+            return cached[0]
+        with self._lock:
+            self._misses += 1
+
+        real_directory = os.path.realpath(directory)
+        lexical = os.path.join(
+            self.real_root, os.path.relpath(directory, self.root_dir)
+        )
+        if real_directory != lexical:
+            # Reached through a symlink; such directories are never cached
+            return None
+        try:
+            real_st = os.lstat(real_directory)
+        except OSError:
+            return None
+        if (real_st.st_dev, real_st.st_ino) != (st.st_dev, st.st_ino):
+            # Changed while it was being resolved; do not cache
+            return None
+        with self._lock:
+            if self._epoch != epoch:
+                return real_directory
+            if directory not in self._parents:
+                self._cover(directory, 1)
+            self._parents[directory] = (real_directory, st.st_dev, st.st_ino)
+            self._parents.move_to_end(directory)
+            while len(self._parents) > self.max_entries:
+                evicted, _ = self._parents.popitem(last=False)
+                self._cover(evicted, -1)
+        return real_directory
+
+    def _has_symlink(self, directory: str, st) -> bool:
+        """True if directory or an ancestor below the root is a symlink (or gone)."""
+        if S_ISLNK(st.st_mode):
+            return True
+        parent = os.path.dirname(directory)
+        while parent != self.root_dir:
+            try:
+                if S_ISLNK(os.lstat(parent).st_mode):
+                    return True
+            except OSError:
+                return True
+            parent = os.path.dirname(parent)
+        return False
+
+    def _cover(self, directory: str, delta: int):
+        while True:
+            count = self._covered.get(directory, 0) + delta
+            if count:
+                self._covered[directory] = count
+            else:
+                self._covered.pop(directory, None)
+            parent = os.path.dirname(directory)
+            if parent == directory or not is_within(self.root_dir, parent):
+                return
+            directory = parent
+
+    def _invalidate(self, paths):
+        with self._lock:
+            self._epoch += 1
+            if paths is None:
+                self._parents.clear()
+                self._covered.clear()
+                return
+            for changed in paths:
+                if changed not in self._covered:
+                    continue
+                prefix = changed + os.sep
+                stale = [
+                    d for d in self._parents if d == changed or d.startswith(prefix)
+                ]
+                for directory in stale:
+                    del self._parents[directory]
+                    self._cover(directory, -1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._parents),
+                "hits": self._hits,
+                "misses": self._misses,
+            }
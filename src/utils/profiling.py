@@ -0,0 +1,79 @@
+"""Opt-in cProfile sessions covering a single request.
+
+Only the worker-pool jobs of a profiled request are profiled, each in
+the thread that runs it; the profiles are merged when the request
+finishes. The event loop is left alone, since a profiler enabled there
+would also record every other request's coroutines. Profiled jobs run one
+at a time, because Python 3.12+ allows a single active profiler per
+process.
+"""
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from typing import Optional
+
+_current = contextvars.ContextVar("mcp_profile", default=None)
+_profiler_lock = threading.Lock()
+
+class ProfileSession:
+    def __init__(self):
+        self._profiles = []
+        self._lock = threading.Lock()
+
+    def run(self, fn, *args, **kwargs):
+        """Call fn under a fresh profiler and keep its profile."""
+        profiler = cProfile.Profile()
+        with _profiler_lock:
+            profiler.enable()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profiler.disable()
+                with self._lock:
+                    self._profiles.append(profiler)
+
+    def stats(self) -> Optional[pstats.Stats]:
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0], stream=io.StringIO())
+        for profiler in profiles[1:]:
+            stats.add(profiler)
+        return stats
+
+    def report(self, limit: int = 40) -> str:
+        """The top functions by cumulative time, as pstats prints them."""
+        stats = self.stats()
+        if stats is None:
+            return ""
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+    def dump(self, directory: str) -> Optional[str]:
+        """Write the merged profile to directory and return its path.
+
+        The file can be opened with pstats or snakeviz.
+        """
+        stats = self.stats()
+        if stats is None:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        name = f"mcp-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{id(self):x}.prof"
+        path = os.path.join(directory, name)
+        stats.dump_stats(path)
+        return path
+
+def start_profile() -> ProfileSession:
+    session = ProfileSession()
+    _current.set(session)
+    return session
+
+def current_profile() -> Optional[ProfileSession]:
+    return _current.get()
@@ -1,12 +1,19 @@
 import os
 
+def is_within(base_dir: str, target_path: str) -> bool:
+    """True if target_path is base_dir or below it, comparing whole path components."""
+    if target_path == base_dir:
+        return True
+    prefix = base_dir if base_dir.endswith(os.sep) else base_dir + os.sep
+    return target_path.startswith(prefix)
+
 def is_path_safe(base_dir: str, target_path: str) -> bool:
-    # Resolve to absolute paths to handle '..' and symlinks
-    base_dir = os.path.abspath(base_dir)
-    
+    # Resolve both paths, following symlinks, so that a symlinked root or a
+    # symlink inside it pointing elsewhere are judged by where they lead
+    real_base_dir = os.path.realpath(base_dir)
+
     # Resolve the real path of the target, following symlinks
     real_target_path = os.path.realpath(target_path)
 
-    # Check if the real target path starts with the base directory
-    return real_target_path.startswith(base_dir)
-
+    # A plain prefix check would accept siblings such as /data-private for /data
+    return is_within(real_base_dir, real_target_path)
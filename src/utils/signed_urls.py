@@ -0,0 +1,26 @@
+import base64
+import hashlib
+import hmac
+import time
+
+class UrlSigner:
+    """Signs paths with an expiry time so they can be fetched without credentials."""
+
+    def __init__(self, secret: bytes, ttl: float):
+        self.secret = secret
+        self.ttl = ttl
+
+    def signature(self, path: str, expires: int) -> str:
+        message = f"{path}\n{expires}".encode("utf-8")
+        digest = hmac.new(self.secret, message, hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).decode("ascii").rstrip("=")
+
+    def sign(self, path: str) -> tuple:
+        """Return (expires, signature) for path, valid for ttl seconds."""
+        expires = int(time.time() + self.ttl)
+        return expires, self.signature(path, expires)
+
+    def verify(self, path: str, expires: int, signature: str) -> bool:
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self.signature(path, expires), signature)
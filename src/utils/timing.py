@@ -0,0 +1,67 @@
+"""Per-request phase timings.
+
+A request installs a Timings object in a context variable; code anywhere
+below it (including FileBrowser calls on worker threads, which run in a
+copy of the request's context) wraps its work in ``with phase("read"):``.
+Outside a request, ``phase`` does nothing beyond one context variable
+lookup.
+"""
+import contextvars
+import threading
+import time
+from typing import Optional
+
+_current = contextvars.ContextVar("mcp_timings", default=None)
+
+class Timings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._phases = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        # Phases can be recorded from several worker threads at once (fs.readFiles)
+        with self._lock:
+            self._phases[name] = self._phases.get(name, 0.0) + seconds
+
+    def as_dict(self) -> dict:
+        """Milliseconds spent per phase, plus the total since the request started."""
+        with self._lock:
+            timings = {
+                name: round(seconds * 1000, 3) for name, seconds in self._phases.items()
+            }
+        timings["total"] = round((time.perf_counter() - self.started) * 1000, 3)
+        return timings
+
+    def server_timing(self) -> str:
+        """The timings as a Server-Timing header value."""
+        return ", ".join(f"{name};dur={ms}" for name, ms in self.as_dict().items())
+
+class _Phase:
+    __slots__ = ("name", "timings", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.timings = _current.get()
+        if self.timings is not None:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.timings is not None:
+            self.timings.add(self.name, time.perf_counter() - self.started)
+        return False
+
+def phase(name: str) -> _Phase:
+    return _Phase(name)
+
+def start_timings() -> Timings:
+    """Install fresh timings for the current request (task) and return them."""
+    timings = Timings()
+    _current.set(timings)
+    return timings
+
+def current_timings() -> Optional[Timings]:
+    return _current.get()
@@ -0,0 +1,70 @@
+import pytest
+import os
+
+def test_batch_request_returns_responses_in_order(client, server_root_dir):
+    for i in range(5):
+        with open(os.path.join(server_root_dir, f"batch_file_{i}.txt"), "w") as f:
+            f.write(f"content {i}")
+
+    try:
+        batch = [
+            {
+                "jsonrpc": "2.0",
+                "method": "fs.readFile",
+                "params": {"path": f"batch_file_{i}.txt"},
+                "id": i,
+            }
+            for i in range(5)
+        ]
+        response = client.post("/", json=batch)
+
+        assert response.status_code == 200
+        results = response.json()
+        assert isinstance(results, list)
+        assert [r["id"] for r in results] == [0, 1, 2, 3, 4]
+        assert [r["result"] for r in results] == [f"content {i}" for i in range(5)]
+    finally:
+        for i in range(5):
+            os.remove(os.path.join(server_root_dir, f"batch_file_{i}.txt"))
+
+def test_batch_request_keeps_errors_per_call(client, server_root_dir):
+    with open(os.path.join(server_root_dir, "batch_ok.txt"), "w") as f:
+        f.write("ok")
+
+    try:
+        batch = [
+            {
+                "jsonrpc": "2.0",
+                "method": "fs.readFile",
+                "params": {"path": "batch_ok.txt"},
+                "id": "a",
+            },
+            {
+                "jsonrpc": "2.0",
+                "method": "fs.readFile",
+                "params": {"path": "batch_missing.txt"},
+                "id": "b",
+            },
+            {"jsonrpc": "2.0", "method": "nonExistentMethod", "id": "c"},
+            "not an object",
+        ]
+        response = client.post("/", json=batch)
+
+        assert response.status_code == 200
+        results = response.json()
+        assert len(results) == 4
+        assert results[0]["result"] == "ok"
+        assert results[1]["id"] == "b"
+        assert results[1]["error"]["code"] == -32000
+        assert results[2]["error"]["code"] == -32601
+        assert results[3]["error"]["code"] == -32600
+        assert results[3]["id"] is None
+    finally:
+        os.remove(os.path.join(server_root_dir, "batch_ok.txt"))
+
+def test_empty_batch_request(client):
+    response = client.post("/", json=[])
+    assert response.status_code == 200
+    result = response.json()
+    assert result["error"]["code"] == -32600
+    assert result["id"] is None
@@ -0,0 +1,82 @@
+import pytest
+import os
+import shutil
+
+@pytest.fixture
+def bulk_dir(server_root_dir):
+    test_dir = os.path.join(server_root_dir, "test_bulk_dir")
+    os.makedirs(test_dir, exist_ok=True)
+    for name, content in (("a.txt", "aaaa"), ("b.txt", "bbbbbb"), ("c.txt", "cc")):
+        with open(os.path.join(test_dir, name), "w") as f:
+            f.write(content)
+    yield test_dir
+    shutil.rmtree(test_dir)
+
+def call(client, method, params):
+    response = client.post(
+        "/", json={"jsonrpc": "2.0", "method": method, "params": params, "id": 1}
+    )
+    assert response.status_code == 200
+    return response.json()
+
+def test_stat_many(client, bulk_dir):
+    paths = [
+        "test_bulk_dir/a.txt",
+        "test_bulk_dir",
+        "test_bulk_dir/missing.txt",
+        "../outside",
+    ]
+    result = call(client, "fs.statMany", {"paths": paths})["result"]
+    assert [entry["path"] for entry in result] == paths
+    assert result[0]["type"] == "file" and result[0]["size"] == 4
+    assert result[1]["type"] == "directory"
+    assert result[2]["error"]["message"] == "File not found"
+    assert result[3]["error"]["message"] == "Server error"
+
+def test_read_files_within_budget(client, bulk_dir):
+    paths = [
+        "test_bulk_dir/a.txt",
+        "test_bulk_dir/missing.txt",
+        "test_bulk_dir/b.txt",
+        "test_bulk_dir",
+        "test_bulk_dir/c.txt",
+    ]
+    result = call(
+        client,
+        "fs.readFiles",
+        {"paths": paths, "max_bytes_per_file": 5, "max_total_bytes": 8},
+    )["result"]
+
+    assert result[0] == {
+        "path": paths[0],
+        "content": "aaaa",
+        "encoding": "utf-8",
+        "size": 4,
+        "truncated": False,
+    }
+    assert result[1]["error"]["code"] == -32000
+    # 5 bytes per file, but only 4 left of the total budget
+    assert result[2] == {
+        "path": paths[2],
+        "content": "bbbb",
+        "encoding": "utf-8",
+        "size": 6,
+        "truncated": True,
+    }
+    assert result[3]["error"]["message"] == "File not found"
+    assert result[4] == {
+        "path": paths[4],
+        "size": 2,
+        "truncated": True,
+        "budget_exhausted": True,
+    }
+
+@pytest.mark.parametrize("method,params", [
+    ("fs.statMany", {}),
+    ("fs.statMany", {"paths": "a.txt"}),
+    ("fs.readFiles", {"paths": [1]}),
+    ("fs.readFiles", {"paths": ["a.txt"], "max_total_bytes": 0}),
+    ("fs.readFiles", {"paths": ["a.txt"], "max_total_bytes": True}),
+])
+def test_bulk_methods_invalid_params(client, method, params):
+    assert call(client, method, params)["error"]["code"] == -32602
@@ -0,0 +1,60 @@
+import pytest
+import os
+
+def read_file_request(path):
+    return {
+        "jsonrpc": "2.0",
+        "method": "fs.readFile",
+        "params": {"path": path},
+        "id": 1,
+    }
+
+def test_large_responses_are_gzipped(client, server_root_dir):
+    content = "def f():\n    return 42\n" * 2000
+    test_file_path = os.path.join(server_root_dir, "compressible.py")
+    with open(test_file_path, "w") as f:
+        f.write(content)
+
+    try:
+        for _ in range(2):
+            response = client.post(
+                "/",
+                json=read_file_request("compressible.py"),
+                headers={"Accept-Encoding": "gzip"},
+            )
+            assert response.status_code == 200
+            assert response.headers["content-encoding"] == "gzip"
+            assert int(response.headers["content-length"]) < len(content) // 5
+            assert "Accept-Encoding" in response.headers["vary"]
+            assert response.json()["result"] == content
+
+        assert client.get("/stats").json()["compressed_cache"]["hits"] >= 1
+    finally:
+        os.remove(test_file_path)
+
+def test_small_or_unaccepted_responses_are_not_compressed(client, server_root_dir):
+    small_path = os.path.join(server_root_dir, "small.txt")
+    big_path = os.path.join(server_root_dir, "big.txt")
+    with open(small_path, "w") as f:
+        f.write("tiny")
+    with open(big_path, "w") as f:
+        f.write("a" * 100000)
+
+    try:
+        response = client.post(
+            "/",
+            json=read_file_request("small.txt"),
+            headers={"Accept-Encoding": "gzip"},
+        )
+        assert "content-encoding" not in response.headers
+
+        response = client.post(
+            "/",
+            json=read_file_request("big.txt"),
+            headers={"Accept-Encoding": "identity"},
+        )
+        assert "content-encoding" not in response.headers
+        assert response.json()["result"] == "a" * 100000
+    finally:
+        os.remove(small_path)
+        os.remove(big_path)
@@ -0,0 +1,35 @@
+import pytest
+import os
+
+def read(client, params):
+    response = client.post(
+        "/", json={"jsonrpc": "2.0", "method": "fs.readFile", "params": params, "id": 1}
+    )
+    return response.json()
+
+def test_conditional_read_file(client, server_root_dir):
+    test_file_path = os.path.join(server_root_dir, "conditional.txt")
+    with open(test_file_path, "w") as f:
+        f.write("version 1")
+
+    try:
+        first = read(client, {"path": "conditional.txt", "etag": True})["result"]
+        assert first["content"] == "version 1"
+
+        conditional = {"path": "conditional.txt", "if_none_match": first["etag"]}
+        result = read(client, conditional)["result"]
+        assert result == {"not_modified": True, "etag": first["etag"], "size": 9}
+
+        with open(test_file_path, "w") as f:
+            f.write("version 2!")
+        result = read(client, conditional)["result"]
+        assert result["content"] == "version 2!"
+        assert result["etag"] != first["etag"]
+    finally:
+        os.remove(test_file_path)
+
+def test_conditional_read_file_errors(client):
+    error = read(client, {"path": "conditional.txt", "if_none_match": 5})["error"]
+    assert error["code"] == -32602
+    error = read(client, {"path": "missing.txt", "if_none_match": '"x"'})["error"]
+    assert error["message"] == "File not found"
@@ -80,3 +80,60 @@ def test_search_in_nonexistent_directory(client: Client):
     assert "error" in response_json
     assert response_json["error"]["code"] == -32000
     assert "attempted to access path outside root directory" in response_json["error"]["message"].lower()
+
+def test_search_with_include_exclude_and_gitignore(client: Client, server_root_dir):
+    """
+    Test include/exclude globs and .gitignore handling.
+    """
+    test_dir = os.path.join(server_root_dir, "test_search_filter_dir")
+    os.makedirs(os.path.join(test_dir, "vendor"), exist_ok=True)
+    try:
+        with open(os.path.join(test_dir, ".gitignore"), "w") as f:
+            f.write("*.tmp\n")
+        for name in (
+            "keep.py",
+            "skip.txt",
+            "scratch.tmp",
+            os.path.join("vendor", "lib.py"),
+        ):
+            with open(os.path.join(test_dir, name), "w") as f:
+                f.write("hello\n")
+
+        response = client.post(
+            "/",
+            json={
+                "method": "fs.search",
+                "params": {
+                    "path": "test_search_filter_dir",
+                    "pattern": "hello",
+                    "include": ["*.py", "*.tmp"],
+                    "exclude": ["vendor"],
+                    "gitignore": True,
+                },
+                "id": 1,
+                "jsonrpc": "2.0",
+            },
+        )
+
+        assert response.status_code == 200
+        results = response.json()["result"]
+        assert [r["file_path"].replace("\\", "/") for r in results] == [
+            "test_search_filter_dir/keep.py"
+        ]
+
+        response = client.post(
+            "/",
+            json={
+                "method": "fs.search",
+                "params": {
+                    "path": "test_search_filter_dir",
+                    "pattern": "hello",
+                    "include": "*.py",
+                },
+                "id": 2,
+                "jsonrpc": "2.0",
+            },
+        )
+        assert response.json()["error"]["code"] == -32602
+    finally:
+        shutil.rmtree(test_dir)
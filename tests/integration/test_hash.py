@@ -0,0 +1,39 @@
+import pytest
+import hashlib
+import os
+import shutil
+
+def call_hash(client, params):
+    response = client.post(
+        "/", json={"jsonrpc": "2.0", "method": "fs.hash", "params": params, "id": 1}
+    )
+    return response.json()
+
+def test_hash_paths_and_directories(client, server_root_dir):
+    test_dir = os.path.join(server_root_dir, "hashed")
+    os.makedirs(test_dir, exist_ok=True)
+    with open(os.path.join(test_dir, "a.txt"), "w") as f:
+        f.write("alpha")
+
+    try:
+        result = call_hash(client, {"path": "hashed/a.txt"})["result"]
+        assert result["digest"] == hashlib.sha256(b"alpha").hexdigest()
+
+        response = call_hash(client, {"path": "hashed", "algorithm": "crc32"})
+        directory = response["result"]
+        assert directory["type"] == "directory"
+        assert directory["files"] == 1
+
+        paths = ["hashed/a.txt", "hashed/missing.txt"]
+        entries = call_hash(client, {"paths": paths, "algorithm": "blake2b"})["result"]
+        expected = hashlib.blake2b(b"alpha", digest_size=32).hexdigest()
+        assert entries[0]["digest"] == expected
+        assert entries[1]["error"]["message"] == "File not found"
+    finally:
+        shutil.rmtree(test_dir)
+
+def test_hash_invalid_params(client):
+    error = call_hash(client, {"path": ".", "algorithm": "md5"})["error"]
+    assert error["code"] == -32602
+    assert call_hash(client, {})["error"]["code"] == -32602
+    assert call_hash(client, {"paths": "a.txt"})["error"]["code"] == -32602
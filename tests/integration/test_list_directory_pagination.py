@@ -0,0 +1,67 @@
+import pytest
+import os
+import shutil
+
+def test_list_directory_pagination(client, server_root_dir):
+    test_dir = os.path.join(server_root_dir, "test_list_pages_dir")
+    os.makedirs(test_dir, exist_ok=True)
+    try:
+        for i in range(5):
+            with open(os.path.join(test_dir, f"file{i}.txt"), "w") as f:
+                f.write("x" * i)
+
+        def list_page(**params):
+            response = client.post(
+                "/",
+                json={
+                    "jsonrpc": "2.0",
+                    "method": "fs.listDirectory",
+                    "params": {"path": "test_list_pages_dir", **params},
+                    "id": 1,
+                },
+            )
+            assert response.status_code == 200
+            return response.json()["result"]
+
+        first = list_page(limit=3, fields=["name", "size"], sort="size", order="desc")
+        assert first["files"] == [
+            {"name": "file4.txt", "size": 4},
+            {"name": "file3.txt", "size": 3},
+            {"name": "file2.txt", "size": 2},
+        ]
+        assert first["next_cursor"]
+
+        second = list_page(
+            limit=3,
+            fields=["name", "size"],
+            sort="size",
+            order="desc",
+            cursor=first["next_cursor"],
+        )
+        assert [f["name"] for f in second["files"]] == ["file1.txt", "file0.txt"]
+        assert second["next_cursor"] is None
+    finally:
+        shutil.rmtree(test_dir)
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"limit": 0},
+        {"limit": True},
+        {"fields": ["owner"]},
+        {"sort": "type"},
+        {"order": "up"},
+        {"cursor": 1},
+    ],
+)
+def test_list_directory_invalid_params(client, params):
+    response = client.post(
+        "/",
+        json={
+            "jsonrpc": "2.0",
+            "method": "fs.listDirectory",
+            "params": params,
+            "id": 1,
+        },
+    )
+    assert response.json()["error"]["code"] == -32602
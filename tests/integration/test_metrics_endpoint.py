@@ -0,0 +1,50 @@
+import pytest
+import json
+
+from websockets.sync.client import connect
+
+def test_metrics_endpoint(client):
+    client.post(
+        "/",
+        json={
+            "jsonrpc": "2.0",
+            "method": "fs.listDirectory",
+            "params": {"path": "."},
+            "id": 1,
+        },
+    )
+    client.post(
+        "/",
+        json={
+            "jsonrpc": "2.0",
+            "method": "fs.readFile",
+            "params": {"path": "does_not_exist.txt"},
+            "id": 2,
+        },
+    )
+    client.post(
+        "/", json={"jsonrpc": "2.0", "method": "no.such.method", "params": {}, "id": 3}
+    )
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'mcp_rpc_requests_total{method="fs.listDirectory"}' in text
+    assert 'mcp_rpc_errors_total{method="fs.readFile",code="-32000"}' in text
+    assert 'mcp_rpc_errors_total{method="other",code="-32601"}' in text
+    bucket = 'mcp_rpc_duration_seconds_bucket{method="fs.listDirectory",le="+Inf"}'
+    assert bucket in text
+    assert 'mcp_worker_pool_queued{pool="io"}' in text
+    assert 'mcp_cache_hit_ratio{cache="content"}' in text
+    assert "mcp_http_response_bytes_total" in text
+
+def test_metrics_count_websocket_messages(client, live_server_url):
+    ws_url = live_server_url.replace("http://", "ws://") + "/ws"
+    with connect(ws_url) as websocket:
+        request = {"jsonrpc": "2.0", "method": "fs.listDirectory", "id": 1}
+        websocket.send(json.dumps(request))
+        websocket.recv(timeout=10)
+
+    text = client.get("/metrics").text
+    assert 'mcp_message_bytes_sent_total{transport="websocket"}' in text
@@ -0,0 +1,73 @@
+import pytest
+import os
+import shutil
+
+def request_url(client, path):
+    response = client.post(
+        "/",
+        json={
+            "jsonrpc": "2.0",
+            "method": "fs.readFile",
+            "params": {"path": path, "as_url": True},
+            "id": 1,
+        },
+    )
+    return response.json()
+
+@pytest.fixture
+def binary_file(server_root_dir):
+    content = bytes(range(256)) * 1000
+    test_dir = os.path.join(server_root_dir, "raw dir")
+    os.makedirs(test_dir, exist_ok=True)
+    with open(os.path.join(test_dir, "data.bin"), "wb") as f:
+        f.write(content)
+    try:
+        yield content
+    finally:
+        shutil.rmtree(test_dir)
+
+def test_read_file_as_url(client, binary_file):
+    result = request_url(client, "./raw dir/data.bin")["result"]
+    assert result["size"] == len(binary_file)
+    assert result["url"].startswith("/raw/raw%20dir/data.bin?")
+
+    response = client.get(result["url"])
+    assert response.status_code == 200
+    assert response.content == binary_file
+    assert response.headers["etag"] == result["etag"]
+    assert response.headers["accept-ranges"] == "bytes"
+
+    response = client.get(result["url"], headers={"If-None-Match": result["etag"]})
+    assert response.status_code == 304
+    assert response.content == b""
+
+def test_raw_file_ranges(client, binary_file):
+    url = request_url(client, "raw dir/data.bin")["result"]["url"]
+
+    response = client.get(url, headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == binary_file[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(binary_file)}"
+
+    response = client.get(url, headers={"Range": "bytes=-100"})
+    assert response.content == binary_file[-100:]
+
+    response = client.get(url, headers={"Range": f"bytes={len(binary_file)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(binary_file)}"
+
+    response = client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == binary_file
+
+def test_raw_file_requires_valid_signature(client, binary_file):
+    url = request_url(client, "raw dir/data.bin")["result"]["url"]
+    assert client.get(url.replace("data.bin", "other.bin")).status_code == 403
+    assert client.get(url[:-2]).status_code == 403
+    assert client.get("/raw/raw%20dir/data.bin").status_code == 403
+
+def test_read_file_as_url_errors(client):
+    data = request_url(client, "no_such_file.bin")
+    assert data["error"]["message"] == "File not found"
+    data = request_url(client, "../outside.bin")
+    assert data["error"]["code"] == -32000
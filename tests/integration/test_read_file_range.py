@@ -0,0 +1,52 @@
+import pytest
+import os
+
+def test_read_file_range(client, server_root_dir):
+    test_file_path = os.path.join(server_root_dir, "range_test.log")
+    with open(test_file_path, "w") as f:
+        f.write("first line\nsecond line\nlast line\n")
+
+    try:
+        response = client.post(
+            "/",
+            json={
+                "jsonrpc": "2.0",
+                "method": "fs.readFile",
+                "params": {"path": "range_test.log", "offset": -10},
+                "id": 1
+            }
+        )
+        assert response.status_code == 200
+        result = response.json()["result"]
+        assert result["content"] == "last line\n"
+        assert result["offset"] == 23
+        assert result["total_size"] == 33
+        assert result["eof"] is True
+    finally:
+        os.remove(test_file_path)
+
+def test_read_file_range_invalid_params(client):
+    response = client.post(
+        "/",
+        json={
+            "jsonrpc": "2.0",
+            "method": "fs.readFile",
+            "params": {"path": "range_test.log", "offset": "ten"},
+            "id": 1
+        }
+    )
+    assert response.status_code == 200
+    assert response.json()["error"]["code"] == -32602
+
+@pytest.mark.parametrize("params", [{"offset": True}, {"length": False}])
+def test_read_file_range_rejects_booleans(client, params):
+    response = client.post(
+        "/",
+        json={
+            "jsonrpc": "2.0",
+            "method": "fs.readFile",
+            "params": {"path": "range_test.log", **params},
+            "id": 1
+        }
+    )
+    assert response.json()["error"]["code"] == -32602
@@ -0,0 +1,62 @@
+import pytest
+import os
+import json
+
+def test_read_file_stream_large_file(client, server_root_dir):
+    large_file_path = os.path.join(server_root_dir, "large_stream_file.log")
+    line = "build step output line\n"
+    with open(large_file_path, "w") as f:
+        f.write(line * (11 * 1024 * 1024 // len(line)))
+
+    try:
+        request = {
+            "jsonrpc": "2.0",
+            "method": "fs.readFile",
+            "params": {"path": "large_stream_file.log", "stream": True},
+            "id": 7
+        }
+        with client.stream("POST", "/", json=request) as response:
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("application/x-ndjson")
+            frames = [json.loads(line) for line in response.iter_lines() if line]
+
+        assert frames[0]["type"] == "start"
+        assert frames[0]["total_size"] == os.path.getsize(large_file_path)
+        assert frames[-1]["type"] == "end"
+        assert all(frame["id"] == 7 for frame in frames)
+
+        chunks = [frame for frame in frames if frame["type"] == "chunk"]
+        assert len(chunks) > 1
+        content = "".join(chunk["data"] for chunk in chunks)
+        with open(large_file_path) as f:
+            assert content == f.read()
+    finally:
+        os.remove(large_file_path)
+
+def test_read_file_stream_missing_file(client):
+    response = client.post(
+        "/",
+        json={
+            "jsonrpc": "2.0",
+            "method": "fs.readFile",
+            "params": {"path": "missing_stream_file.log", "stream": True},
+            "id": 1
+        }
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["error"]["code"] == -32000
+    assert "File not found" in result["error"]["data"]
+
+def test_read_file_stream_not_allowed_in_batch(client):
+    response = client.post(
+        "/",
+        json=[{
+            "jsonrpc": "2.0",
+            "method": "fs.readFile",
+            "params": {"path": "anything.log", "stream": True},
+            "id": 1
+        }]
+    )
+    assert response.status_code == 200
+    assert response.json()[0]["error"]["code"] == -32602
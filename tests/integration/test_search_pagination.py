@@ -0,0 +1,51 @@
+import pytest
+import os
+import shutil
+
+def test_search_pagination(client, server_root_dir):
+    test_dir = os.path.join(server_root_dir, "test_search_pages_dir")
+    os.makedirs(test_dir, exist_ok=True)
+    try:
+        for i in range(5):
+            with open(os.path.join(test_dir, f"file{i}.txt"), "w") as f:
+                f.write("import os\nimport sys\n")
+
+        def search(**params):
+            response = client.post(
+                "/",
+                json={
+                    "jsonrpc": "2.0",
+                    "method": "fs.search",
+                    "params": {
+                        "path": "test_search_pages_dir",
+                        "pattern": "import",
+                        **params,
+                    },
+                    "id": 1,
+                },
+            )
+            assert response.status_code == 200
+            return response.json()["result"]
+
+        first = search(max_results=6, max_line_length=6)
+        assert len(first["matches"]) == 6
+        assert all(match["line"] == "import" for match in first["matches"])
+        assert first["next_cursor"]
+
+        second = search(max_results=6, cursor=first["next_cursor"])
+        assert len(second["matches"]) == 4
+        assert second["next_cursor"] is None
+    finally:
+        shutil.rmtree(test_dir)
+
+def test_search_pagination_invalid_params(client):
+    response = client.post(
+        "/",
+        json={
+            "jsonrpc": "2.0",
+            "method": "fs.search",
+            "params": {"pattern": "import", "max_results": 0},
+            "id": 1,
+        },
+    )
+    assert response.json()["error"]["code"] == -32602
@@ -0,0 +1,20 @@
+import pytest
+
+def test_stats_reports_worker_pools(client):
+    client.post(
+        "/",
+        json={
+            "jsonrpc": "2.0",
+            "method": "fs.listDirectory",
+            "params": {"path": "."},
+            "id": 1,
+        },
+    )
+
+    response = client.get("/stats")
+    assert response.status_code == 200
+    pools = response.json()["worker_pools"]
+    assert set(pools) == {"io", "search"}
+    assert pools["io"]["completed"] >= 1
+    for name in ("max_workers", "queued", "active", "avg_wait_ms", "max_wait_ms"):
+        assert name in pools["io"]
@@ -0,0 +1,52 @@
+import pytest
+import json
+import os
+import subprocess
+import sys
+
+PROJECT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+def run_stdio(root_dir, lines):
+    env = dict(os.environ, MCP_SERVER_ROOT_DIR=str(root_dir), MCP_WATCHER="off")
+    completed = subprocess.run(
+        [sys.executable, "-m", "src.stdio_server"],
+        input="".join(line + "\n" for line in lines).encode("utf-8"),
+        capture_output=True, cwd=PROJECT_DIR, env=env, timeout=60,
+    )
+    assert completed.returncode == 0, completed.stderr
+    return [json.loads(line) for line in completed.stdout.decode("utf-8").splitlines()]
+
+def rpc(method, params, request_id):
+    return {"jsonrpc": "2.0", "method": method, "params": params, "id": request_id}
+
+def test_pipelined_requests(tmp_path):
+    (tmp_path / "a.txt").write_text("alpha")
+    messages = [rpc("fs.readFile", {"path": "a.txt"}, i) for i in range(20)]
+    messages.append(rpc("fs.readFile", {"path": "missing.txt"}, "missing"))
+    messages.append([rpc("fs.listDirectory", {"path": "."}, "batch")])
+    requests = [json.dumps(message) for message in messages]
+    requests.append("not json")
+    requests.append("")
+
+    responses = run_stdio(tmp_path, requests)
+    assert len(responses) == 23
+    by_id = {
+        response["id"]: response for response in responses if isinstance(response, dict)
+    }
+    assert all(by_id[i]["result"] == "alpha" for i in range(20))
+    assert by_id["missing"]["error"]["message"] == "File not found"
+    assert by_id[None]["error"]["code"] == -32700
+    batch = next(response for response in responses if isinstance(response, list))
+    assert batch[0]["result"]["files"][0]["name"] == "a.txt"
+
+def test_streaming_is_rejected(tmp_path):
+    (tmp_path / "a.txt").write_text("alpha")
+    request = rpc("fs.readFile", {"path": "a.txt", "stream": True}, 1)
+    assert run_stdio(tmp_path, [json.dumps(request)])[0]["error"]["code"] == -32602
+
+def test_does_not_import_fastapi():
+    code = (
+        "import sys, src.stdio_server; sys.exit(any(m.split('.')[0] in "
+        "('fastapi', 'starlette') for m in sys.modules))"
+    )
+    assert subprocess.run([sys.executable, "-c", code], cwd=PROJECT_DIR).returncode == 0
@@ -0,0 +1,59 @@
+import pytest
+import os
+
+LIST_REQUEST = {
+    "jsonrpc": "2.0",
+    "method": "fs.listDirectory",
+    "params": {"path": "."},
+    "id": 1,
+}
+
+def test_server_timing_header(client):
+    response = client.post("/", json=LIST_REQUEST)
+    assert response.status_code == 200
+    header = response.headers["server-timing"]
+    assert "resolve;dur=" in header
+    assert "total;dur=" in header
+    assert "_meta" not in response.json()
+
+def test_meta_timings_in_response(client, server_root_dir):
+    test_file_path = os.path.join(server_root_dir, "timed.txt")
+    with open(test_file_path, "w") as f:
+        f.write("hello")
+    try:
+        response = client.post(
+            "/",
+            json={
+                "jsonrpc": "2.0",
+                "method": "fs.readFile",
+                "params": {"path": "timed.txt", "_meta": {"timings": True}},
+                "id": 1,
+            },
+        )
+        data = response.json()
+        assert data["result"] == "hello"
+        timings = data["_meta"]["timings"]
+        assert {"resolve", "stat", "read", "queue", "total"} <= set(timings)
+    finally:
+        os.remove(test_file_path)
+
+def test_profile_requires_admin_token(client, monkeypatch):
+    # Imported late: src.main reads MCP_SERVER_ROOT_DIR when first imported
+    import src.main
+    monkeypatch.setattr(src.main, "ADMIN_TOKEN", None)
+    headers = {"X-MCP-Profile": "anything"}
+    response = client.post("/", headers=headers, json=LIST_REQUEST)
+    assert response.status_code == 403
+
+    monkeypatch.setattr(src.main, "ADMIN_TOKEN", "secret")
+    response = client.post("/", headers={"X-MCP-Profile": "wrong"}, json=LIST_REQUEST)
+    assert response.status_code == 403
+
+def test_profiled_request(client, monkeypatch, tmp_path):
+    import src.main
+    monkeypatch.setattr(src.main, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(src.main, "PROFILE_DIR", str(tmp_path))
+    response = client.post("/", headers={"X-MCP-Profile": "secret"}, json=LIST_REQUEST)
+    assert response.status_code == 200
+    assert "cumulative" in response.json()["_meta"]["profile"]
+    assert os.path.isfile(response.headers["x-mcp-profile-path"])
@@ -0,0 +1,79 @@
+import pytest
+import os
+import json
+import shutil
+
+@pytest.fixture
+def tree_dir(server_root_dir):
+    test_dir = os.path.join(server_root_dir, "test_tree_dir")
+    for i in range(3):
+        os.makedirs(os.path.join(test_dir, f"pkg{i}"))
+        for j in range(5):
+            with open(os.path.join(test_dir, f"pkg{i}", f"mod{j}.py"), "w") as f:
+                f.write("pass\n")
+    os.makedirs(os.path.join(test_dir, "node_modules"))
+    yield test_dir
+    shutil.rmtree(test_dir)
+
+def test_tree(client, tree_dir):
+    response = client.post(
+        "/",
+        json={
+            "jsonrpc": "2.0",
+            "method": "fs.tree",
+            "params": {"path": "test_tree_dir", "exclude": ["mod4.py"]},
+            "id": 1,
+        },
+    )
+    assert response.status_code == 200
+    result = response.json()["result"]
+    assert result["truncated"] is False
+    assert [child["name"] for child in result["tree"]["children"]] == [
+        "pkg0",
+        "pkg1",
+        "pkg2",
+    ]
+    assert len(result["tree"]["children"][0]["children"]) == 4
+
+def test_tree_stream(client, tree_dir):
+    request = {
+        "jsonrpc": "2.0",
+        "method": "fs.tree",
+        "params": {"path": "test_tree_dir", "stream": True, "max_entries": 10},
+        "id": 3,
+    }
+    with client.stream("POST", "/", json=request) as response:
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        frames = [json.loads(line) for line in response.iter_lines() if line]
+
+    assert frames[0]["type"] == "start"
+    assert frames[-1] == {
+        "jsonrpc": "2.0",
+        "id": 3,
+        "type": "end",
+        "count": 10,
+        "truncated": True,
+    }
+    entries = [
+        entry
+        for frame in frames
+        if frame["type"] == "entries"
+        for entry in frame["entries"]
+    ]
+    assert len(entries) == 10
+    assert entries[0] == {
+        "path": os.path.join("test_tree_dir", "pkg0"),
+        "type": "directory",
+    }
+
+def test_tree_invalid_params(client):
+    response = client.post(
+        "/",
+        json={
+            "jsonrpc": "2.0",
+            "method": "fs.tree",
+            "params": {"max_depth": 0},
+            "id": 1,
+        },
+    )
+    assert response.json()["error"]["code"] == -32602
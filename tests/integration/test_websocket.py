@@ -0,0 +1,104 @@
+import pytest
+import json
+import os
+import shutil
+import time
+
+from websockets.exceptions import InvalidStatus
+from websockets.sync.client import connect
+
+def ws_url(live_server_url):
+    return live_server_url.replace("http://", "ws://") + "/ws"
+
+def rpc(method, params, request_id):
+    return {"jsonrpc": "2.0", "method": method, "params": params, "id": request_id}
+
+def receive_until(websocket, predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = max(deadline - time.monotonic(), 0.01)
+        message = json.loads(websocket.recv(timeout=remaining))
+        if predicate(message):
+            return message
+
+def test_multiplexed_requests(live_server_url, server_root_dir):
+    test_file_path = os.path.join(server_root_dir, "ws_read.txt")
+    with open(test_file_path, "w") as f:
+        f.write("over the socket")
+
+    try:
+        with connect(ws_url(live_server_url)) as websocket:
+            for i in range(20):
+                request = rpc("fs.readFile", {"path": "ws_read.txt"}, i)
+                websocket.send(json.dumps(request))
+            batch = [rpc("fs.readFile", {"path": "ws_missing.txt"}, "batch")]
+            websocket.send(json.dumps(batch))
+            websocket.send("not json")
+            params = {"path": "ws_read.txt", "stream": True}
+            websocket.send(json.dumps(rpc("fs.readFile", params, "stream")))
+
+            responses = [json.loads(websocket.recv(timeout=10)) for _ in range(23)]
+    finally:
+        os.remove(test_file_path)
+
+    by_id = {
+        response["id"]: response for response in responses if isinstance(response, dict)
+    }
+    assert all(by_id[i]["result"] == "over the socket" for i in range(20))
+    assert by_id[None]["error"]["code"] == -32700
+    assert by_id["stream"]["error"]["code"] == -32602
+    batch = next(response for response in responses if isinstance(response, list))
+    assert batch[0]["error"]["message"] == "File not found"
+
+def test_change_notifications(live_server_url, server_root_dir):
+    test_dir = os.path.join(server_root_dir, "ws_watched")
+    os.makedirs(os.path.join(test_dir, "nested"), exist_ok=True)
+
+    try:
+        with connect(ws_url(live_server_url)) as websocket:
+            params = {"path": "ws_watched", "recursive": True}
+            websocket.send(json.dumps(rpc("fs.subscribe", params, 1)))
+            response = json.loads(websocket.recv(timeout=10))
+            subscription_id = response["result"]["subscription"]
+            # Give the watcher a moment to pick up the directory
+            time.sleep(0.5)
+
+            with open(os.path.join(test_dir, "nested", "new.txt"), "w") as f:
+                f.write("x")
+            notification = receive_until(
+                websocket, lambda message: message.get("method") == "fs.changed"
+            )
+            assert notification["params"]["subscription"] == subscription_id
+            paths = notification["params"]["paths"]
+            assert paths is None or "ws_watched/nested/new.txt" in paths
+
+            params = {"subscription": subscription_id}
+            websocket.send(json.dumps(rpc("fs.unsubscribe", params, 2)))
+            response = receive_until(websocket, lambda message: message.get("id") == 2)
+            assert response["result"] == {"unsubscribed": True}
+
+            params = {"path": "ws_no_such_dir"}
+            websocket.send(json.dumps(rpc("fs.subscribe", params, 3)))
+            response = receive_until(websocket, lambda message: message.get("id") == 3)
+            assert response["error"]["message"] == "File not found"
+    finally:
+        shutil.rmtree(test_dir)
+
+def test_subscribe_requires_websocket(client):
+    response = client.post("/", json=rpc("fs.subscribe", {"path": "."}, 1))
+    assert response.json()["error"]["code"] == -32601
+
+def test_allowed_origin(live_server_url, monkeypatch):
+    monkeypatch.setattr(
+        "src.main.WS_ALLOWED_ORIGINS", frozenset({"https://app.example"})
+    )
+    with connect(ws_url(live_server_url), origin="https://app.example") as websocket:
+        websocket.send(json.dumps(rpc("fs.listDirectory", {"path": "."}, 1)))
+        assert "result" in json.loads(websocket.recv(timeout=10))
+
+def test_rejects_other_origins(live_server_url):
+    # Closing (1008) before the handshake is accepted is answered with a 403
+    with pytest.raises(InvalidStatus) as excinfo:
+        with connect(ws_url(live_server_url), origin="https://evil.example"):
+            pass
+    assert excinfo.value.response.status_code == 403
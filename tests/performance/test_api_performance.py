@@ -1,5 +1,8 @@
 import pytest
 import os
+from starlette.responses import JSONResponse
+from src.services.file_browser import FileBrowser
+from src.utils.json_codec import dumps
 
 @pytest.fixture
 def large_file(server_root_dir):
@@ -42,3 +45,37 @@ def test_read_file_performance(benchmark, client, large_file, server_root_dir):
         )
         assert response.status_code == 200
         assert "result" in response.json()
+
+LARGE_DIRECTORY_ENTRIES = 20000
+
+@pytest.fixture(scope="module")
+def large_directory(tmp_path_factory):
+    root = tmp_path_factory.mktemp("large_directory")
+    for i in range(LARGE_DIRECTORY_ENTRIES):
+        (root / f"artifact{i:05d}.bin").write_bytes(b"")
+    return root
+
+def test_list_page_names_only_performance(benchmark, large_directory):
+    browser = FileBrowser(root_dir=str(large_directory))
+    page = benchmark.pedantic(
+        browser.list_page, args=(".", 100), kwargs={"fields": ["name"]}, rounds=3
+    )
+    assert len(page["files"]) == 100
+
+def test_list_directory_full_performance(benchmark, large_directory):
+    browser = FileBrowser(root_dir=str(large_directory))
+    result = benchmark.pedantic(browser.list_directory, args=(".",), rounds=3)
+    assert len(result["files"]) == LARGE_DIRECTORY_ENTRIES
+
+@pytest.mark.parametrize("size_mb", [1, 10])
+@pytest.mark.parametrize(
+    "encode",
+    [lambda response: JSONResponse(response).body, dumps],
+    ids=["starlette", "fast"],
+)
+def test_serialize_read_file_response_performance(benchmark, size_mb, encode):
+    # A source-like payload with characters that need escaping
+    content = ('def f(x):\n    return "value\\t" + x\n' * (size_mb * 1024 * 1024 // 36))
+    response = {"jsonrpc": "2.0", "result": content, "id": 1}
+    body = benchmark.pedantic(encode, args=(response,), rounds=5)
+    assert len(body) > size_mb * 1024 * 1024
@@ -0,0 +1,40 @@
+import pytest
+import os
+from src.services.file_browser import FileBrowser
+
+# Synthetic tree: 200 directories x 100 files
+DIRECTORIES = 200
+FILES_PER_DIRECTORY = 100
+
+@pytest.fixture(scope="module")
+def synthetic_tree(tmp_path_factory):
+    root = tmp_path_factory.mktemp("search_tree")
+    body = "".join(f"line {i} of some ordinary source text\n" for i in range(40))
+    for d in range(DIRECTORIES):
+        directory = root / f"pkg{d:03d}"
+        directory.mkdir()
+        for f in range(FILES_PER_DIRECTORY):
+            extra = "needle\n" if f % 50 == 0 else ""
+            (directory / f"module{f:03d}.py").write_text(body + extra)
+    return root
+
+def test_serial_search_performance(benchmark, synthetic_tree):
+    browser = FileBrowser(root_dir=str(synthetic_tree))
+    results = benchmark.pedantic(
+        browser.search_in_directory, args=(".", "needle"), rounds=3
+    )
+    assert len(results) == DIRECTORIES * 2
+
+def test_parallel_search_performance(benchmark, synthetic_tree):
+    browser = FileBrowser(
+        root_dir=str(synthetic_tree), search_processes=min(os.cpu_count() or 1, 4)
+    )
+    try:
+        # Start the worker processes before measuring
+        browser.search_in_directory(".", "needle")
+        results = benchmark.pedantic(
+            browser.search_in_directory, args=(".", "needle"), rounds=3
+        )
+    finally:
+        browser.search_engine.shutdown()
+    assert len(results) == DIRECTORIES * 2
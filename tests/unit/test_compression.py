@@ -0,0 +1,62 @@
+import pytest
+import gzip
+import json
+from src.services import compression
+from src.services.compression import ResponseCompressor, negotiate
+from src.utils.json_codec import dumps
+
+@pytest.mark.parametrize("header,expected", [
+    (None, None),
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, deflate, br", "gzip"),
+    ("GZIP;q=0.5", "gzip"),
+    ("gzip;q=0", None),
+    ("*", "gzip"),
+    ("*, gzip;q=0", None),
+])
+def test_negotiate_without_zstd(monkeypatch, header, expected):
+    monkeypatch.setattr(compression, "zstandard", None)
+    assert negotiate(header) == expected
+
+def test_negotiate_prefers_zstd_when_available(monkeypatch):
+    monkeypatch.setattr(compression, "zstandard", object())
+    assert negotiate("gzip, zstd") == "zstd"
+    assert negotiate("gzip, zstd;q=0.5") == "gzip"
+    assert negotiate("gzip") == "gzip"
+
+def test_gzip_whole_body():
+    compressor = ResponseCompressor(min_bytes=16)
+    content = [{"jsonrpc": "2.0", "result": ["a.txt"] * 100, "id": 1}]
+    body = dumps(content)
+    assert gzip.decompress(compressor.compress(content, body, "gzip")) == body
+
+def test_gzip_reuses_cached_result_for_other_ids():
+    compressor = ResponseCompressor(min_bytes=16, cache_max_bytes=1024 * 1024)
+    text = 'print("hello")\n' * 1000
+    for request_id in (1, "second", None):
+        content = {"jsonrpc": "2.0", "result": text, "id": request_id}
+        compressed = compressor.compress(content, dumps(content), "gzip")
+        assert json.loads(gzip.decompress(compressed)) == content
+    stats = compressor.stats()
+    assert stats["entries"] == 1
+    assert stats["hits"] == 2
+
+def test_gzip_head_keeps_extra_members():
+    compressor = ResponseCompressor(min_bytes=16, cache_max_bytes=1024 * 1024)
+    content = {
+        "jsonrpc": "2.0",
+        "result": "x" * 100,
+        "id": 7,
+        "_meta": {"timings": {"total": 1.0}},
+    }
+    body = compressor.compress(content, dumps(content), "gzip")
+    assert json.loads(gzip.decompress(body)) == content
+
+def test_zstd():
+    zstandard = pytest.importorskip("zstandard")
+    compressor = ResponseCompressor(min_bytes=16)
+    body = b'{"jsonrpc":"2.0","result":"' + b"a" * 1000 + b'","id":1}'
+    compressed = compressor.compress(json.loads(body), body, "zstd")
+    assert zstandard.ZstdDecompressor().decompress(compressed) == body
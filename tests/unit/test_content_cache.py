@@ -0,0 +1,56 @@
+import pytest
+from src.services.content_cache import ContentCache
+
+def test_get_and_put():
+    cache = ContentCache(max_bytes=100)
+    assert cache.get("a") is None
+    cache.put("a", "value", 5)
+    assert cache.get("a") == "value"
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+    assert stats["bytes"] == 5
+    assert stats["hit_ratio"] == 0.5
+
+def test_evicts_least_recently_used():
+    cache = ContentCache(max_bytes=10)
+    cache.put("a", "aaaa", 4)
+    cache.put("b", "bbbb", 4)
+    cache.get("a")  # "b" is now the least recently used entry
+    cache.put("c", "cccc", 4)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+    assert cache.get("c") == "cccc"
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 8
+
+def test_replacing_entry_updates_size():
+    cache = ContentCache(max_bytes=10)
+    cache.put("a", "aaaa", 4)
+    cache.put("a", "aaaaaaaa", 8)
+    assert cache.stats()["bytes"] == 8
+    assert cache.stats()["entries"] == 1
+
+def test_values_larger_than_budget_are_not_cached():
+    cache = ContentCache(max_bytes=10)
+    cache.put("a", "a" * 11, 11)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+def test_clear():
+    cache = ContentCache(max_bytes=10)
+    cache.put("a", "aaaa", 4)
+    cache.clear()
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 0
+
+def test_discard_removes_entry():
+    cache = ContentCache(max_bytes=10)
+    cache.put("a", "aaaa", 4)
+    cache.discard("a")
+    cache.discard("missing")
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 0
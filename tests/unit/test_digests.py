@@ -0,0 +1,99 @@
+import pytest
+import hashlib
+import os
+import sqlite3
+import stat
+import zlib
+from src.services.digests import DigestStore, hash_file, new_hash
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(os.urandom(3 * 1024 * 1024 + 17))
+    return path
+
+def test_hash_file_algorithms(data_file):
+    data = data_file.read_bytes()
+    expected = hashlib.sha256(data).hexdigest()
+    assert hash_file(str(data_file), "sha256", chunk_size=65536) == expected
+    expected = hashlib.blake2b(data, digest_size=32).hexdigest()
+    assert hash_file(str(data_file), "blake2b") == expected
+    assert hash_file(str(data_file), "crc32") == f"{zlib.crc32(data):08x}"
+
+def test_unknown_algorithm():
+    with pytest.raises(ValueError):
+        new_hash("md5")
+
+def test_store_persists_and_validates_identity(tmp_path, data_file):
+    # The directory is created on first use
+    db_path = str(tmp_path / "state" / "digests.db")
+    st = os.stat(data_file)
+    store = DigestStore(db_path)
+    assert store.get(st, "sha256") is None
+    store.put(st, "sha256", "abc")
+    store.close()
+
+    store = DigestStore(db_path)
+    assert store.get(st, "sha256") == "abc"
+    assert store.get(st, "crc32") is None
+
+    with open(data_file, "ab") as f:
+        f.write(b"more")
+    assert store.get(os.stat(data_file), "sha256") is None
+    assert store.stats() == {"path": db_path, "hits": 1, "misses": 2}
+    store.close()
+
+@pytest.mark.parametrize("make_path", [
+    lambda tmp_path: str(tmp_path / "not-a-dir" / "digests.db"),
+    lambda tmp_path: str(tmp_path / "corrupt.db"),
+])
+def test_store_falls_back_to_memory(tmp_path, data_file, make_path):
+    (tmp_path / "not-a-dir").write_text("a file where a directory should be")
+    (tmp_path / "corrupt.db").write_bytes(b"not a database" * 100)
+    store = DigestStore(make_path(tmp_path))
+    st = os.stat(data_file)
+    store.put(st, "sha256", "abc")
+    assert store.get(st, "sha256") == "abc"
+    assert store.stats()["path"] == ":memory:"
+    store.close()
+
+def test_store_commits_in_batches(tmp_path, data_file):
+    db_path = str(tmp_path / "digests.db")
+    st = os.stat(data_file)
+    store = DigestStore(db_path)
+    store.put(st, "sha256", "abc")
+    reader = sqlite3.connect(db_path)
+    try:
+        assert reader.execute("SELECT COUNT(*) FROM digests").fetchone() == (0,)
+        store.flush()
+        assert reader.execute("SELECT COUNT(*) FROM digests").fetchone() == (1,)
+    finally:
+        reader.close()
+        store.close()
+
+def test_store_refuses_symlinked_directory(tmp_path, data_file):
+    (tmp_path / "planted").mkdir()
+    os.symlink(tmp_path / "planted", tmp_path / "cache")
+    store = DigestStore(str(tmp_path / "cache" / "digests.db"))
+    store.put(os.stat(data_file), "sha256", "abc")
+    assert store.stats()["path"] == ":memory:"
+    assert not (tmp_path / "planted" / "digests.db").exists()
+    store.close()
+
+@pytest.mark.skipif(
+    not hasattr(os, "geteuid") or os.geteuid() != 0, reason="needs root to chown"
+)
+def test_store_refuses_directory_of_another_user(tmp_path, data_file):
+    (tmp_path / "cache").mkdir()
+    os.chown(tmp_path / "cache", 12345, -1)
+    store = DigestStore(str(tmp_path / "cache" / "digests.db"))
+    store.put(os.stat(data_file), "sha256", "abc")
+    assert store.stats()["path"] == ":memory:"
+    store.close()
+
+def test_store_creates_private_directory(tmp_path, data_file):
+    store = DigestStore(str(tmp_path / "cache" / "digests.db"))
+    store.put(os.stat(data_file), "sha256", "abc")
+    assert store.stats()["path"] != ":memory:"
+    assert stat.S_IMODE(os.stat(tmp_path / "cache").st_mode) & 0o077 == 0
+    store.close()
@@ -1,8 +1,10 @@
 import pytest
 import os
 import datetime
-from src.services.file_browser import FileBrowser
+from src.services.file_browser import FILE_BYTES_READ, FileBrowser
+from src.utils.path_filter import PathFilter
 import base64
+import hashlib
 
 # Mock root directory for testing
 @pytest.fixture
@@ -38,6 +40,78 @@ def test_list_non_existent_directory(file_browser_instance):
     with pytest.raises(FileNotFoundError):
         file_browser_instance.list_directory("non_existent_dir")
 
+def test_list_directory_fields_skip_stat(file_browser_instance, monkeypatch):
+    def fail_stat(self, *args, **kwargs):
+        raise AssertionError("entries must not be stat'ed")
+    monkeypatch.setattr(os.DirEntry, "stat", fail_stat, raising=False)
+
+    result = file_browser_instance.list_directory(".", fields=["name"], sort="name")
+    assert result["files"] == [{"name": "binary.bin"}, {"name": "file1.txt"}]
+    assert result["directories"] == [{"name": "subdir"}]
+
+def test_list_directory_sorted_by_size(file_browser_instance, mock_root_dir):
+    (mock_root_dir / "large.txt").write_text("x" * 100)
+    result = file_browser_instance.list_directory(
+        ".", fields=["name", "size"], sort="size", descending=True
+    )
+    assert [f["name"] for f in result["files"]] == [
+        "large.txt",
+        "file1.txt",
+        "binary.bin",
+    ]
+
+def test_list_directory_rejects_unknown_field(file_browser_instance):
+    with pytest.raises(ValueError):
+        file_browser_instance.list_directory(".", fields=["owner"])
+
+def test_list_page(file_browser_instance, mock_root_dir):
+    for i in range(5):
+        (mock_root_dir / f"page{i}.txt").write_text(str(i))
+
+    names = []
+    cursor = None
+    while True:
+        page = file_browser_instance.list_page(".", 3, cursor, fields=["name"])
+        names += [entry["name"] for entry in page["files"] + page["directories"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert names == sorted(os.listdir(mock_root_dir))
+
+def test_list_page_descending_by_modified_date(file_browser_instance, mock_root_dir):
+    for i, name in enumerate(["old.txt", "new.txt"]):
+        (mock_root_dir / name).write_text(name)
+        os.utime(mock_root_dir / name, ns=(0, (2000000000 + i) * 10**9))
+
+    page = file_browser_instance.list_page(
+        ".", 2, sort="modified_date", descending=True
+    )
+    assert [entry["name"] for entry in page["files"]] == ["new.txt", "old.txt"]
+    assert page["files"][0]["modified_date"].endswith("Z")
+
+    rest = file_browser_instance.list_page(
+        ".", 10, page["next_cursor"], sort="modified_date", descending=True
+    )
+    assert "new.txt" not in [entry["name"] for entry in rest["files"]]
+    assert rest["next_cursor"] is None
+
+def test_list_page_rejects_cursor_for_other_order(file_browser_instance):
+    page = file_browser_instance.list_page(".", 1)
+    with pytest.raises(ValueError):
+        file_browser_instance.list_page(".", 1, page["next_cursor"], sort="size")
+    with pytest.raises(ValueError):
+        file_browser_instance.list_page(".", 1, "not-a-cursor")
+
+def test_stat(file_browser_instance):
+    assert file_browser_instance.stat("file1.txt")["type"] == "file"
+    assert file_browser_instance.stat("file1.txt")["size"] == 8
+    assert file_browser_instance.stat("subdir")["type"] == "directory"
+    assert file_browser_instance.stat("subdir")["modified_date"].endswith("Z")
+    with pytest.raises(FileNotFoundError):
+        file_browser_instance.stat("missing.txt")
+    with pytest.raises(ValueError):
+        file_browser_instance.stat("../outside")
+
 def test_read_file(file_browser_instance, mock_root_dir):
     content = file_browser_instance.read_file("file1.txt")
     assert content == "content1"
@@ -70,3 +144,411 @@ def test_resolve_path_sandboxing(file_browser_instance, mock_root_dir):
     # Valid path within root_dir
     resolved_path = file_browser_instance._resolve_path("file1.txt")
     assert resolved_path == str(mock_root_dir / "file1.txt")
+
+def test_read_file_range_head(file_browser_instance, mock_root_dir):
+    (mock_root_dir / "log.txt").write_text("0123456789")
+    result = file_browser_instance.read_file_range("log.txt", 0, 4)
+    assert result["content"] == "0123"
+    assert result["encoding"] == "utf-8"
+    assert result["offset"] == 0
+    assert result["length"] == 4
+    assert result["total_size"] == 10
+    assert result["eof"] is False
+
+def test_read_file_range_tail(file_browser_instance, mock_root_dir):
+    (mock_root_dir / "log.txt").write_text("0123456789")
+    result = file_browser_instance.read_file_range("log.txt", -3)
+    assert result["content"] == "789"
+    assert result["offset"] == 7
+    assert result["eof"] is True
+
+def test_read_file_range_past_end(file_browser_instance, mock_root_dir):
+    (mock_root_dir / "log.txt").write_text("0123456789")
+    result = file_browser_instance.read_file_range("log.txt", 50, 10)
+    assert result["content"] == ""
+    assert result["offset"] == 10
+    assert result["eof"] is True
+
+def test_read_file_range_does_not_split_utf8_characters(
+    file_browser_instance, mock_root_dir
+):
+    # "é" and "€" are two and three bytes long in UTF-8
+    (mock_root_dir / "utf8.txt").write_bytes("aé€b".encode("utf-8"))
+
+    # Window ends in the middle of "€": it is left for the next page
+    first = file_browser_instance.read_file_range("utf8.txt", 0, 4)
+    assert first["content"] == "aé"
+    assert first["length"] == 3
+
+    # Window starts in the middle of "é": the partial character is skipped
+    second = file_browser_instance.read_file_range("utf8.txt", 2, 10)
+    assert second["content"] == "€b"
+    assert second["offset"] == 3
+
+def test_read_file_range_pages_through_file(file_browser_instance, mock_root_dir):
+    text = "héllo wörld €uro " * 10
+    (mock_root_dir / "paged.txt").write_text(text, encoding="utf-8")
+
+    pieces = []
+    offset = 0
+    while True:
+        page = file_browser_instance.read_file_range("paged.txt", offset, 5)
+        pieces.append(page["content"])
+        offset = page["offset"] + page["length"]
+        if page["eof"]:
+            break
+    assert "".join(pieces) == text
+
+def test_read_file_range_binary(file_browser_instance, mock_root_dir):
+    result = file_browser_instance.read_file_range("binary.bin", 0, 1)
+    assert result["encoding"] == "base64"
+    assert result["content"] == base64.b64encode(b'\xff').decode("utf-8")
+    assert result["length"] == 1
+
+def test_read_file_range_ignores_file_size_limit(file_browser_instance, mock_root_dir):
+    large_file_path = mock_root_dir / "large_file.txt"
+    large_file_path.write_bytes(b'a' * (10 * 1024 * 1024) + b'tail')
+    result = file_browser_instance.read_file_range("large_file.txt", -4)
+    assert result["content"] == "tail"
+    assert result["total_size"] == 10 * 1024 * 1024 + 4
+
+def test_read_file_range_length_limit(file_browser_instance):
+    with pytest.raises(ValueError, match="Requested length exceeds the 10MB limit"):
+        file_browser_instance.read_file_range("file1.txt", 0, 10 * 1024 * 1024 + 1)
+
+def test_stream_file_chunks(file_browser_instance, mock_root_dir):
+    text = "aé€b" * 100
+    (mock_root_dir / "stream.txt").write_text(text, encoding="utf-8")
+
+    total_size, chunks = file_browser_instance.stream_file("stream.txt", chunk_size=7)
+    chunks = list(chunks)
+    assert total_size == len(text.encode("utf-8"))
+    assert all(c["encoding"] == "utf-8" for c in chunks)
+    assert "".join(c["data"] for c in chunks) == text
+    assert chunks[1]["offset"] == len(chunks[0]["data"].encode("utf-8"))
+
+def test_stream_binary_file(file_browser_instance, mock_root_dir):
+    data = bytes(range(256)) * 4
+    (mock_root_dir / "stream.bin").write_bytes(data)
+
+    total_size, chunks = file_browser_instance.stream_file("stream.bin", chunk_size=256)
+    decoded = b"".join(
+        base64.b64decode(c["data"]) for c in chunks if c["encoding"] == "base64"
+    )
+    assert total_size == len(data)
+    assert decoded == data
+
+def test_stream_file_ignores_file_size_limit(file_browser_instance, mock_root_dir):
+    large_file_path = mock_root_dir / "large_file.txt"
+    large_file_path.write_bytes(b'a' * (10 * 1024 * 1024 + 1))
+    total_size, chunks = file_browser_instance.stream_file("large_file.txt")
+    assert total_size == 10 * 1024 * 1024 + 1
+    assert sum(len(c["data"]) for c in chunks) == total_size
+
+def test_stream_non_existent_file(file_browser_instance):
+    with pytest.raises(FileNotFoundError):
+        file_browser_instance.stream_file("non_existent_file.txt")
+
+def test_read_file_uses_content_cache(mock_root_dir):
+    browser = FileBrowser(root_dir=str(mock_root_dir), cache_max_bytes=1024)
+    assert browser.read_file("file1.txt") == "content1"
+    assert browser.read_file("file1.txt") == "content1"
+    expected = base64.b64encode(b"\xff\xfe").decode("utf-8")
+    assert browser.read_file("binary.bin") == expected
+
+    stats = browser.content_cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+def test_read_file_cache_charges_encoded_bytes(mock_root_dir):
+    (mock_root_dir / "accents.txt").write_text("é" * 100, encoding="utf-8")
+    browser = FileBrowser(root_dir=str(mock_root_dir), cache_max_bytes=1024)
+    browser.read_file("accents.txt")
+    browser.read_file("binary.bin")
+    expected = 200 + len(base64.b64encode(b"\xff\xfe"))
+    assert browser.content_cache.stats()["bytes"] == expected
+
+def test_read_file_cache_sees_modifications(mock_root_dir):
+    browser = FileBrowser(root_dir=str(mock_root_dir), cache_max_bytes=1024)
+    assert browser.read_file("file1.txt") == "content1"
+    (mock_root_dir / "file1.txt").write_text("changed content")
+    assert browser.read_file("file1.txt") == "changed content"
+
+def test_read_file_cache_disabled_by_default(file_browser_instance):
+    assert file_browser_instance.content_cache is None
+    assert file_browser_instance.read_file("file1.txt") == "content1"
+
+@pytest.fixture
+def search_tree(tmp_path):
+    for name in ("a", "b", "c"):
+        (tmp_path / name).mkdir()
+        for i in range(3):
+            (tmp_path / name / f"{i}.txt").write_text("match one\nskip\nmatch two\n")
+    return tmp_path
+
+def test_search_results_are_in_path_order(search_tree):
+    browser = FileBrowser(root_dir=str(search_tree))
+    results = browser.search_in_directory(".", "match")
+    assert [(r["file_path"], r["line_number"]) for r in results] == [
+        (os.path.join(name, f"{i}.txt"), line)
+        for name in ("a", "b", "c")
+        for i in range(3)
+        for line in (1, 3)
+    ]
+
+def test_search_page_walks_all_results(search_tree):
+    browser = FileBrowser(root_dir=str(search_tree))
+    expected = browser.search_in_directory(".", "match")
+
+    pages = []
+    cursor = None
+    while True:
+        page = browser.search_page(".", "match", max_results=4, cursor=cursor)
+        pages.append(page["matches"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert [len(p) for p in pages] == [4, 4, 4, 4, 2]
+    assert [m for p in pages for m in p] == expected
+
+def test_search_page_parallel_matches_serial(search_tree):
+    serial = FileBrowser(root_dir=str(search_tree)).search_page(
+        ".", "match", max_results=5
+    )
+    browser = FileBrowser(root_dir=str(search_tree), search_processes=2)
+    browser.search_engine.batch_size = 2
+    try:
+        first = browser.search_page(".", "match", max_results=5)
+        second = browser.search_page(
+            ".", "match", max_results=5, cursor=first["next_cursor"]
+        )
+    finally:
+        browser.search_engine.shutdown()
+    assert first == serial
+    assert second["matches"][0] == {
+        "file_path": os.path.join("a", "2.txt"),
+        "line_number": 3,
+        "line": "match two",
+    }
+
+def test_search_page_truncates_lines(search_tree):
+    browser = FileBrowser(root_dir=str(search_tree))
+    page = browser.search_page("a", "match", max_results=1, max_line_length=5)
+    assert page["matches"] == [
+        {"file_path": os.path.join("a", "0.txt"), "line_number": 1, "line": "match"}
+    ]
+    assert page["next_cursor"] is not None
+
+def test_search_page_rejects_foreign_cursor(search_tree):
+    browser = FileBrowser(root_dir=str(search_tree))
+    cursor = browser.search_page(".", "match", max_results=1)["next_cursor"]
+    with pytest.raises(ValueError, match="Invalid search cursor"):
+        browser.search_page(".", "skip", max_results=1, cursor=cursor)
+    with pytest.raises(ValueError, match="Invalid search cursor"):
+        browser.search_page(".", "match", max_results=1, cursor="not a cursor")
+
+@pytest.mark.parametrize("options", [
+    {"path_filter": PathFilter(include=["*.txt"])},
+    {"path_filter": PathFilter(exclude=["a"])},
+    {"path_filter": PathFilter(gitignore=True)},
+    {"skip_binary": False},
+    {"regex": True},
+])
+def test_search_cursor_is_tied_to_search_options(search_tree, options):
+    browser = FileBrowser(root_dir=str(search_tree))
+    cursor = browser.search_page(".", "match", max_results=1)["next_cursor"]
+    with pytest.raises(ValueError, match="Invalid search cursor"):
+        browser.search_page(".", "match", max_results=1, cursor=cursor, **options)
+
+@pytest.fixture
+def project_tree(tmp_path):
+    (tmp_path / ".gitignore").write_text("build/\n*.log\n")
+    for directory in ("src", "build", ".git", "node_modules"):
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / "code.py").write_text("needle\n")
+    (tmp_path / "src" / "notes.md").write_text("needle\n")
+    (tmp_path / "src" / "debug.log").write_text("needle\n")
+    (tmp_path / "src" / "image.png").write_bytes(b"\x89PNG\x00\x00needle")
+    return tmp_path
+
+def found_paths(results):
+    return sorted({r["file_path"].replace(os.sep, "/") for r in results})
+
+def test_search_skips_default_excludes_and_binary_files(project_tree):
+    browser = FileBrowser(root_dir=str(project_tree))
+    results = browser.search_in_directory(".", "needle")
+    assert found_paths(results) == [
+        "build/code.py",
+        "src/code.py",
+        "src/debug.log",
+        "src/notes.md",
+    ]
+
+def test_search_binary_files_on_request(project_tree):
+    browser = FileBrowser(root_dir=str(project_tree))
+    results = browser.search_in_directory("src", "needle", skip_binary=False)
+    assert "src/image.png" in found_paths(results)
+
+def test_search_honours_gitignore(project_tree):
+    browser = FileBrowser(root_dir=str(project_tree))
+    results = browser.search_in_directory(
+        ".", "needle", path_filter=PathFilter(gitignore=True)
+    )
+    assert found_paths(results) == ["src/code.py", "src/notes.md"]
+
+def test_search_gitignore_applies_to_subdirectory_searches(project_tree):
+    browser = FileBrowser(root_dir=str(project_tree))
+    results = browser.search_in_directory(
+        "src", "needle", path_filter=PathFilter(gitignore=True)
+    )
+    assert found_paths(results) == ["src/code.py", "src/notes.md"]
+
+def test_search_include_and_exclude(project_tree):
+    browser = FileBrowser(root_dir=str(project_tree))
+    results = browser.search_in_directory(
+        ".", "needle", path_filter=PathFilter(include=["*.py"], exclude=["build"])
+    )
+    assert found_paths(results) == ["src/code.py"]
+
+    results = browser.search_in_directory(
+        ".", "needle", path_filter=PathFilter(include=["*.py"], default_excludes=False)
+    )
+    assert found_paths(results) == [
+        ".git/code.py",
+        "build/code.py",
+        "node_modules/code.py",
+        "src/code.py",
+    ]
+
+def test_search_regex(search_tree):
+    browser = FileBrowser(root_dir=str(search_tree))
+    results = browser.search_in_directory("a", r"match (one|two)$", regex=True)
+    assert len(results) == 6
+
+def test_search_invalid_regex(search_tree):
+    browser = FileBrowser(root_dir=str(search_tree))
+    with pytest.raises(ValueError, match="Invalid regular expression"):
+        browser.search_in_directory(".", "match (", regex=True)
+
+def test_tree_nested(project_tree):
+    browser = FileBrowser(root_dir=str(project_tree))
+    result = browser.tree(".", path_filter=PathFilter(gitignore=True), sizes=True)
+    assert result["truncated"] is False
+    children = result["tree"]["children"]
+    assert [child["name"] for child in children] == [".gitignore", "src"]
+    src = children[1]
+    assert [child["name"] for child in src["children"]] == [
+        "code.py",
+        "image.png",
+        "notes.md",
+    ]
+    assert src["children"][0] == {"name": "code.py", "type": "file", "size": 7}
+
+def test_tree_flat_with_depth_and_entry_limits(project_tree):
+    (project_tree / "src" / "pkg").mkdir()
+    (project_tree / "src" / "pkg" / "deep.py").write_text("")
+    browser = FileBrowser(root_dir=str(project_tree))
+
+    result = browser.tree("src", max_depth=1, nested=False)
+    paths = [entry["path"].replace(os.sep, "/") for entry in result["entries"]]
+    assert "src/pkg" in paths and "src/pkg/deep.py" not in paths
+
+    nested = browser.tree("src", max_depth=1)
+    pkg = [child for child in nested["tree"]["children"] if child["name"] == "pkg"][0]
+    assert "children" not in pkg
+
+    limited = browser.tree(".", max_entries=2, nested=False)
+    assert len(limited["entries"]) == 2
+    assert limited["truncated"] is True
+
+def test_tree_does_not_follow_symlinked_directories(project_tree):
+    os.symlink(project_tree / "src", project_tree / "link")
+    browser = FileBrowser(root_dir=str(project_tree))
+    entries = browser.tree(".", nested=False)["entries"]
+    assert {"path": "link", "type": "directory", "symlink": True} in entries
+    assert not any(entry["path"].startswith("link" + os.sep) for entry in entries)
+
+def test_search_skips_symlinks_leading_out_of_root(tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    (root / "inside.txt").write_text("needle\n")
+    (tmp_path / "secret.txt").write_text("needle\n")
+    os.symlink(tmp_path / "secret.txt", root / "escape.txt")
+    os.symlink(root / "inside.txt", root / "alias.txt")
+
+    browser = FileBrowser(root_dir=str(root))
+    assert found_paths(browser.search_in_directory(".", "needle")) == [
+        "alias.txt",
+        "inside.txt",
+    ]
+
+def test_read_file_if_modified(mock_root_dir):
+    browser = FileBrowser(root_dir=str(mock_root_dir), cache_max_bytes=1024)
+    first = browser.read_file_if_modified("file1.txt")
+    assert first["content"] == "content1"
+    assert first["encoding"] == "utf-8"
+    assert first["size"] == 8
+
+    assert browser.read_file_if_modified("file1.txt", first["etag"]) == {
+        "not_modified": True,
+        "etag": first["etag"],
+        "size": 8,
+    }
+
+    (mock_root_dir / "file1.txt").write_text("changed content")
+    changed = browser.read_file_if_modified("file1.txt", first["etag"])
+    assert changed["content"] == "changed content"
+    assert changed["etag"] != first["etag"]
+
+    binary = browser.read_file_if_modified("binary.bin")
+    assert binary["encoding"] == "base64"
+    assert browser.read_file_if_modified("binary.bin")["encoding"] == "base64"
+
+def test_read_file_if_modified_by_content_hash(mock_root_dir):
+    browser = FileBrowser(root_dir=str(mock_root_dir))
+    first = browser.read_file_if_modified("file1.txt", with_hash=True)
+    assert first["sha256"] == hashlib.sha256(b"content1").hexdigest()
+
+    # Rewriting the same bytes changes the etag but not the digest
+    os.utime(mock_root_dir / "file1.txt", ns=(0, 0))
+    result = browser.read_file_if_modified("file1.txt", "sha256:" + first["sha256"])
+    assert result["not_modified"] is True
+    assert result["etag"] != first["etag"]
+
+def test_hash_file_uses_digest_store(mock_root_dir):
+    browser = FileBrowser(root_dir=str(mock_root_dir), digest_cache_path=":memory:")
+    result = browser.hash("file1.txt")
+    assert result == {
+        "type": "file",
+        "algorithm": "sha256",
+        "digest": hashlib.sha256(b"content1").hexdigest(),
+        "size": 8,
+    }
+    assert browser.hash("file1.txt") == result
+    assert browser.digest_store.stats()["hits"] == 1
+
+def test_hash_counts_bytes_read(mock_root_dir):
+    browser = FileBrowser(root_dir=str(mock_root_dir), digest_cache_path=":memory:")
+    before = FILE_BYTES_READ.value("hash")
+    browser.hash("file1.txt")
+    browser.hash("file1.txt")
+    assert FILE_BYTES_READ.value("hash") - before == 8
+
+def test_hash_directory_changes_with_subtree(mock_root_dir):
+    browser = FileBrowser(root_dir=str(mock_root_dir), digest_cache_path=":memory:")
+    first = browser.hash(".", "blake2b")
+    assert first["type"] == "directory"
+    assert first["files"] == 3
+    assert browser.hash(".", "blake2b") == first
+    subdir = browser.hash("subdir", "blake2b")
+
+    (mock_root_dir / "subdir" / "file2.txt").write_text("changed")
+    assert browser.hash("subdir", "blake2b")["digest"] != subdir["digest"]
+    assert browser.hash(".", "blake2b")["digest"] != first["digest"]
+
+    with pytest.raises(ValueError):
+        browser.hash(".", max_files=1)
+    with pytest.raises(ValueError):
+        browser.hash(".", "md5")
+    with pytest.raises(FileNotFoundError):
+        browser.hash("missing")
@@ -0,0 +1,31 @@
+import pytest
+from src.utils.file_response import etag_matches, parse_range
+
+@pytest.mark.parametrize("header,expected", [
+    (None, None),
+    ("bytes=0-9", (0, 10)),
+    ("bytes=10-", (10, 100)),
+    ("bytes=-10", (90, 100)),
+    ("bytes=-500", (0, 100)),
+    ("bytes=90-500", (90, 100)),
+    ("bytes=0-0", (0, 1)),
+    ("bytes=5-2", None),
+    ("bytes=0-1,5-6", None),
+    ("items=0-9", None),
+    ("bytes=abc", None),
+    ("bytes=-", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 100) == expected
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=200-300", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 100)
+
+def test_etag_matches():
+    assert etag_matches('"a-1"', '"a-1"')
+    assert etag_matches('"b", W/"a-1"', '"a-1"')
+    assert etag_matches("*", '"a-1"')
+    assert not etag_matches('"b"', '"a-1"')
+    assert not etag_matches(None, '"a-1"')
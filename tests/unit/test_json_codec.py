@@ -0,0 +1,29 @@
+import pytest
+import json
+from starlette.responses import JSONResponse
+from src.utils import json_codec
+from src.utils.json_codec import dumps, loads
+
+RESPONSE = {"jsonrpc": "2.0", "result": 'line "one"\nzwei — drei\n', "id": 1}
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_matches_starlette_encoding(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(json_codec, "orjson", None)
+    assert json.loads(dumps(RESPONSE)) == RESPONSE
+    assert loads(dumps(RESPONSE)) == RESPONSE
+    if not use_orjson:
+        assert dumps(RESPONSE) == JSONResponse(RESPONSE).body
+
+def test_dumps_handles_wide_integers():
+    assert loads(dumps({"size": 2 ** 70})) == {"size": 2 ** 70}
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_calls_default_for_unsupported_objects(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(json_codec, "orjson", None)
+    assert loads(dumps({"value": object}, default=str)) == {"value": str(object)}
+
+def test_loads_rejects_invalid_json():
+    with pytest.raises(ValueError):
+        loads(b"this is not json")
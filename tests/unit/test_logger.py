@@ -0,0 +1,65 @@
+import pytest
+import json
+import logging
+import queue
+import sys
+from src.utils.logger import (
+    DroppingQueueHandler,
+    JsonFormatter,
+    SamplingFilter,
+    parse_sample_rates,
+)
+
+def make_record(level=logging.INFO, msg="hello %s", args=("world",), extra=None):
+    record = logging.LogRecord("test", level, __file__, 1, msg, args, None)
+    for key, value in (extra or {}).items():
+        setattr(record, key, value)
+    return record
+
+def test_formatter_emits_extra_fields():
+    entry = json.loads(
+        JsonFormatter().format(make_record(extra={"path": "a.txt", "duration_ms": 1.5}))
+    )
+    assert entry["message"] == "hello world"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "test"
+    assert entry["path"] == "a.txt"
+    assert entry["duration_ms"] == 1.5
+    assert "args" not in entry and "lineno" not in entry
+
+def test_formatter_falls_back_to_str_for_unknown_types():
+    entry = json.loads(
+        JsonFormatter().format(make_record(extra={"value": object(), "big": 2**70}))
+    )
+    assert entry["value"].startswith("<object")
+    assert entry["big"] == 2 ** 70
+
+def test_parse_sample_rates():
+    assert parse_sample_rates("DEBUG=0.01, info=0.5") == {
+        logging.DEBUG: 0.01,
+        logging.INFO: 0.5,
+    }
+    assert parse_sample_rates("") == {}
+    with pytest.raises(ValueError):
+        parse_sample_rates("LOUD=1")
+
+def test_sampling_filter():
+    sampling = SamplingFilter({logging.INFO: 0.0})
+    assert not sampling.filter(make_record(logging.INFO))
+    assert sampling.filter(make_record(logging.WARNING))
+
+def test_queue_handler_formats_message_and_drops_when_full():
+    handler = DroppingQueueHandler(queue.Queue(1))
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        record = make_record(extra={"path": "a.txt"})
+        record.exc_info = sys.exc_info()
+    handler.handle(record)
+    handler.handle(make_record())
+
+    queued = handler.queue.get_nowait()
+    assert queued.msg == "hello world" and queued.args is None
+    assert queued.exc_info is None and "RuntimeError: boom" in queued.exc_text
+    assert json.loads(JsonFormatter().format(queued))["exc_info"] == queued.exc_text
+    assert handler.dropped == 1
@@ -0,0 +1,49 @@
+import pytest
+from src.utils.metrics import Registry
+
+def test_counter_render():
+    registry = Registry()
+    counter = registry.counter("requests_total", "Requests", ("method",))
+    counter.inc("fs.readFile")
+    counter.inc("fs.readFile", amount=2)
+    counter.inc('we"ird')
+    assert counter.value("fs.readFile") == 3
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{method="fs.readFile"} 3' in text
+    assert 'requests_total{method="we\\"ird"} 1' in text
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    histogram = registry.histogram(
+        "latency_seconds", "Latency", ("method",), buckets=(0.1, 1.0)
+    )
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, "fs.search")
+
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{method="fs.search",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{method="fs.search",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{method="fs.search",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{method="fs.search"} 5.55' in lines
+    assert 'latency_seconds_count{method="fs.search"} 3' in lines
+
+def test_collector_reads_values_at_scrape_time():
+    registry = Registry()
+    depth = {"io": 0}
+    registry.collector(
+        "queued",
+        "Queue depth",
+        ("pool",),
+        lambda: [((name,), value) for name, value in depth.items()],
+    )
+    assert 'queued{pool="io"} 0' in registry.render()
+    depth["io"] = 4
+    assert 'queued{pool="io"} 4' in registry.render()
+
+def test_duplicate_names_are_rejected():
+    registry = Registry()
+    registry.counter("a_total", "A")
+    with pytest.raises(ValueError):
+        registry.counter("a_total", "A")
@@ -0,0 +1,64 @@
+import pytest
+from src.utils.path_filter import GitIgnoreRule, PathFilter, load_gitignore
+
+def ignored(rules, path, is_dir=False):
+    return PathFilter(default_excludes=False).is_excluded(
+        tuple(path.split("/")), path, is_dir, rules
+    )
+
+def test_unanchored_pattern_matches_at_any_depth():
+    rules = [GitIgnoreRule((), "*.log")]
+    assert ignored(rules, "build.log")
+    assert ignored(rules, "a/b/build.log")
+    assert not ignored(rules, "build.txt")
+
+def test_anchored_pattern():
+    rules = [GitIgnoreRule((), "/dist")]
+    assert ignored(rules, "dist", is_dir=True)
+    assert not ignored(rules, "src/dist", is_dir=True)
+
+def test_directory_only_pattern():
+    rules = [GitIgnoreRule((), "build/")]
+    assert ignored(rules, "build", is_dir=True)
+    assert ignored(rules, "src/build", is_dir=True)
+    assert not ignored(rules, "build", is_dir=False)
+
+def test_double_star_patterns():
+    rules = [GitIgnoreRule((), "**/generated/*.py"), GitIgnoreRule((), "docs/**")]
+    assert ignored(rules, "generated/x.py")
+    assert ignored(rules, "a/b/generated/x.py")
+    assert ignored(rules, "docs/a/b.md")
+    assert not ignored(rules, "src/docs/b.md")
+
+def test_negation_last_match_wins():
+    rules = [GitIgnoreRule((), "*.log"), GitIgnoreRule((), "!keep.log")]
+    assert ignored(rules, "drop.log")
+    assert not ignored(rules, "keep.log")
+
+def test_rules_are_relative_to_their_directory():
+    rules = [GitIgnoreRule(("pkg",), "/out")]
+    assert ignored(rules, "pkg/out", is_dir=True)
+    assert not ignored(rules, "out", is_dir=True)
+
+def test_load_gitignore(tmp_path):
+    (tmp_path / ".gitignore").write_text("# comment\n\n*.tmp\n\\#literal\n")
+    rules = load_gitignore(str(tmp_path), ())
+    assert len(rules) == 2
+    assert ignored(rules, "x.tmp")
+    assert ignored(rules, "#literal")
+    assert load_gitignore(str(tmp_path / "missing"), ()) == []
+
+def test_include_and_exclude_globs():
+    path_filter = PathFilter(include=["*.py"], exclude=["tests", "*.min.js"])
+    assert path_filter.is_excluded(("tests",), "tests", True, [])
+    assert path_filter.is_excluded(("app.min.js",), "app.min.js", False, [])
+    assert path_filter.is_included("main.py", "src/main.py")
+    assert not path_filter.is_included("README.md", "README.md")
+
+def test_default_excludes():
+    assert PathFilter().is_excluded(("node_modules",), "node_modules", True, [])
+    assert PathFilter().is_excluded(("a", ".git"), "a/.git", True, [])
+    assert PathFilter(exclude=["dist"]).is_excluded((".git",), ".git", True, [])
+    assert not PathFilter(default_excludes=False).is_excluded(
+        (".git",), ".git", True, []
+    )
@@ -0,0 +1,136 @@
+import pytest
+import os
+import shutil
+import time
+from src.services.file_browser import FileBrowser
+from src.services.watcher import DirectoryWatcher, _load_inotify
+from src.utils.path_resolver import PathResolver
+
+class FakeWatcher:
+    def __init__(self):
+        self.callbacks = []
+
+    def subscribe(self, callback):
+        self.callbacks.append(callback)
+
+    def tracks(self, directory):
+        # Reports nothing, like a watcher whose events have not arrived yet
+        return True
+
+    def notify(self, paths):
+        for callback in self.callbacks:
+            callback(paths)
+
+@pytest.fixture
+def root(tmp_path):
+    root = tmp_path / "root"
+    (root / "a" / "b").mkdir(parents=True)
+    (root / "a" / "b" / "file.txt").write_text("x")
+    (tmp_path / "root-evil").mkdir()
+    (tmp_path / "outside").mkdir()
+    (tmp_path / "outside" / "file.txt").write_text("secret")
+    return root
+
+def test_resolves_paths_inside_root(root):
+    resolver = PathResolver(str(root))
+    assert resolver.resolve("a/b/file.txt") == str(root / "a" / "b" / "file.txt")
+    assert resolver.resolve(".") == str(root)
+    assert resolver.resolve("a/b/missing.txt") == str(root / "a" / "b" / "missing.txt")
+
+@pytest.mark.parametrize(
+    "path", ["..", "../root-evil/file.txt", "/etc/passwd", "a/../../outside/file.txt"]
+)
+def test_rejects_paths_outside_root(root, path):
+    with pytest.raises(ValueError):
+        PathResolver(str(root)).resolve(path)
+
+def test_rejects_symlinks_leading_out(root):
+    os.symlink(root.parent / "outside", root / "a" / "escape")
+    os.symlink(root.parent / "outside" / "file.txt", root / "a" / "escape.txt")
+    resolver = PathResolver(str(root))
+    for path in ("a/escape", "a/escape/file.txt", "a/escape.txt"):
+        with pytest.raises(ValueError):
+            resolver.resolve(path)
+
+def test_caches_parent_directories(root):
+    resolver = PathResolver(str(root), FakeWatcher())
+    resolver.resolve("a/b/file.txt")
+    resolver.resolve("a/b/other.txt")
+    assert resolver.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+def test_does_not_cache_without_watcher(root):
+    resolver = PathResolver(str(root))
+    resolver.resolve("a/b/file.txt")
+    resolver.resolve("a/b/other.txt")
+    assert resolver.stats() == {"entries": 0, "hits": 0, "misses": 2}
+
+def test_detects_cached_directory_replaced_by_symlink(root):
+    resolver = PathResolver(str(root), FakeWatcher())
+    resolver.resolve("a/b/file.txt")
+    shutil.rmtree(root / "a" / "b")
+    os.symlink(root.parent / "outside", root / "a" / "b")
+    with pytest.raises(ValueError):
+        resolver.resolve("a/b/file.txt")
+
+def test_watcher_drops_entries_below_changed_directory(root):
+    watcher = FakeWatcher()
+    resolver = PathResolver(str(root), watcher)
+    resolver.resolve("a/b/file.txt")
+    resolver.resolve("a/file.txt")
+
+    watcher.notify([str(root / "a" / "b")])
+    assert resolver.stats()["entries"] == 1
+    watcher.notify([str(root)])
+    assert resolver.stats()["entries"] == 0
+
+    resolver.resolve("a/b/file.txt")
+    watcher.notify(None)
+    assert resolver.stats()["entries"] == 0
+
+def test_symlinked_root(root):
+    link = root.parent / "link"
+    os.symlink(root, link)
+    resolver = PathResolver(str(link))
+    assert resolver.resolve("a/b/file.txt") == str(link / "a" / "b" / "file.txt")
+
+def move_out_and_link(root):
+    """Move a cached directory out of the root and symlink its old name to it.
+
+    The symlink resolves to the same inode the directory had.
+    """
+    os.rename(root / "a", root.parent / "outside" / "a")
+    os.symlink(root.parent / "outside" / "a", root / "a")
+    (root.parent / "outside" / "a" / "secret.txt").write_text("OUTSIDE SECRET")
+
+def test_detects_cached_directory_moved_out_and_symlinked(root):
+    resolver = PathResolver(str(root), FakeWatcher())
+    resolver.resolve("a/file.txt")
+    resolver.resolve("a/b/file.txt")
+    move_out_and_link(root)
+    for path in ("a/secret.txt", "a/b/file.txt"):
+        with pytest.raises(ValueError):
+            resolver.resolve(path)
+
+@pytest.mark.parametrize("mode", [None, "inotify"])
+def test_file_browser_rejects_directory_moved_out_and_symlinked(root, mode):
+    if mode == "inotify" and _load_inotify() is None:
+        pytest.skip("inotify is not available")
+    watcher = None
+    if mode is not None:
+        watcher = DirectoryWatcher(str(root), mode=mode)
+        watcher.start()
+        deadline = time.monotonic() + 5
+        while not watcher.tracks(str(root / "a")) and time.monotonic() < deadline:
+            time.sleep(0.02)
+    try:
+        browser = FileBrowser(root_dir=str(root), watcher=watcher)
+        (root / "a" / "secret.txt").write_text("inside")
+        for _ in range(2):
+            assert browser.read_file("a/secret.txt") == "inside"
+        assert browser.path_resolver.stats()["hits"] == (mode is not None)
+        move_out_and_link(root)
+        with pytest.raises(ValueError, match="outside root directory"):
+            browser.read_file("a/secret.txt")
+    finally:
+        if watcher is not None:
+            watcher.stop()
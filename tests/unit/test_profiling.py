@@ -0,0 +1,52 @@
+import pytest
+import asyncio
+import os
+from src.services.worker_pool import WorkerPool
+from src.utils.profiling import ProfileSession, current_profile, start_profile
+
+def busy_function():
+    return sum(range(10000))
+
+def test_report_and_dump(tmp_path):
+    session = ProfileSession()
+    assert session.report() == ""
+    assert session.dump(str(tmp_path)) is None
+
+    assert session.run(busy_function) == busy_function()
+    assert "busy_function" in session.report()
+    path = session.dump(str(tmp_path / "profiles"))
+    assert path.endswith(".prof") and os.path.isfile(path)
+
+def test_worker_pool_jobs_are_profiled_with_the_request():
+    pool = WorkerPool("test", max_workers=1)
+
+    async def scenario():
+        session = start_profile()
+        await pool.run(busy_function)
+        return session
+
+    try:
+        session = asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+    assert "busy_function" in session.report()
+    assert current_profile() is None
+
+def test_concurrent_profiled_jobs_are_all_recorded():
+    pool = WorkerPool("test", max_workers=4)
+
+    async def profiled_request():
+        session = start_profile()
+        await asyncio.gather(*(pool.run(busy_function) for _ in range(4)))
+        return session
+
+    async def scenario():
+        return await asyncio.gather(profiled_request(), profiled_request())
+
+    try:
+        sessions = asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+    for session in sessions:
+        assert len(session._profiles) == 4
+        assert "busy_function" in session.report()
@@ -0,0 +1,157 @@
+import pytest
+import os
+import signal
+from src.services.file_browser import FileBrowser
+from src.services.search_engine import ParallelSearchEngine, scan_file
+
+@pytest.fixture
+def search_root(tmp_path):
+    for d in range(5):
+        directory = tmp_path / f"dir{d}"
+        directory.mkdir()
+        for f in range(10):
+            (directory / f"file{f}.txt").write_text(
+                f"first line\nneedle {d}-{f}\nlast line needle\n"
+            )
+    (tmp_path / "other.txt").write_text("nothing to see\n")
+    return tmp_path
+
+def test_scan_file(search_root):
+    file_path = search_root / "dir0" / "file0.txt"
+    results = scan_file(str(file_path), "dir0/file0.txt", "needle")
+    assert results == [
+        {"file_path": "dir0/file0.txt", "line_number": 2, "line": "needle 0-0"},
+        {"file_path": "dir0/file0.txt", "line_number": 3, "line": "last line needle"},
+    ]
+
+def test_scan_file_unreadable(tmp_path):
+    assert scan_file(str(tmp_path / "missing.txt"), "missing.txt", "needle") == []
+
+def test_parallel_search_matches_serial_search(search_root):
+    serial = FileBrowser(root_dir=str(search_root)).search_in_directory(".", "needle")
+
+    parallel_browser = FileBrowser(root_dir=str(search_root), search_processes=2)
+    # Small batches force the work onto the worker processes
+    parallel_browser.search_engine.batch_size = 4
+    try:
+        parallel = parallel_browser.search_in_directory(".", "needle")
+    finally:
+        parallel_browser.search_engine.shutdown()
+
+    assert len(parallel) == 100
+    assert parallel == serial
+
+def test_parallel_search_stops_early(search_root):
+    engine = ParallelSearchEngine(max_workers=2, batch_size=4)
+    files = [
+        (str(search_root / f"dir{d}" / f"file{f}.txt"), f"dir{d}/file{f}.txt")
+        for d in range(5)
+        for f in range(10)
+    ]
+    try:
+        results = engine.iter_search(iter(files), "needle", limit=3)
+        first = [next(results) for _ in range(3)]
+        results.close()
+    finally:
+        engine.shutdown()
+    assert [(r["file_path"], r["line_number"]) for r in first] == [
+        ("dir0/file0.txt", 2),
+        ("dir0/file0.txt", 3),
+        ("dir0/file1.txt", 2),
+    ]
+
+def test_scan_file_limits(search_root):
+    file_path = str(search_root / "dir0" / "file0.txt")
+    assert scan_file(file_path, "f", "needle", limit=1) == [
+        {"file_path": "f", "line_number": 2, "line": "needle 0-0"}
+    ]
+    assert scan_file(file_path, "f", "needle", after_line=2) == [
+        {"file_path": "f", "line_number": 3, "line": "last line needle"}
+    ]
+    assert scan_file(file_path, "f", "needle", max_line_length=4)[1]["line"] == "last"
+
+def test_small_search_stays_in_process(search_root):
+    engine = ParallelSearchEngine(max_workers=2)
+    files = [
+        (str(search_root / "other.txt"), "other.txt"),
+        (str(search_root / "dir0" / "file1.txt"), os.path.join("dir0", "file1.txt")),
+    ]
+    results = list(engine.iter_search(iter(files), "needle"))
+    assert len(results) == 2
+    assert engine._executor is None
+
+def test_engine_requires_a_worker():
+    with pytest.raises(ValueError):
+        ParallelSearchEngine(max_workers=0)
+
+def test_scan_file_line_numbers_and_crlf(tmp_path):
+    file_path = tmp_path / "crlf.txt"
+    file_path.write_bytes(b"one\r\ntwo needle\r\nthree\r\n\r\nneedle five")
+    results = scan_file(str(file_path), "crlf.txt", "needle")
+    assert [(r["line_number"], r["line"]) for r in results] == [
+        (2, "two needle"),
+        (5, "needle five"),
+    ]
+
+def test_scan_file_reports_each_line_once(tmp_path):
+    file_path = tmp_path / "repeat.txt"
+    file_path.write_text("needle needle needle\nnone\n")
+    assert len(scan_file(str(file_path), "repeat.txt", "needle")) == 1
+
+def test_scan_file_ignores_matches_across_lines(tmp_path):
+    file_path = tmp_path / "span.txt"
+    file_path.write_text("end of line\nstart of next\nline\n")
+    assert scan_file(str(file_path), "span.txt", "line\nstart") == []
+    results = scan_file(str(file_path), "span.txt", "line\n")
+    assert [r["line_number"] for r in results] == [1, 3]
+
+def test_scan_file_regex(tmp_path):
+    file_path = tmp_path / "code.py"
+    file_path.write_text("import os\nfrom sys import path\ndef f(): pass\n")
+    results = scan_file(str(file_path), "code.py", r"^(import|from) \w+", regex=True)
+    assert [r["line_number"] for r in results] == [1, 2]
+
+def test_scan_file_regex_prefers_match_within_line(tmp_path):
+    file_path = tmp_path / "greedy.txt"
+    # "a.*b" (with DOTALL) first matches from the "a" on line 1 to the "b" on line 3
+    file_path.write_text("a then b\nnothing\nb\nonly a\n")
+    results = scan_file(str(file_path), "greedy.txt", r"(?s)a.*b", regex=True)
+    assert [(r["line_number"], r["line"]) for r in results] == [(1, "a then b")]
+
+    file_path.write_text("xa\nyb\nzab\n")
+    results = scan_file(str(file_path), "greedy.txt", r"a\s*\w*b", regex=True)
+    assert [r["line_number"] for r in results] == [3]
+
+def test_scan_large_file_with_mmap(tmp_path):
+    file_path = tmp_path / "large.log"
+    filler = "ordinary log line\n" * 20000
+    file_path.write_text(filler + "the needle line\n" + filler + "needle again")
+    results = scan_file(str(file_path), "large.log", "needle")
+    assert [(r["line_number"], r["line"]) for r in results] == [
+        (20001, "the needle line"),
+        (40002, "needle again"),
+    ]
+
+def test_scan_empty_file(tmp_path):
+    file_path = tmp_path / "empty.txt"
+    file_path.write_text("")
+    assert scan_file(str(file_path), "empty.txt", "") == []
+
+def test_parallel_search_recovers_from_a_dead_worker(search_root):
+    engine = ParallelSearchEngine(max_workers=2, batch_size=4)
+    files = [
+        (str(search_root / f"dir{d}" / f"file{f}.txt"), f"dir{d}/file{f}.txt")
+        for d in range(5)
+        for f in range(10)
+    ]
+    try:
+        assert len(list(engine.iter_search(iter(files), "needle"))) == 100
+        broken = engine._executor
+        os.kill(next(iter(broken._processes)), signal.SIGKILL)
+
+        assert len(list(engine.iter_search(iter(files), "needle"))) == 100
+        assert engine._executor is not broken
+        assert len(list(engine.iter_search(iter(files), "needle"))) == 100
+        assert engine._executor is not None
+    finally:
+        engine.shutdown()
@@ -0,0 +1,93 @@
+import pytest
+import os
+from src.services.file_browser import FileBrowser
+from src.services.search_index import TrigramIndex, build_index, main
+
+@pytest.fixture
+def indexed_root(tmp_path):
+    root = tmp_path / "root"
+    (root / "pkg").mkdir(parents=True)
+    (root / "pkg" / "alpha.py").write_text(
+        "import os\ndef alpha():\n    return 'needle'\n"
+    )
+    (root / "pkg" / "beta.py").write_text("def beta():\n    return 'haystack'\n")
+    (root / "notes.txt").write_text("no match here\n")
+    (root / "blob.bin").write_bytes(b"\xff\xfe needle \xff")
+    index_path = tmp_path / "search.idx"
+    build_index(str(root), str(index_path))
+    return root, index_path
+
+def test_build_index_summary(tmp_path, indexed_root):
+    root, index_path = indexed_root
+    summary = build_index(str(root), str(index_path), max_file_size=20)
+    assert summary["files"] == 4
+    # only notes.txt is small enough and valid UTF-8
+    assert summary["indexed_files"] == 1
+
+def test_query_narrows_candidates(indexed_root):
+    root, index_path = indexed_root
+    query = TrigramIndex(str(index_path), str(root)).query("needle")
+
+    def needs_scan(relative_path):
+        return query.needs_scan(relative_path, os.stat(root / relative_path))
+
+    assert needs_scan(os.path.join("pkg", "alpha.py"))
+    assert not needs_scan(os.path.join("pkg", "beta.py"))
+    assert not needs_scan("notes.txt")
+    # Binary files are not indexed and always scanned
+    assert needs_scan("blob.bin")
+
+def test_query_scans_changed_and_new_files(indexed_root):
+    root, index_path = indexed_root
+    (root / "pkg" / "beta.py").write_text("def beta():\n    return 'needle and more'\n")
+    (root / "new.txt").write_text("needle")
+    query = TrigramIndex(str(index_path), str(root)).query("needle")
+
+    assert query.needs_scan(
+        os.path.join("pkg", "beta.py"), os.stat(root / "pkg" / "beta.py")
+    )
+    assert query.needs_scan("new.txt", os.stat(root / "new.txt"))
+
+def test_query_without_narrowing(indexed_root, tmp_path):
+    root, index_path = indexed_root
+    assert TrigramIndex(str(index_path), str(root)).query("ne") is None
+    assert (
+        TrigramIndex(str(tmp_path / "missing.idx"), str(root)).query("needle") is None
+    )
+    assert TrigramIndex(str(index_path), str(tmp_path)).query("needle") is None
+
+def test_search_with_index_matches_search_without(indexed_root):
+    root, index_path = indexed_root
+    (root / "pkg" / "beta.py").write_text("needle in a changed file\n")
+    plain = FileBrowser(root_dir=str(root)).search_in_directory(".", "needle")
+    indexed = FileBrowser(
+        root_dir=str(root), search_index_path=str(index_path)
+    ).search_in_directory(".", "needle")
+
+    def key(result):
+        return (result["file_path"], result["line_number"])
+
+    assert sorted(indexed, key=key) == sorted(plain, key=key)
+    assert {r["file_path"] for r in indexed} == {
+        os.path.join("pkg", "alpha.py"),
+        os.path.join("pkg", "beta.py"),
+        "blob.bin",
+    }
+
+def test_index_is_reloaded_after_rebuild(indexed_root):
+    root, index_path = indexed_root
+    index = TrigramIndex(str(index_path), str(root))
+    assert not index.query("needle").needs_scan(
+        "notes.txt", os.stat(root / "notes.txt")
+    )
+
+    (root / "notes.txt").write_text("a needle after all\n")
+    build_index(str(root), str(index_path))
+    assert index.query("needle").needs_scan("notes.txt", os.stat(root / "notes.txt"))
+
+def test_cli_builds_index(tmp_path, capsys):
+    (tmp_path / "a.txt").write_text("hello")
+    index_path = tmp_path / "cli.idx"
+    main(["--root", str(tmp_path), "--output", str(index_path)])
+    assert index_path.exists()
+    assert "Indexed 1 of 1 files" in capsys.readouterr().out
@@ -37,3 +37,16 @@ def test_is_path_safe_symlink_outside_root(mock_root_dir):
     symlink = mock_root_dir / "symlink_to_outside.txt"
     os.symlink(outside_file, symlink)
     assert is_path_safe(str(mock_root_dir), str(symlink)) is False
+
+def test_is_path_safe_rejects_sibling_with_common_prefix(mock_root_dir):
+    sibling = mock_root_dir.parent / (mock_root_dir.name + "-evil")
+    sibling.mkdir()
+    assert is_path_safe(str(mock_root_dir), str(sibling / "secret.txt")) is False
+
+def test_is_path_safe_symlinked_root(mock_root_dir):
+    real_root = mock_root_dir / "real"
+    real_root.mkdir()
+    (real_root / "file.txt").touch()
+    link_root = mock_root_dir / "link"
+    os.symlink(real_root, link_root)
+    assert is_path_safe(str(link_root), str(link_root / "file.txt")) is True
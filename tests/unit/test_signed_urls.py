@@ -0,0 +1,15 @@
+import pytest
+from src.utils.signed_urls import UrlSigner
+
+def test_sign_and_verify():
+    signer = UrlSigner(b"secret", ttl=60)
+    expires, signature = signer.sign("docs/a.txt")
+    assert signer.verify("docs/a.txt", expires, signature)
+    assert not signer.verify("docs/b.txt", expires, signature)
+    assert not signer.verify("docs/a.txt", expires + 1, signature)
+    assert not UrlSigner(b"other", ttl=60).verify("docs/a.txt", expires, signature)
+
+def test_expired_signature_is_rejected():
+    signer = UrlSigner(b"secret", ttl=-1)
+    expires, signature = signer.sign("a.txt")
+    assert not signer.verify("a.txt", expires, signature)
@@ -0,0 +1,161 @@
+import pytest
+import asyncio
+import time
+from src.services.subscriptions import SubscriptionHub
+from src.services.watcher import DirectoryWatcher, _load_inotify
+
+class FakeWatcher:
+    def __init__(self, backend="inotify"):
+        self.backend = backend
+        self.callbacks = []
+        self.watched = []
+
+    def subscribe(self, callback):
+        self.callbacks.append(callback)
+        return len(self.callbacks)
+
+    def watch(self, directory):
+        self.watched.append(directory)
+
+    def notify(self, paths):
+        for callback in self.callbacks:
+            callback(paths)
+
+def collect(hub, loop, directory, recursive):
+    received = []
+
+    def callback(sid, paths, ended=False):
+        received.append((sid, paths, True) if ended else (sid, paths))
+
+    subscription_id = hub.subscribe(directory, recursive, loop, callback)
+    return subscription_id, received
+
+def test_matches_direct_children_and_recursive_descendants():
+    watcher = FakeWatcher()
+    hub = SubscriptionHub(watcher)
+    loop = asyncio.new_event_loop()
+    try:
+        shallow_id, shallow = collect(hub, loop, "/root/a", False)
+        deep_id, deep = collect(hub, loop, "/root/a", True)
+        assert len(watcher.callbacks) == 1
+        assert watcher.watched == ["/root/a", "/root/a"]
+
+        watcher.notify(
+            ["/root/a", "/root/a/file.txt", "/root/a/b/c.txt", "/root/ab/d.txt"]
+        )
+        loop.run_until_complete(asyncio.sleep(0))
+        assert shallow == [(shallow_id, ["/root/a", "/root/a/file.txt"])]
+        assert deep == [(deep_id, ["/root/a", "/root/a/file.txt", "/root/a/b/c.txt"])]
+
+        watcher.notify(["/root/other/x.txt"])
+        watcher.notify(None)
+        loop.run_until_complete(asyncio.sleep(0))
+        assert shallow[-1] == (shallow_id, None)
+        assert len(shallow) == 2
+    finally:
+        loop.close()
+
+def test_unsubscribe_stops_notifications():
+    watcher = FakeWatcher()
+    hub = SubscriptionHub(watcher)
+    loop = asyncio.new_event_loop()
+    try:
+        subscription_id, received = collect(hub, loop, "/root", True)
+        assert hub.stats() == {"subscriptions": 1}
+        assert hub.unsubscribe(subscription_id) is True
+        assert hub.unsubscribe(subscription_id) is False
+        watcher.notify(["/root/x.txt"])
+        loop.run_until_complete(asyncio.sleep(0))
+        assert received == []
+        assert hub.stats() == {"subscriptions": 0}
+    finally:
+        loop.close()
+
+def test_closed_loop_is_ignored():
+    watcher = FakeWatcher()
+    hub = SubscriptionHub(watcher)
+    loop = asyncio.new_event_loop()
+    collect(hub, loop, "/root", True)
+    loop.close()
+    watcher.notify(["/root/x.txt"])
+
+def test_recursive_subscriptions_need_inotify():
+    hub = SubscriptionHub(FakeWatcher(backend="poll"))
+    loop = asyncio.new_event_loop()
+    try:
+        with pytest.raises(ValueError):
+            collect(hub, loop, "/root", True)
+        assert collect(hub, loop, "/root", False)[0] == 1
+    finally:
+        loop.close()
+
+def test_fallback_to_polling_keeps_shallow_subscriptions():
+    watcher = FakeWatcher()
+    hub = SubscriptionHub(watcher)
+    loop = asyncio.new_event_loop()
+    try:
+        shallow_id, shallow = collect(hub, loop, "/root/a", False)
+        deep_id, deep = collect(hub, loop, "/root/a", True)
+        watcher.watched.clear()
+
+        watcher.backend = "poll"
+        watcher.notify(None)
+        loop.run_until_complete(asyncio.sleep(0))
+        assert watcher.watched == ["/root/a"]
+        assert shallow == [(shallow_id, None)]
+        assert deep == [(deep_id, None, True)]
+        assert hub.stats() == {"subscriptions": 1}
+    finally:
+        loop.close()
+
+@pytest.mark.skipif(_load_inotify() is None, reason="inotify is not available")
+def test_changes_are_delivered_after_watch_limit_fallback(tmp_path):
+    (tmp_path / "sub").mkdir()
+    watcher = DirectoryWatcher(
+        str(tmp_path), mode="auto", poll_interval=0.05, max_watches=3
+    )
+    watcher.start()
+    hub = SubscriptionHub(watcher)
+    loop = asyncio.new_event_loop()
+
+    def wait_for(predicate):
+        deadline = time.monotonic() + 5
+        while not predicate() and time.monotonic() < deadline:
+            loop.run_until_complete(asyncio.sleep(0.02))
+        return predicate()
+
+    try:
+        assert wait_for(lambda: watcher.generation(str(tmp_path / "sub")) is not None)
+        _, received = collect(hub, loop, str(tmp_path / "sub"), False)
+        # Two more directories exceed max_watches
+        (tmp_path / "x").mkdir()
+        (tmp_path / "y").mkdir()
+        assert wait_for(lambda: watcher.backend == "poll")
+        assert wait_for(lambda: (1, None) in received)
+
+        (tmp_path / "sub" / "b.txt").write_text("b")
+        assert wait_for(lambda: any(paths for _, paths in received))
+        assert received[-1] == (1, [str(tmp_path / "sub")])
+    finally:
+        watcher.stop()
+        loop.close()
+
+def test_session_subscribe_finishing_after_close(monkeypatch):
+    # Imported here: importing the dispatcher reads MCP_SERVER_ROOT_DIR, which the
+    # live server fixture sets
+    from src import dispatcher
+
+    hub = SubscriptionHub(FakeWatcher())
+    monkeypatch.setattr(dispatcher, "subscriptions", hub)
+
+    async def send(message):
+        pass
+
+    async def subscribe_after_close():
+        session = dispatcher.Session(send)
+        # fs.subscribe runs session.subscribe on a worker; the socket closed first
+        session.close()
+        await asyncio.to_thread(session.subscribe, "/root/a", False)
+
+    asyncio.run(subscribe_after_close())
+    assert hub.stats() == {"subscriptions": 0}
@@ -0,0 +1,55 @@
+import pytest
+import asyncio
+import contextvars
+import time
+from src.utils.timing import current_timings, phase, start_timings
+
+def run_in_context(fn):
+    return contextvars.copy_context().run(fn)
+
+def test_phase_outside_a_request_is_a_noop():
+    def scenario():
+        with phase("read"):
+            pass
+        return current_timings()
+
+    assert run_in_context(scenario) is None
+
+def test_phases_accumulate_per_name():
+    def scenario():
+        timings = start_timings()
+        with phase("read"):
+            time.sleep(0.01)
+        with phase("read"):
+            time.sleep(0.01)
+        with phase("resolve"):
+            pass
+        return timings.as_dict()
+
+    result = run_in_context(scenario)
+    assert result["read"] >= 20
+    assert "resolve" in result
+    assert result["total"] >= result["read"]
+
+def test_server_timing_header_format():
+    def scenario():
+        timings = start_timings()
+        timings.add("read", 0.0015)
+        return timings.server_timing()
+
+    header = run_in_context(scenario)
+    assert header.startswith("read;dur=1.5, total;dur=")
+
+def test_tasks_get_separate_timings():
+    async def member(name):
+        timings = start_timings()
+        with phase(name):
+            await asyncio.sleep(0)
+        return set(timings.as_dict())
+
+    async def scenario():
+        return await asyncio.gather(member("a"), member("b"))
+
+    first, second = asyncio.run(scenario())
+    assert first == {"a", "total"}
+    assert second == {"b", "total"}
@@ -0,0 +1,176 @@
+import os
+import threading
+import time
+
+import pytest
+from src.services.file_browser import FileBrowser
+from src.services.watcher import DirectoryWatcher, _load_inotify
+
+requires_inotify = pytest.mark.skipif(
+    _load_inotify() is None, reason="inotify is not available"
+)
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "a.txt").write_text("a")
+    (tmp_path / "other").mkdir()
+    return tmp_path
+
+@pytest.fixture
+def inotify_watcher(tree):
+    watcher = DirectoryWatcher(str(tree), mode="inotify")
+    watcher.start()
+    assert wait_for(lambda: watcher.generation(str(tree / "other")) is not None)
+    yield watcher
+    watcher.stop()
+
+def test_rejects_unknown_mode(tmp_path):
+    with pytest.raises(ValueError):
+        DirectoryWatcher(str(tmp_path), mode="fanotify")
+
+@requires_inotify
+def test_generation_changes_only_for_modified_directory(tree, inotify_watcher):
+    sub = inotify_watcher.generation(str(tree / "sub"))
+    other = inotify_watcher.generation(str(tree / "other"))
+    assert inotify_watcher.generation(str(tree / "sub")) == sub
+
+    (tree / "sub" / "a.txt").write_text("changed")
+
+    # The change is visible immediately, without waiting for the background thread
+    assert inotify_watcher.generation(str(tree / "sub")) != sub
+    assert inotify_watcher.generation(str(tree / "other")) == other
+    assert inotify_watcher.stats()["backend"] == "inotify"
+
+@requires_inotify
+def test_new_directories_are_watched(tree, inotify_watcher):
+    (tree / "new").mkdir()
+    # The watch is added by the background thread
+    assert wait_for(lambda: inotify_watcher.generation(str(tree / "new")) is not None)
+    before = inotify_watcher.generation(str(tree / "new"))
+    (tree / "new" / "b.txt").write_text("b")
+    assert inotify_watcher.generation(str(tree / "new")) != before
+
+@requires_inotify
+def test_lookups_do_not_walk_new_trees(tree, inotify_watcher, monkeypatch):
+    walks = []
+    monkeypatch.setattr(
+        inotify_watcher,
+        "_add_watch_tree",
+        lambda top: walks.append((top, threading.current_thread().name)),
+    )
+    before = inotify_watcher.generation(str(tree))
+    (tree / "big" / "deep").mkdir(parents=True)
+
+    assert inotify_watcher.generation(str(tree)) != before
+    assert wait_for(lambda: walks == [(str(tree / "big"), "mcp-watcher")])
+
+@requires_inotify
+def test_rewatch_after_lost_events_drops_stale_watches(tree):
+    watcher = DirectoryWatcher(str(tree), mode="inotify", max_watches=3)
+    watcher.start()
+    try:
+        assert wait_for(lambda: watcher.generation(str(tree / "other")) is not None)
+        with watcher._lock:
+            # As if the IN_IGNORED event of a deleted directory had been lost
+            watcher._path_wds[str(tree / "gone")] = 1 << 30
+            watcher._wd_paths[1 << 30] = str(tree / "gone")
+            watcher._rewatch_pending = True
+        assert wait_for(
+            lambda: not watcher._rewatch_pending
+            and watcher.generation(str(tree / "other")) is not None
+        )
+        assert watcher.stats() == {
+            "backend": "inotify",
+            "watched_directories": 3,
+            "rescans": 0,
+        }
+    finally:
+        watcher.stop()
+
+@requires_inotify
+def test_subscribers_receive_changed_paths(tree, inotify_watcher):
+    received = []
+    subscription = inotify_watcher.subscribe(received.append)
+    (tree / "other" / "c.txt").write_text("c")
+    inotify_watcher.generation(str(tree))
+
+    changed = [path for paths in received for path in paths]
+    assert str(tree / "other") in changed
+    assert str(tree / "other" / "c.txt") in changed
+
+    inotify_watcher.unsubscribe(subscription)
+    received.clear()
+    (tree / "other" / "d.txt").write_text("d")
+    inotify_watcher.generation(str(tree))
+    assert received == []
+
+@requires_inotify
+def test_paths_outside_root_are_not_tracked(tree, inotify_watcher):
+    assert inotify_watcher.generation(os.path.dirname(str(tree))) is None
+
+@requires_inotify
+def test_watch_limit_degrades_to_polling(tree):
+    watcher = DirectoryWatcher(
+        str(tree), mode="inotify", poll_interval=0.05, max_watches=1
+    )
+    rescans = []
+    watcher.subscribe(rescans.append)
+    watcher.start()
+    try:
+        assert wait_for(lambda: watcher.stats()["backend"] == "poll")
+        assert rescans == [None]
+        assert watcher.stats()["rescans"] == 1
+        assert watcher.generation(str(tree / "sub")) is not None
+    finally:
+        watcher.stop()
+
+def test_polling_detects_changes(tree):
+    watcher = DirectoryWatcher(str(tree), mode="poll", poll_interval=0.05)
+    watcher.start()
+    try:
+        before = watcher.generation(str(tree / "sub"))
+        (tree / "sub" / "new.txt").write_text("new")
+        assert wait_for(lambda: watcher.generation(str(tree / "sub")) != before)
+    finally:
+        watcher.stop()
+
+@requires_inotify
+def test_file_browser_serves_listing_until_directory_changes(tree, inotify_watcher):
+    browser = FileBrowser(
+        str(tree), watcher=inotify_watcher, listing_cache_max_bytes=1024 * 1024
+    )
+
+    first = browser.list_directory("sub")
+    assert browser.list_directory("sub") == first
+    assert browser.listing_cache.stats()["hits"] == 1
+
+    (tree / "sub" / "b.txt").write_text("b")
+    names = [entry["name"] for entry in browser.list_directory("sub")["files"]]
+    assert sorted(names) == ["a.txt", "b.txt"]
+
+    # Entry paths follow the path the caller asked for
+    assert browser.list_directory("./sub")["files"][0]["path"].startswith("./sub")
+
+def test_file_browser_does_not_cache_listings_when_polling(tree):
+    watcher = DirectoryWatcher(str(tree), mode="poll", poll_interval=60)
+    watcher.start()
+    try:
+        browser = FileBrowser(
+            str(tree), watcher=watcher, listing_cache_max_bytes=1024 * 1024
+        )
+        browser.list_directory("sub")
+        (tree / "sub" / "b.txt").write_text("b")
+        names = [entry["name"] for entry in browser.list_directory("sub")["files"]]
+        assert sorted(names) == ["a.txt", "b.txt"]
+        assert browser.listing_cache.stats()["entries"] == 0
+    finally:
+        watcher.stop()
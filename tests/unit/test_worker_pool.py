@@ -0,0 +1,49 @@
+import pytest
+import asyncio
+import threading
+from src.services.worker_pool import WorkerPool
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool("test", max_workers=1)
+    yield pool
+    pool.shutdown()
+
+def test_run_returns_result_in_worker_thread(pool):
+    main_thread = threading.get_ident()
+    result = asyncio.run(pool.run(lambda x: (x * 2, threading.get_ident()), 21))
+    assert result[0] == 42
+    assert result[1] != main_thread
+
+def test_run_propagates_exceptions(pool):
+    def fail():
+        raise FileNotFoundError("missing")
+
+    with pytest.raises(FileNotFoundError, match="missing"):
+        asyncio.run(pool.run(fail))
+
+def test_stats_track_queue_depth_and_wait(pool):
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.ensure_future(pool.run(release.wait))
+        second = asyncio.ensure_future(pool.run(lambda: "done"))
+        await asyncio.sleep(0.05)
+        busy = pool.stats()
+        release.set()
+        await asyncio.gather(first, second)
+        return busy
+
+    busy = asyncio.run(scenario())
+    assert busy["active"] == 1
+    assert busy["queued"] == 1
+
+    idle = pool.stats()
+    assert idle["queued"] == 0
+    assert idle["active"] == 0
+    assert idle["completed"] == 2
+    assert idle["max_wait_ms"] > 0
+
+def test_pool_requires_a_worker():
+    with pytest.raises(ValueError):
+        WorkerPool("empty", max_workers=0)